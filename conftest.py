@@ -0,0 +1,68 @@
+"""
+Shared helpers and fixtures for the extraction tests.
+
+Test modules import write_tone and record_extractions directly so they also
+run as scripts; under pytest they can take the extracted fixture instead.
+"""
+
+import sys
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import dcm.core.extract_features as extract_features
+
+# Real extraction, kept before any test patches it
+_compute_features = extract_features._compute_features
+
+def write_tone(path: Path, frequency: float = 220.0, duration: float = 2.0, sr: int = 22050) -> Path:
+    """Write a short sine tone.
+
+    Args:
+        path: WAV file to write
+        frequency: Tone frequency in Hz
+        duration: Length in seconds
+        sr: Sample rate
+
+    Returns:
+        The path written
+    """
+    t = np.arange(int(duration * sr)) / sr
+    sf.write(str(path), (0.3 * np.sin(2 * np.pi * frequency * t)).astype(np.float32), sr)
+    return path
+
+def record_extractions(monkeypatch: pytest.MonkeyPatch,
+                       before: Optional[Callable[[Path], None]] = None) -> List[Path]:
+    """Patch extract_features._compute_features to record the files it analyzes.
+
+    Only in-process runs (timeout=None, one worker) append to the list seen by
+    the test; forked workers inherit the patch but record in their own copy.
+
+    Args:
+        monkeypatch: Fixture the patch is registered with
+        before: Called with each audio path before it is analyzed
+
+    Returns:
+        List the analyzed audio paths are appended to, in call order
+    """
+    extracted = []
+
+    def recording_compute_features(audio_path, *args):
+        extracted.append(audio_path)
+        if before is not None:
+            before(audio_path)
+        return _compute_features(audio_path, *args)
+
+    monkeypatch.setattr(extract_features, '_compute_features', recording_compute_features)
+    return extracted
+
+@pytest.fixture
+def extracted(monkeypatch) -> List[Path]:
+    """Audio paths analyzed by in-process extraction during the test."""
+    return record_extractions(monkeypatch)
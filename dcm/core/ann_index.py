@@ -0,0 +1,278 @@
+"""
+Nearest-neighbor indexes for DCM.
+
+ExactCosineIndex is the exact search engine. Vectors are normalized once
+when the index is built, and queries are scored in blocks with float32
+matrix products, so a batch of queries costs one BLAS call per block and
+memory stays bounded however many queries are asked at once. The top
+candidates of each query are picked with argpartition and reranked in
+float64, so the ranking is that of exact cosine similarity, not of float32
+round-off.
+
+Exact search still compares a query with every track, so its cost grows
+linearly with the library. IVFIndex is an inverted-file index: the
+normalized track vectors are clustered with spherical k-means into
+`n_lists` lists, and a query is compared only with the tracks in the
+`n_probe` lists whose centroids are closest to it. With lists of a few
+hundred tracks, a query against a million-track library scores a few
+thousand vectors instead of a million.
+
+Recall and latency are traded off with two knobs:
+
+- n_lists: more lists make each list shorter (faster) but make a true
+  neighbor more likely to sit in a list that is not probed. The default is
+  about 4 * sqrt(n_tracks).
+- n_probe: more probed lists raise recall at proportional cost. It is only
+  used at query time, so it can be changed on a trained index.
+
+Both indexes have the kneighbors() interface of sklearn's NearestNeighbors
+with the cosine metric, so SongRecommender can use any of them, and they
+pickle with the rest of the model.
+"""
+
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Lists probed per query by default
+DEFAULT_N_PROBE = 16
+
+# Training vectors sampled per list for k-means
+KMEANS_SAMPLES_PER_LIST = 64
+
+# k-means iterations when training the coarse quantizer
+KMEANS_ITERATIONS = 10
+
+# Vectors assigned to lists per matrix product while training
+ASSIGN_BLOCK_SIZE = 65536
+
+# Similarity scores computed per block by exact search (float32 elements, 64 MB)
+EXACT_BLOCK_ELEMENTS = 1 << 24
+
+# Candidates beyond k reranked in float64 by exact search, to absorb float32 round-off
+RERANK_MARGIN = 16
+
+class ExactCosineIndex:
+    """Exact cosine nearest-neighbor search with blocked float32 scoring."""
+
+    def __init__(self, n_neighbors: int = 5, block_elements: int = EXACT_BLOCK_ELEMENTS):
+        """
+        Args:
+            n_neighbors: Default number of neighbors returned by kneighbors
+            block_elements: Scores computed per block; bounds the memory of a query batch
+        """
+        self.n_neighbors = n_neighbors
+        self.block_elements = block_elements
+        self._vectors = None
+
+    def fit(self, X: np.ndarray) -> 'ExactCosineIndex':
+        """
+        Normalize and keep the vectors to search.
+
+        Args:
+            X: (n_tracks, n_dims) vectors to index
+
+        Returns:
+            The fitted index
+        """
+        self._vectors = _normalize(X)
+        self.n_samples_fit_ = len(self._vectors)
+        return self
+
+    def kneighbors(
+        self,
+        X: np.ndarray,
+        n_neighbors: Optional[int] = None,
+        return_distance: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the nearest neighbors by cosine distance.
+
+        Args:
+            X: (n_queries, n_dims) query vectors
+            n_neighbors: Neighbors per query (default: the index's n_neighbors)
+            return_distance: Return (distances, indices) rather than indices only
+
+        Returns:
+            (distances, indices) arrays of shape (n_queries, n_neighbors),
+            nearest first (ties by lower index); distances are 1 - cosine
+            similarity, in float64
+        """
+        if self._vectors is None:
+            raise ValueError("Index must be fitted before querying")
+        n_samples = self.n_samples_fit_
+        n_neighbors = min(n_neighbors or self.n_neighbors, n_samples)
+        n_candidates = min(n_neighbors + RERANK_MARGIN, n_samples)
+        queries = _normalize(np.atleast_2d(X))
+        exact_queries = _normalize64(queries)
+
+        distances = np.empty((len(queries), n_neighbors), dtype=np.float64)
+        indices = np.empty((len(queries), n_neighbors), dtype=np.intp)
+        block_size = max(1, self.block_elements // n_samples)
+        for start in range(0, len(queries), block_size):
+            block = slice(start, start + block_size)
+            # Negated float32 scores, so the best candidates come first
+            scores = queries[block] @ self._vectors.T
+            np.negative(scores, out=scores)
+            if n_candidates < n_samples:
+                candidates = np.argpartition(scores, n_candidates - 1, axis=1)[:, :n_candidates]
+            else:
+                candidates = np.broadcast_to(np.arange(n_samples), scores.shape)
+            del scores
+
+            # Rerank the candidates by float64 similarity
+            similarities = np.einsum(
+                'qcd,qd->qc', _normalize64(self._vectors[candidates]), exact_queries[block]
+            )
+            order = np.lexsort((candidates, -similarities), axis=1)[:, :n_neighbors]
+            indices[block] = np.take_along_axis(candidates, order, axis=1)
+            distances[block] = 1 - np.take_along_axis(similarities, order, axis=1)
+
+        return (distances, indices) if return_distance else indices
+
+class IVFIndex:
+    """Inverted-file index for approximate cosine nearest-neighbor search."""
+
+    def __init__(
+        self,
+        n_neighbors: int = 5,
+        n_lists: Optional[int] = None,
+        n_probe: int = DEFAULT_N_PROBE,
+        random_state: int = 42
+    ):
+        """
+        Args:
+            n_neighbors: Default number of neighbors returned by kneighbors
+            n_lists: Number of lists (None = about 4 * sqrt(n_tracks))
+            n_probe: Number of lists searched per query
+            random_state: Seed of the k-means initialization
+        """
+        self.n_neighbors = n_neighbors
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.random_state = random_state
+        self.centroids = None
+
+    def fit(self, X: np.ndarray) -> 'IVFIndex':
+        """
+        Cluster the vectors and build the lists.
+
+        Args:
+            X: (n_tracks, n_dims) vectors to index
+
+        Returns:
+            The fitted index
+        """
+        X = _normalize(X)
+        n_lists = self.n_lists or int(round(4 * np.sqrt(len(X))))
+        n_lists = int(np.clip(n_lists, 1, len(X)))
+        rng = np.random.default_rng(self.random_state)
+
+        sample_size = min(len(X), n_lists * KMEANS_SAMPLES_PER_LIST)
+        sample = X[np.sort(rng.choice(len(X), sample_size, replace=False))]
+        self.centroids = _spherical_kmeans(sample, n_lists, rng)
+
+        # Store the vectors grouped by list, so each list is one contiguous slice
+        labels = self._assign(X)
+        order = np.argsort(labels, kind='stable')
+        self._vectors = np.ascontiguousarray(X[order])
+        self._ids = order.astype(np.intp)
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=n_lists))])
+        self.n_samples_fit_ = len(X)
+
+        sizes = np.diff(self._offsets)
+        logger.info(
+            f"Built IVF index of {len(X)} vectors in {n_lists} lists "
+            f"({sizes.mean():.0f} per list on average, {sizes.max()} at most)"
+        )
+        return self
+
+    def kneighbors(
+        self,
+        X: np.ndarray,
+        n_neighbors: Optional[int] = None,
+        return_distance: bool = True
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find approximate nearest neighbors by cosine distance.
+
+        Args:
+            X: (n_queries, n_dims) query vectors
+            n_neighbors: Neighbors per query (default: the index's n_neighbors)
+            return_distance: Return (distances, indices) rather than indices only
+
+        Returns:
+            (distances, indices) arrays of shape (n_queries, n_neighbors),
+            nearest first; distances are 1 - cosine similarity
+        """
+        if self.centroids is None:
+            raise ValueError("Index must be fitted before querying")
+        n_neighbors = min(n_neighbors or self.n_neighbors, self.n_samples_fit_)
+        queries = _normalize(np.atleast_2d(X))
+        coarse = queries @ self.centroids.T
+        sizes = np.diff(self._offsets)
+
+        distances = np.empty((len(queries), n_neighbors), dtype=np.float32)
+        indices = np.empty((len(queries), n_neighbors), dtype=np.intp)
+        for row, query in enumerate(queries):
+            lists = self._probe(coarse[row], sizes, n_neighbors)
+            scores = np.concatenate([
+                self._vectors[self._offsets[i]:self._offsets[i + 1]] @ query for i in lists
+            ])
+            ids = np.concatenate([self._ids[self._offsets[i]:self._offsets[i + 1]] for i in lists])
+            top = np.argpartition(-scores, n_neighbors - 1)[:n_neighbors]
+            top = top[np.argsort(-scores[top], kind='stable')]
+            distances[row] = 1 - scores[top]
+            indices[row] = ids[top]
+
+        return (distances, indices) if return_distance else indices
+
+    def _probe(self, similarities: np.ndarray, sizes: np.ndarray, n_neighbors: int) -> np.ndarray:
+        """Lists to search for one query: the n_probe closest, more if they hold too few vectors."""
+        n_probe = min(self.n_probe, len(similarities))
+        lists = np.argpartition(-similarities, n_probe - 1)[:n_probe]
+        if sizes[lists].sum() >= n_neighbors:
+            return lists
+        ranked = np.argsort(-similarities)
+        return ranked[:np.searchsorted(np.cumsum(sizes[ranked]), n_neighbors) + 1]
+
+    def _assign(self, X: np.ndarray) -> np.ndarray:
+        """List of each (normalized) vector."""
+        labels = np.empty(len(X), dtype=np.intp)
+        for start in range(0, len(X), ASSIGN_BLOCK_SIZE):
+            labels[start:start + ASSIGN_BLOCK_SIZE] = np.argmax(
+                X[start:start + ASSIGN_BLOCK_SIZE] @ self.centroids.T, axis=1
+            )
+        return labels
+
+def _normalize(X: np.ndarray) -> np.ndarray:
+    """Rows of X scaled to unit length, as contiguous float32."""
+    X = np.array(X, dtype=np.float32, order='C')
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    X /= np.where(norms > 0, norms, 1)
+    return X
+
+def _normalize64(X: np.ndarray) -> np.ndarray:
+    """Vectors along the last axis of X scaled to unit length, in float64."""
+    X = X.astype(np.float64)
+    norms = np.linalg.norm(X, axis=-1, keepdims=True)
+    return X / np.where(norms > 0, norms, 1)
+
+def _spherical_kmeans(X: np.ndarray, n_clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity; returns unit-length centroids."""
+    centroids = X[rng.choice(len(X), n_clusters, replace=False)].copy()
+    for _ in range(KMEANS_ITERATIONS):
+        labels = np.concatenate([
+            np.argmax(X[start:start + ASSIGN_BLOCK_SIZE] @ centroids.T, axis=1)
+            for start in range(0, len(X), ASSIGN_BLOCK_SIZE)
+        ])
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, X)
+        # Clusters that lost all their vectors restart from a random vector
+        empty = np.bincount(labels, minlength=n_clusters) == 0
+        sums[empty] = X[rng.choice(len(X), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
@@ -0,0 +1,249 @@
+"""
+Decoded-audio cache for DCM.
+
+Decoding and resampling compressed audio is about half the cost of analyzing
+a file, and it does not depend on any analysis parameter. This cache keeps
+the mono PCM of each track at the analysis sample rate as a `.npy` file, so
+re-extracting a library with different feature settings (N_MFCC, N_CHROMA,
+hop lengths, ...) reads the signal back memory-mapped instead of decoding.
+
+Entries are keyed by file content (see file_fingerprint) and sample rate, so
+moved or renamed files still hit. The cache is capped in size; when it grows
+beyond the cap the least recently used entries are evicted. Entries are
+plain files, so several worker processes can share one cache directory.
+
+Each cache object keeps a running total of the entry sizes and an index of
+the entries in least recently used order, so storing an entry does not list
+the directory. Entries written or read by other processes are picked up by
+a rescan every AUDIO_CACHE_RESCAN_STORES stores (hits refresh the entry's
+modification time, which orders the rescanned index).
+"""
+
+import os
+import logging
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+import numpy as np
+
+from dcm.core.feature_cache import file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# Default size cap of the cache in GB
+DEFAULT_AUDIO_CACHE_SIZE_GB = 10.0
+
+# Suffix of cache entries
+AUDIO_CACHE_SUFFIX = '.npy'
+
+# Stores between rescans of the cache directory, which bring in the entries
+# and hits of other processes sharing it
+AUDIO_CACHE_RESCAN_STORES = 100
+
+class DecodedAudioCache:
+    """Size-capped LRU cache of decoded mono signals, one memory-mapped .npy file per track."""
+
+    def __init__(self, cache_dir: Union[str, Path], max_size_gb: float = DEFAULT_AUDIO_CACHE_SIZE_GB):
+        """
+        Args:
+            cache_dir: Directory holding the cached signals (created if missing)
+            max_size_gb: Total size the cache is kept under, in GB
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_size_gb = max_size_gb
+        self.max_bytes = int(max_size_gb * 1024 ** 3)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Entry sizes by key, least recently used first, and their running total
+        self._entries = OrderedDict()
+        self.total_bytes = 0
+        self._stores_since_scan = 0
+        # The reader thread of a pipelined worker stores while its analysis streams
+        self._lock = threading.Lock()
+        self.rescan()
+
+    def __reduce__(self):
+        # Tasks sent to a worker process carry only the directory and cap, and
+        # share one index per process instead of each unpickling a copy
+        return _process_cache, (str(self.cache_dir), self.max_size_gb)
+
+    def key(self, audio_path: Union[str, Path], sample_rate: int) -> str:
+        """Cache key of a file's content decoded at the given sample rate."""
+        return f"{file_fingerprint(audio_path)}_{sample_rate}"
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{AUDIO_CACHE_SUFFIX}"
+
+    def load(self, key: str) -> Optional[np.ndarray]:
+        """
+        Get a cached signal.
+
+        Args:
+            key: Cache key (see key())
+
+        Returns:
+            Read-only memory-mapped float32 signal, or None on a miss
+        """
+        entry_path = self._entry_path(key)
+        try:
+            y = np.load(entry_path, mmap_mode='r')
+        except FileNotFoundError:
+            self._forget(key)  # Evicted by another process, if it was indexed
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable audio cache entry {entry_path}: {e}")
+            entry_path.unlink(missing_ok=True)
+            self._forget(key)
+            return None
+        try:
+            os.utime(entry_path)  # Mark as recently used for other processes
+        except OSError:
+            pass
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                self._add(key, y.nbytes + y.offset)
+        return y
+
+    def store(self, key: str, y: np.ndarray) -> None:
+        """Cache a decoded signal, evicting old entries to stay within the size cap."""
+        y = np.asarray(y, dtype=np.float32)
+        if y.nbytes > self.max_bytes:
+            return
+        with self._atomic_entry(key) as f:
+            np.save(f, y)
+            size = f.tell()
+        self._stored(key, size)
+
+    @contextmanager
+    def writer(self, key: str) -> Iterator['_EntryWriter']:
+        """
+        Cache a signal that arrives in blocks, without holding it in memory.
+
+        Blocks appended inside the `with` block are spooled to a temporary
+        file; the entry is written when the block exits without an error.
+        """
+        writer = _EntryWriter(self.cache_dir)
+        try:
+            yield writer
+            if writer.samples * 4 <= self.max_bytes:
+                with self._atomic_entry(key) as f:
+                    writer.copy_to(f)
+                    size = f.tell()
+                self._stored(key, size)
+        finally:
+            writer.close()
+
+    @contextmanager
+    def _atomic_entry(self, key: str):
+        """Open a uniquely named temporary file that replaces the entry on success."""
+        # Unlike atomic_write the temporary name is unique, so two workers
+        # caching the same (duplicate) track do not write into one file
+        fd, temp_file = tempfile.mkstemp(dir=self.cache_dir, prefix='.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                yield f
+            os.replace(temp_file, self._entry_path(key))
+        finally:
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+
+    def _add(self, key: str, size: int) -> None:
+        """Index an entry as the most recently used one; the caller holds the lock."""
+        self.total_bytes += size - self._entries.pop(key, 0)
+        self._entries[key] = size
+
+    def _forget(self, key: str) -> None:
+        """Drop an entry that no longer exists from the index."""
+        with self._lock:
+            self.total_bytes -= self._entries.pop(key, 0)
+
+    def _stored(self, key: str, size: int) -> None:
+        """Index a newly written entry, then keep the cache within its cap."""
+        with self._lock:
+            self._add(key, size)
+            self._stores_since_scan += 1
+            rescan = self._stores_since_scan >= AUDIO_CACHE_RESCAN_STORES
+        if rescan:
+            self.rescan()
+        self.evict()
+
+    def rescan(self) -> None:
+        """Rebuild the entry index and size total from the cache directory."""
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(AUDIO_CACHE_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # Evicted by another process meanwhile
+                entries.append((stat.st_mtime_ns, entry.name[:-len(AUDIO_CACHE_SUFFIX)], stat.st_size))
+        with self._lock:
+            self._entries = OrderedDict((key, size) for _, key, size in sorted(entries))
+            self.total_bytes = sum(self._entries.values())
+            self._stores_since_scan = 0
+
+    def evict(self) -> int:
+        """
+        Delete least recently used entries until the cache fits its size cap.
+
+        Returns:
+            Number of entries deleted
+        """
+        removed = 0
+        while True:
+            with self._lock:
+                if self.total_bytes <= self.max_bytes or not self._entries:
+                    break
+                key, size = self._entries.popitem(last=False)
+                self.total_bytes -= size
+            try:
+                self._entry_path(key).unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass  # Evicted by another process meanwhile
+        if removed:
+            logger.debug(f"Evicted {removed} entries from the audio cache")
+        return removed
+
+# Cache objects of this process by (directory, size cap in GB); see DecodedAudioCache.__reduce__
+_process_caches = {}
+
+def _process_cache(cache_dir: str, max_size_gb: float) -> DecodedAudioCache:
+    """The cache object of this process for a directory and size cap."""
+    key = (cache_dir, max_size_gb)
+    if key not in _process_caches:
+        _process_caches[key] = DecodedAudioCache(cache_dir, max_size_gb)
+    return _process_caches[key]
+
+class _EntryWriter:
+    """Spools float32 blocks to disk and turns them into a .npy cache entry."""
+
+    def __init__(self, cache_dir: Path):
+        self._spool = tempfile.TemporaryFile(dir=cache_dir)
+        self.samples = 0
+
+    def append(self, block: np.ndarray) -> None:
+        block = np.ascontiguousarray(block, dtype=np.float32)
+        self._spool.write(block.tobytes())
+        self.samples += len(block)
+
+    def copy_to(self, f) -> None:
+        """Write the spooled blocks to an open file as one .npy array."""
+        np.lib.format.write_array_header_1_0(f, {
+            'descr': np.lib.format.dtype_to_descr(np.dtype(np.float32)),
+            'fortran_order': False,
+            'shape': (self.samples,),
+        })
+        self._spool.seek(0)
+        shutil.copyfileobj(self._spool, f)
+
+    def close(self) -> None:
+        self._spool.close()
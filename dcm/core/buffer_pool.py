@@ -0,0 +1,100 @@
+"""
+Reusable decode buffers for DCM.
+
+An extraction worker decodes thousands of files of different lengths. Giving
+each one a freshly allocated signal makes the allocator hand memory back and
+forth with the OS and fragments the heap, so a long-running worker's footprint
+creeps up. A BufferPool keeps a few float32 buffers alive and hands out views
+of them instead; a buffer grows (in coarse steps) only when a longer file
+comes along, so after the first few files a worker decodes without
+allocating signal memory at all.
+
+Buffers are handed out with acquire() and must be given back with release()
+once nothing refers to their contents any more. The pool is thread-safe, so a
+reader thread can decode into it while the main thread analyzes.
+"""
+
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Buffer capacities are rounded up to a multiple of this many elements (4 MB
+# of float32), so slightly longer files reuse the same buffer
+BUFFER_GRANULARITY = 1 << 20
+
+# Idle buffers kept for reuse; the smallest ones are dropped beyond this
+MAX_IDLE_BUFFERS = 4
+
+class BufferPool:
+    """Pool of preallocated float32 buffers, reused across decodes."""
+
+    def __init__(self, max_idle: int = MAX_IDLE_BUFFERS, dtype=np.float32):
+        """
+        Args:
+            max_idle: Number of released buffers kept for reuse
+            dtype: Element type of the buffers
+        """
+        self.max_idle = max_idle
+        self.dtype = np.dtype(dtype)
+        self._idle: List[np.ndarray] = []
+        self._in_use: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.reuses = 0
+
+    def acquire(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """
+        Get an uninitialized array of the given shape backed by a pooled buffer.
+
+        Args:
+            shape: Shape of the array (an int for 1-D)
+
+        Returns:
+            C-contiguous array of the pool's dtype
+        """
+        shape = (shape,) if isinstance(shape, (int, np.integer)) else tuple(shape)
+        size = int(np.prod(shape, dtype=np.int64))
+        with self._lock:
+            fitting = [i for i, buffer in enumerate(self._idle) if len(buffer) >= size]
+            if fitting:
+                buffer = self._idle.pop(min(fitting, key=lambda i: len(self._idle[i])))
+                self.reuses += 1
+            else:
+                capacity = max(1, -(-size // BUFFER_GRANULARITY)) * BUFFER_GRANULARITY
+                buffer = np.empty(capacity, dtype=self.dtype)
+                self.allocations += 1
+            self._in_use[id(buffer)] = buffer
+        return buffer[:size].reshape(shape)
+
+    def release(self, array: np.ndarray) -> None:
+        """
+        Return the buffer behind an acquired array to the pool.
+
+        Arrays that did not come from this pool are ignored, so callers can
+        release whatever they decoded without tracking where it came from.
+        """
+        buffer = array
+        while isinstance(buffer, np.ndarray) and id(buffer) not in self._in_use and buffer.base is not None:
+            buffer = buffer.base
+        with self._lock:
+            if self._in_use.pop(id(buffer), None) is None:
+                return
+            self._idle.append(buffer)
+            if len(self._idle) > self.max_idle:
+                self._idle.pop(min(range(len(self._idle)), key=lambda i: len(self._idle[i])))
+
+    @property
+    def reserved_mb(self) -> float:
+        """Memory held by the pool (idle and in use) in MB."""
+        with self._lock:
+            buffers = self._idle + list(self._in_use.values())
+        return sum(buffer.nbytes for buffer in buffers) / (1024 * 1024)
+
+    def clear(self) -> None:
+        """Drop all idle buffers."""
+        with self._lock:
+            self._idle.clear()
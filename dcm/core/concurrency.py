@@ -0,0 +1,112 @@
+"""
+Concurrency settings for DCM.
+
+Extraction workers, librosa/numpy (BLAS, OpenMP), numba and scikit-learn each
+start their own threads by default, and stacked together they oversubscribe
+the machine. This module holds the one setting that governs them all, the
+CPU budget, and derives process counts and per-process thread caps from it.
+
+The budget comes from the DCM_CPUS environment variable, or set_cpu_budget(),
+and defaults to the CPUs this process may run on.
+"""
+
+import os
+import sys
+import logging
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Environment variable holding the CPU budget
+CPU_BUDGET_ENV = 'DCM_CPUS'
+
+# Thread-count variables read by BLAS/OpenMP runtimes and numba at import time
+THREAD_ENV_VARS = (
+    'OMP_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'NUMBA_NUM_THREADS',
+)
+
+def available_cpus() -> int:
+    """Number of CPUs this process may run on."""
+    if hasattr(os, 'sched_getaffinity'):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+def cpu_budget() -> int:
+    """
+    Number of CPUs DCM may keep busy.
+
+    Returns:
+        The DCM_CPUS setting if valid, otherwise all available CPUs
+    """
+    value = os.environ.get(CPU_BUDGET_ENV)
+    if value:
+        try:
+            return max(1, int(value))
+        except ValueError:
+            logger.warning(f"Ignoring invalid {CPU_BUDGET_ENV}={value!r}")
+    return available_cpus()
+
+def set_cpu_budget(cpus: Optional[int]) -> None:
+    """
+    Set the CPU budget for this process and the workers it starts.
+
+    Args:
+        cpus: Number of CPUs (None or 0 = all available CPUs)
+    """
+    if cpus:
+        os.environ[CPU_BUDGET_ENV] = str(max(1, cpus))
+    else:
+        os.environ.pop(CPU_BUDGET_ENV, None)
+
+def plan_workers(workers: Optional[int] = 0) -> Tuple[int, int]:
+    """
+    Size a process pool within the CPU budget.
+
+    Args:
+        workers: Requested worker processes (None or 0 = one per budgeted CPU)
+
+    Returns:
+        Tuple of (worker processes, threads per worker)
+    """
+    budget = cpu_budget()
+    if not workers or workers < 1:
+        workers = budget
+    return workers, max(1, budget // workers)
+
+def limit_threads(threads: int) -> None:
+    """
+    Cap the threads that BLAS/OpenMP runtimes and numba use in this process.
+
+    Environment variables cover runtimes that are not loaded yet (and child
+    processes); threadpoolctl and numba.set_num_threads adjust the ones that
+    are already running. numba's thread pool is only capped once something
+    has started it: setting the count starts the pool (TBB by default), which
+    nothing in DCM uses and which makes later fork()ed workers unsafe.
+
+    Args:
+        threads: Maximum threads per runtime
+    """
+    threads = max(1, threads)
+    for name in THREAD_ENV_VARS:
+        if name == 'NUMBA_NUM_THREADS' and 'numba' in sys.modules:
+            continue  # Fixed once numba is imported; set_num_threads below instead
+        os.environ[name] = str(threads)
+
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=threads)
+    except ImportError:
+        logger.debug("threadpoolctl not installed; BLAS threads capped via environment only")
+
+    if 'numba' in sys.modules:
+        import numba
+        try:
+            numba.threading_layer()
+        except ValueError:
+            return  # Thread pool not started
+        numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
@@ -5,15 +5,42 @@ Handles audio feature extraction from music files using librosa.
 
 import os
 import json
+import argparse
 import logging
+import multiprocessing
+import subprocess
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from itertools import chain, islice
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from dcm.core.concurrency import limit_threads, plan_workers, set_cpu_budget
+from dcm.core.jit_cache import configure_jit_cache
+
+# Must run before librosa imports numba, see dcm.core.jit_cache
+configure_jit_cache()
 
 import librosa
 import numpy as np
 import pandas as pd
+import soundfile as sf
+import soxr
 from tqdm import tqdm
 
+from dcm.core.audio_cache import DEFAULT_AUDIO_CACHE_SIZE_GB, DecodedAudioCache
+from dcm.core.buffer_pool import BufferPool
+from dcm.core.feature_cache import FeatureCache
+from dcm.core.feature_store import (
+    FEATURE_STORE_SUFFIX, FeatureJournal, Quarantine, atomic_write, load_feature_store,
+    save_feature_store
+)
+from dcm.core.scanner import ScanCache, scan_files
+from dcm.core.worker_pool import PeakMemoryStats, SupervisedPool, peak_memory_mb, reset_peak_memory
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -31,6 +58,182 @@ HOP_LENGTH = 1024    # Larger hop for efficiency
 N_MFCC = 20          # More MFCCs for better feature representation
 N_CHROMA = 24        # More chroma bins for Indian classical music
 
+# Shorter analysis grid for spectral shape, rhythm and harmonic/percussive separation
+SPECTRAL_N_FFT = 2048
+SPECTRAL_HOP_LENGTH = 512
+
+# Named extraction profiles. 'full' is the original analysis; the others trade
+# sample rate and the expensive rhythm/tonic stages for speed. Profiles without
+# HPSS do not produce the INDIAN_MUSIC_COLUMNS.
+EXTRACTION_PROFILES = {
+    'fast': {
+        'sample_rate': 22050,
+        'n_fft': 2048,
+        'hop_length': 512,
+        'spectral_n_fft': 2048,   # Single analysis grid, so only one STFT
+        'spectral_hop_length': 512,
+        'fmax': 11025,
+        'hpss': False,
+        'beat_tracking': False,   # Tempo from the onset autocorrelation only
+    },
+    'standard': {
+        'sample_rate': 22050,
+        'n_fft': 2048,
+        'hop_length': 512,
+        'spectral_n_fft': 1024,
+        'spectral_hop_length': 256,
+        'fmax': 11025,
+        'hpss': True,
+        'beat_tracking': True,
+    },
+    'full': {
+        'sample_rate': SAMPLE_RATE,
+        'n_fft': N_FFT,
+        'hop_length': HOP_LENGTH,
+        'spectral_n_fft': SPECTRAL_N_FFT,
+        'spectral_hop_length': SPECTRAL_HOP_LENGTH,
+        'fmax': 16000,
+        'hpss': True,
+        'beat_tracking': True,
+    },
+}
+DEFAULT_PROFILE = 'full'
+
+# Length of each window analyzed in excerpt mode (seconds)
+EXCERPT_DURATION = 30.0
+
+# Block length for streaming extraction (seconds); bounds peak memory per track
+STREAM_BLOCK_DURATION = 60.0
+# Trailing blocks shorter than this are folded into the previous block
+MIN_STREAM_BLOCK_DURATION = 5.0
+# Frames of context analyzed on either side of a block (covers the HPSS kernels)
+STREAM_CONTEXT_FRAMES = 32
+
+# Length of the chunks a long track is split into for parallel analysis (seconds)
+CHUNK_DURATION = 300.0
+
+# Base wall-clock budget per file in seconds; a hung decode is killed after
+# this plus FILE_TIMEOUT_PER_MINUTE per minute of audio (see file_timeout)
+FILE_TIMEOUT = 600.0
+
+# Extra wall-clock budget per minute of audio in seconds; the full profile
+# analyzes about 13 s per minute of audio on one core
+FILE_TIMEOUT_PER_MINUTE = 30.0
+
+# Decoded files each worker may hold ahead of analysis in pipelined mode
+PIPELINE_QUEUE_DEPTH = 2
+
+# Dynamic range kept by log-power spectrograms; None keeps power_to_db's
+# absolute floor (amin) only. librosa's default clips 80 dB below the loudest
+# bin of the analyzed signal, which for a streamed block or a chunk is that
+# window's own maximum, so windowed statistics would drift from a full decode
+LOG_POWER_TOP_DB = None
+
+# Frames libsndfile decodes per read into the pooled decode buffers
+DECODE_BLOCK_FRAMES = 1 << 16
+
+# Decode buffers reused across the files this process analyzes
+_decode_buffers = BufferPool()
+
+# Columns that depend on harmonic/percussive separation
+INDIAN_MUSIC_COLUMNS = ['tonic_deviation', 'rhythm_regularity', 'drone_likelihood']
+
+# Feature groups and the version of their computation. Bump a group's version
+# when its output changes: rows extracted with an older version (or without
+# the group) get just that group re-extracted on the next run.
+FEATURE_GROUP_VERSIONS = {
+    'spectral': 1,  # Spectral shape, zero crossing rate, RMS energy
+    'mfcc': 2,      # 2: log-mel spectrogram no longer clipped per window
+    'chroma': 1,
+    'tempo': 2,     # 2: onset envelope no longer clipped per window
+    'indian': 2,    # INDIAN_MUSIC_COLUMNS; only in profiles with HPSS
+}
+
+# Row column holding the version of every group in the row, as JSON
+FEATURE_VERSIONS_COLUMN = 'feature_versions'
+
+# Groups extracted in the first pass of a two-tier extraction; the rest (beat
+# tracking, HPSS, tuning and PLP) are filled in by a background pass
+LIGHT_FEATURE_GROUPS = ['spectral', 'mfcc', 'chroma']
+
+# Scheduling priority (nice increment) of the background pass workers
+BACKFILL_NICENESS = 10
+# Positional arguments of the extraction commands, as attributes of their parsed arguments
+BACKFILL_POSITIONALS = ('input_dir', 'data_dir')
+# Options the background pass inherits, as (flag, attribute of the parsed
+# arguments); each command has only some of them
+BACKFILL_OPTIONS = (
+    ('--output', 'output'), ('--output-dir', 'output_dir'), ('--workers', 'workers'),
+    ('--max-workers', 'max_workers'), ('--cpus', 'cpus'), ('--profile', 'profile'),
+    ('--excerpts', 'excerpts'), ('--excerpt-duration', 'excerpt_duration'),
+    ('--block-duration', 'block_duration'), ('--chunk-threads', 'chunk_threads'),
+    ('--chunk-duration', 'chunk_duration'), ('--cache', 'cache'), ('--audio-cache', 'audio_cache'),
+    ('--audio-cache-size', 'audio_cache_size'), ('--timeout', 'timeout'),
+    ('--timeout-per-minute', 'timeout_per_minute'), ('--memory-limit', 'memory_limit'),
+    ('--queue-depth', 'queue_depth'), ('--combined', 'combined'),
+)
+# Switches the background pass inherits, as (flag, attribute of the parsed arguments)
+BACKFILL_SWITCHES = (('--streaming', 'streaming'), ('--pipelined', 'pipelined'), ('--verbose', 'verbose'))
+
+def profile_groups(profile: str) -> List[str]:
+    """Feature groups an extraction profile produces."""
+    hpss = get_profile(profile)['hpss']
+    return [group for group in FEATURE_GROUP_VERSIONS if group != 'indian' or hpss]
+
+def _resolve_groups(profile: str, groups: Optional[Iterable[str]]) -> List[str]:
+    """Validate requested feature groups; None means every group of the profile."""
+    available = profile_groups(profile)
+    if groups is None:
+        return available
+    groups = set(groups)
+    unknown = groups - set(FEATURE_GROUP_VERSIONS)
+    if unknown:
+        raise ValueError(
+            f"Unknown feature groups: {', '.join(sorted(unknown))}. "
+            f"Choose from: {', '.join(FEATURE_GROUP_VERSIONS)}"
+        )
+    return [group for group in available if group in groups]
+
+def get_profile(name: str) -> Dict[str, Union[int, bool]]:
+    """
+    Look up the settings of a named extraction profile.
+    
+    Args:
+        name: Profile name (one of EXTRACTION_PROFILES)
+        
+    Returns:
+        Dictionary of profile settings
+    """
+    if name not in EXTRACTION_PROFILES:
+        raise ValueError(
+            f"Unknown extraction profile: {name} "
+            f"(choose from {', '.join(EXTRACTION_PROFILES)})"
+        )
+    return EXTRACTION_PROFILES[name]
+
+def iter_audio_files(
+    directory: Union[str, Path],
+    scan_cache: Optional[ScanCache] = None
+) -> Iterator[Path]:
+    """
+    Recursively yield supported audio files in a directory as they are found.
+    
+    The tree is walked once; extensions are matched case-insensitively and
+    files come out in sorted path order.
+    
+    Args:
+        directory: Path to the directory containing audio files
+        scan_cache: Optional cache of directory listings for fast rescans
+        
+    Yields:
+        Path objects to audio files
+    """
+    directory = Path(directory)
+    if not directory.exists() or not directory.is_dir():
+        raise ValueError(f"Directory not found: {directory}")
+    
+    return scan_files(directory, SUPPORTED_FORMATS, scan_cache)
+
 def get_audio_files(directory: Union[str, Path]) -> List[Path]:
     """
     Recursively find all supported audio files in a directory.
@@ -41,22 +244,737 @@ def get_audio_files(directory: Union[str, Path]) -> List[Path]:
     Returns:
         List of Path objects to audio files
     """
-    directory = Path(directory)
-    if not directory.exists() or not directory.is_dir():
-        raise ValueError(f"Directory not found: {directory}")
+    return list(iter_audio_files(directory))
+
+class _SpectralPipeline:
+    """
+    Shared intermediates for analyzing one signal.
+    
+    Each intermediate (STFT, mel spectrogram, onset envelope, harmonic/percussive
+    split) is computed at most once, on first use, and then fed to every feature
+    that needs it. Two resolutions are used: the profile's n_fft/hop_length grid
+    for MFCC and chroma, and its spectral_n_fft/spectral_hop_length grid for
+    spectral shape, rhythm and the harmonic/percussive split.
+    """
     
-    audio_files = []
-    for ext in SUPPORTED_FORMATS:
-        audio_files.extend(directory.rglob(f'*{ext}'))
+    def __init__(self, y: np.ndarray, sr: int, profile: Dict[str, Union[int, bool]]):
+        # Everything downstream stays float32 (complex64 for the STFTs)
+        self.y = np.asarray(y, dtype=np.float32)
+        self.sr = sr
+        self.profile = profile
+        self.n_fft = profile['spectral_n_fft']
+        self.hop_length = profile['spectral_hop_length']
+        self._cache: Dict[tuple, np.ndarray] = {}
+    
+    def _cached(self, key: tuple, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+    
+    def stft(self, n_fft: int, hop_length: int) -> np.ndarray:
+        """Complex STFT of the signal at the given resolution."""
+        return self._cached(
+            ('stft', n_fft, hop_length),
+            lambda: librosa.stft(self.y, n_fft=n_fft, hop_length=hop_length)
+        )
     
-    return sorted(audio_files)
+    def magnitude(self, n_fft: int, hop_length: int) -> np.ndarray:
+        """Magnitude spectrogram at the given resolution."""
+        return self._cached(
+            ('magnitude', n_fft, hop_length),
+            lambda: np.abs(self.stft(n_fft, hop_length))
+        )
+    
+    def power(self, n_fft: int, hop_length: int) -> np.ndarray:
+        """Power spectrogram at the given resolution."""
+        return self._cached(
+            ('power', n_fft, hop_length),
+            lambda: self.magnitude(n_fft, hop_length) ** 2
+        )
+    
+    @cached_property
+    def frequencies(self) -> np.ndarray:
+        """Bin frequencies of the spectral analysis grid, as float32."""
+        # librosa's default float64 frequencies would promote the weighted
+        # spectrogram inside spectral_centroid/bandwidth to float64
+        return librosa.fft_frequencies(sr=self.sr, n_fft=self.n_fft).astype(np.float32)
+    
+    @property
+    def spectrum(self) -> np.ndarray:
+        """Magnitude spectrogram on the spectral analysis grid."""
+        return self.magnitude(self.n_fft, self.hop_length)
+    
+    @property
+    def detail_power(self) -> np.ndarray:
+        """Power spectrogram on the detailed MFCC/chroma grid."""
+        return self.power(self.profile['n_fft'], self.profile['hop_length'])
+    
+    @cached_property
+    def log_mel(self) -> np.ndarray:
+        """Log-power mel spectrogram tuned for Indian instruments."""
+        mel = librosa.feature.melspectrogram(
+            S=self.detail_power,
+            sr=self.sr,
+            n_mels=128,  # More mel bands for better frequency resolution
+            fmin=27.5,   # Lower frequency bound (A0)
+            fmax=self.profile['fmax'],  # Upper frequency bound for Indian instruments
+            htk=True     # Use HTK formula for mel scale
+        )
+        return librosa.power_to_db(mel, top_db=LOG_POWER_TOP_DB)
+    
+    @cached_property
+    def onset_envelope(self) -> np.ndarray:
+        """Onset strength envelope of the full signal."""
+        return self._onset_strength(self.power(self.n_fft, self.hop_length))
+    
+    @cached_property
+    def hpss(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Harmonic and percussive complex spectrograms."""
+        return librosa.decompose.hpss(self.stft(self.n_fft, self.hop_length))
+    
+    @cached_property
+    def harmonic_magnitude(self) -> np.ndarray:
+        """Magnitude spectrogram of the harmonic component."""
+        return np.abs(self.hpss[0])
+    
+    @cached_property
+    def percussive_onset_envelope(self) -> np.ndarray:
+        """Onset strength envelope of the resynthesized percussive component."""
+        # PLP is sensitive to the smoothing introduced by resynthesis, so the
+        # percussive signal is reconstructed once rather than using the masked
+        # spectrogram directly.
+        y_percussive = librosa.istft(
+            self.hpss[1], hop_length=self.hop_length, n_fft=self.n_fft, length=len(self.y)
+        )
+        power = np.abs(librosa.stft(y_percussive, n_fft=self.n_fft, hop_length=self.hop_length)) ** 2
+        return self._onset_strength(power)
+    
+    def _onset_strength(self, power: np.ndarray) -> np.ndarray:
+        mel = librosa.feature.melspectrogram(S=power, sr=self.sr)
+        return librosa.onset.onset_strength(
+            S=librosa.power_to_db(mel, top_db=LOG_POWER_TOP_DB), sr=self.sr, hop_length=self.hop_length
+        )
 
-def extract_features(audio_path: Union[str, Path]) -> Dict[str, Union[float, list]]:
+def _analyze_frames(
+    y: np.ndarray,
+    sr: int,
+    profile: str = DEFAULT_PROFILE,
+    core: Optional[Tuple[int, int]] = None,
+    groups: Optional[Iterable[str]] = None
+) -> Tuple[Dict[str, np.ndarray], Dict[str, float]]:
+    """
+    Compute per-frame descriptors and per-signal values for a mono signal.
+    
+    Args:
+        y: Mono audio signal
+        sr: Sample rate of the signal
+        profile: Name of the extraction profile to use
+        core: Optional (start, end) sample range; only frames centred in it are
+              returned, the rest of the signal just provides context
+        groups: Feature groups to compute (None = all groups of the profile);
+                intermediates only the other groups need are not computed
+        
+    Returns:
+        Tuple of (frames, scalars): frames maps descriptor names to 1-D or
+        2-D (band x frame) arrays, scalars holds tempo and tonic deviation
+    """
+    settings = get_profile(profile)
+    groups = _resolve_groups(profile, groups)
+    pipeline = _SpectralPipeline(y, sr, settings)
+    frame_length = pipeline.n_fft
+    hop_length = pipeline.hop_length
+    frames = {}
+    scalars = {}
+    
+    if 'spectral' in groups:
+        # Spectral features
+        frames['spectral_centroid'] = librosa.feature.spectral_centroid(
+            S=pipeline.spectrum, sr=sr, freq=pipeline.frequencies
+        )[0]
+        frames['spectral_bandwidth'] = librosa.feature.spectral_bandwidth(
+            S=pipeline.spectrum, sr=sr, freq=pipeline.frequencies
+        )[0]
+        
+        # Zero crossing rate
+        frames['zero_crossing_rate'] = librosa.feature.zero_crossing_rate(
+            y, frame_length=frame_length, hop_length=hop_length
+        )[0]
+        
+        # Root Mean Square (Energy)
+        frames['rms'] = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
+    
+    if 'mfcc' in groups:
+        # Enhanced MFCCs for Indian music
+        frames['mfcc'] = librosa.feature.mfcc(S=pipeline.log_mel, n_mfcc=N_MFCC)
+    
+    if 'chroma' in groups:
+        # Enhanced Chroma features for Indian classical music
+        frames['chroma'] = librosa.feature.chroma_stft(
+            S=pipeline.detail_power,
+            sr=sr,
+            n_chroma=N_CHROMA,
+            tuning=0.0,  # Standard tuning
+            norm=2      # Normalize each chroma band
+        )
+    
+    if 'tempo' in groups:
+        # Tempo with Indian music optimization
+        if settings['beat_tracking']:
+            tempo, _ = librosa.beat.beat_track(
+                onset_envelope=pipeline.onset_envelope,
+                sr=sr,
+                hop_length=hop_length,
+                trim=False,
+                start_bpm=80,  # Common starting BPM for Indian music
+                tightness=100   # Tighter tracking for Indian rhythms
+            )
+        else:
+            tempo = librosa.feature.tempo(
+                onset_envelope=pipeline.onset_envelope,
+                sr=sr,
+                hop_length=hop_length,
+                start_bpm=80
+            )
+        scalars['tempo'] = float(np.atleast_1d(tempo)[0])
+    
+    if 'indian' not in groups:
+        return _trim_frames(frames, settings, core), scalars
+    
+    # Indian music specific features
+    try:
+        # Harmonic-percussive source separation
+        harmonic = pipeline.harmonic_magnitude
+        
+        # Tonic detection (approximate for Indian music)
+        tonic_freq = librosa.estimate_tuning(S=harmonic, sr=sr, n_fft=frame_length)
+        
+        # Rhythm features
+        pulse = librosa.beat.plp(
+            onset_envelope=pipeline.percussive_onset_envelope,
+            sr=sr,
+            hop_length=hop_length
+        )
+        
+        # Detect if the music has a drone (common in Indian classical)
+        spectral_flatness = librosa.feature.spectral_flatness(S=harmonic)[0]
+        
+        scalars['tonic_deviation'] = float(tonic_freq)  # Deviation from A4=440Hz
+        frames['rhythm_regularity'] = pulse  # Higher = more regular rhythm
+        frames['drone_likelihood'] = 1 - spectral_flatness  # Lower = more drone-like
+        
+    except Exception as e:
+        logger.warning(f"Could not extract Indian music features: {str(e)}")
+    
+    return _trim_frames(frames, settings, core), scalars
+
+# Descriptors computed on the detailed n_fft/hop_length grid; all others use
+# the spectral grid
+_DETAIL_GRID_DESCRIPTORS = {'mfcc', 'chroma'}
+
+def _trim_frames(
+    frames: Dict[str, np.ndarray],
+    settings: Dict[str, Union[int, bool]],
+    core: Optional[Tuple[int, int]]
+) -> Dict[str, np.ndarray]:
+    """Keep only the frames whose centre lies in the core sample range."""
+    if core is None:
+        return frames
+    trimmed = {}
+    for name, values in frames.items():
+        if name in _DETAIL_GRID_DESCRIPTORS:
+            hop = settings['hop_length']
+        else:
+            hop = settings['spectral_hop_length']
+        first = -(-core[0] // hop)  # ceil
+        last = -(-core[1] // hop)
+        trimmed[name] = values[..., first:last]
+    return trimmed
+
+def _weighted_median(values: List[float], weights: List[float]) -> float:
+    """Median of values where each value counts with the given weight."""
+    order = np.argsort(values)
+    cumulative = np.cumsum(np.asarray(weights, dtype=float)[order])
+    return float(np.asarray(values)[order][np.searchsorted(cumulative, cumulative[-1] / 2)])
+
+class _FeatureStats:
+    """
+    Running feature statistics for one track, built from one or more windows.
+    
+    Per-frame descriptors are kept as counts, means and sums of squared
+    deviations, so windows can be added or merged in any order and still give
+    the same mean/std columns as analyzing the frames in one piece. Per-window
+    values are combined weighted by window duration: tempo by weighted median
+    (robust to octave errors in individual windows), tonic deviation by
+    weighted mean.
+    """
+    
+    # (descriptor, columns, feature group) in output order: 'stats' gives
+    # mean/std columns, 'mean' a single mean column, 'scalar' a combined
+    # per-window value
+    LAYOUT = [
+        ('spectral_centroid', 'stats', 'spectral'),
+        ('spectral_bandwidth', 'stats', 'spectral'),
+        ('zero_crossing_rate', 'stats', 'spectral'),
+        ('rms', 'stats', 'spectral'),
+        ('mfcc', 'stats', 'mfcc'),
+        ('chroma', 'stats', 'chroma'),
+        ('tempo', 'scalar', 'tempo'),
+        ('tonic_deviation', 'scalar', 'indian'),
+        ('rhythm_regularity', 'mean', 'indian'),
+        ('drone_likelihood', 'mean', 'indian'),
+    ]
+    
+    def __init__(self):
+        self.duration = 0.0
+        self.count: Dict[str, int] = {}
+        self.mean: Dict[str, np.ndarray] = {}
+        self.m2: Dict[str, np.ndarray] = {}
+        self.scalars: Dict[str, List[Tuple[float, float]]] = {}
+    
+    def add(self, frames: Dict[str, np.ndarray], scalars: Dict[str, float], duration: float) -> None:
+        """Add the descriptors of one analysis window."""
+        for name, values in frames.items():
+            values = np.atleast_2d(values).astype(np.float64)
+            if values.shape[1] == 0:
+                continue
+            mean = values.mean(axis=1)
+            m2 = ((values - mean[:, None]) ** 2).sum(axis=1)
+            self._combine(name, values.shape[1], mean, m2)
+        for name, value in scalars.items():
+            self.scalars.setdefault(name, []).append((value, duration))
+        self.duration += duration
+    
+    def merge(self, other: '_FeatureStats') -> None:
+        """Merge the statistics of another set of windows into this one."""
+        for name, count in other.count.items():
+            self._combine(name, count, other.mean[name], other.m2[name])
+        for name, votes in other.scalars.items():
+            self.scalars.setdefault(name, []).extend(votes)
+        self.duration += other.duration
+    
+    def _combine(self, name: str, count: int, mean: np.ndarray, m2: np.ndarray) -> None:
+        # Chan et al. parallel update of mean and sum of squared deviations
+        if name not in self.count:
+            self.count[name], self.mean[name], self.m2[name] = count, mean, m2
+            return
+        total = self.count[name] + count
+        delta = mean - self.mean[name]
+        self.mean[name] = self.mean[name] + delta * count / total
+        self.m2[name] = self.m2[name] + m2 + delta ** 2 * self.count[name] * count / total
+        self.count[name] = total
+    
+    def to_features(self, hpss: bool = True) -> Dict[str, float]:
+        """
+        Build the feature columns from the accumulated statistics.
+        
+        Args:
+            hpss: Whether the Indian music group was computed; if it was and
+                  its columns could not be computed they default to 0.0
+        """
+        features = {'duration': self.duration}
+        for name, kind, _ in self.LAYOUT:
+            if kind == 'scalar':
+                if name in self.scalars:
+                    values, weights = zip(*self.scalars[name])
+                    if name == 'tempo':
+                        features[name] = _weighted_median(values, weights)
+                    else:
+                        features[name] = float(np.average(values, weights=weights))
+            elif name in self.count:
+                mean = self.mean[name]
+                std = np.sqrt(self.m2[name] / self.count[name])
+                if kind == 'mean':
+                    features[name] = float(mean[0])
+                elif len(mean) == 1:
+                    features[f'{name}_mean'] = float(mean[0])
+                    features[f'{name}_std'] = float(std[0])
+                else:
+                    for i in range(len(mean)):
+                        features[f'{name}_{i+1}_mean'] = float(mean[i])
+                        features[f'{name}_{i+1}_std'] = float(std[i])
+        if hpss:
+            for column in INDIAN_MUSIC_COLUMNS:
+                features.setdefault(column, 0.0)
+        return features
+
+def _analyze_signal(y: np.ndarray, sr: int, profile: str = DEFAULT_PROFILE) -> Dict[str, float]:
+    """
+    Compute the audio feature columns for a decoded mono signal.
+    
+    Args:
+        y: Mono audio signal
+        sr: Sample rate of the signal
+        profile: Name of the extraction profile to use
+        
+    Returns:
+        Dictionary of feature columns (without file metadata)
+    """
+    stats = _FeatureStats()
+    stats.add(*_analyze_frames(y, sr, profile), librosa.get_duration(y=y, sr=sr))
+    return stats.to_features(hpss=get_profile(profile)['hpss'])
+
+# Length of the synthetic signal used to warm up the JIT-compiled kernels;
+# longer than PLP's 384-frame tempogram window (about 4.5 s on the 256-sample
+# onset grid at 22.05 kHz), so warm-up runs without short-signal warnings
+WARMUP_DURATION = 6.0
+
+# Profiles already warmed up in this process (inherited by forked workers)
+_warmed_profiles = set()
+
+def warm_up(profile: str = DEFAULT_PROFILE) -> float:
+    """
+    Compile (or load from the JIT cache) every numba kernel extraction uses.
+    
+    Runs the full analysis of `profile` on a short synthetic signal, so the
+    first real file does not pay for JIT compilation. Worker processes call
+    this when they start; it does nothing in a process (or a fork of one)
+    that is already warm.
+    
+    Args:
+        profile: Name of the extraction profile to warm up
+        
+    Returns:
+        Seconds spent warming up
+    """
+    if profile in _warmed_profiles:
+        return 0.0
+    started = time.perf_counter()
+    sr = get_profile(profile)['sample_rate']
+    t = np.arange(int(WARMUP_DURATION * sr)) / sr
+    y = 0.3 * np.sin(2 * np.pi * 220.0 * t) + 0.5 * (np.mod(t, 0.5) < 0.01)
+    _analyze_signal(y.astype(np.float32), sr, profile)
+    _warmed_profiles.add(profile)
+    
+    elapsed = time.perf_counter() - started
+    logger.debug(f"Warmed up '{profile}' extraction in {elapsed:.2f}s")
+    return elapsed
+
+def _excerpt_offsets(total_duration: float, excerpts: int, excerpt_duration: float) -> List[float]:
+    """Start times of excerpts spread evenly over a track, one per equal segment."""
+    segment = total_duration / excerpts
+    return [
+        min(max(0.0, (i + 0.5) * segment - excerpt_duration / 2), total_duration - excerpt_duration)
+        for i in range(excerpts)
+    ]
+
+def _load_audio(
+    audio_path: Path,
+    sample_rate: int,
+    offset: float = 0.0,
+    duration: Optional[float] = None
+) -> Tuple[np.ndarray, int]:
+    """
+    Decode (part of) an audio file to mono at the given sample rate.
+    
+    Formats libsndfile reads are decoded into a buffer from _decode_buffers,
+    which the caller hands back with _decode_buffers.release() once it is
+    done with the signal; others are decoded by librosa into a new array.
+    """
+    try:
+        return _read_pooled(audio_path, sample_rate, offset, duration), sample_rate
+    except sf.LibsndfileError:
+        pass
+    
+    # Try loading with different backends if needed
+    try:
+        return librosa.load(audio_path, sr=sample_rate, mono=True, offset=offset, duration=duration)
+    except Exception as e:
+        logger.warning(f"PySoundFile failed. Trying audioread instead.")
+        return librosa.load(
+            audio_path, sr=sample_rate, mono=True, offset=offset, duration=duration,
+            res_type='kaiser_fast'
+        )
+
+def _read_pooled(
+    audio_path: Path,
+    sample_rate: int,
+    offset: float = 0.0,
+    duration: Optional[float] = None
+) -> np.ndarray:
+    """
+    Decode (part of) a file with libsndfile into a pooled float32 buffer.
+    
+    Reads, downmixes and resamples one block at a time, writing straight
+    into the output buffer, so the only full-length array is the pooled
+    output. The result matches librosa.load sample for sample.
+    """
+    with sf.SoundFile(str(audio_path)) as f:
+        native_rate = f.samplerate
+        start = min(int(offset * native_rate), f.frames)
+        frames = f.frames - start
+        if duration is not None:
+            frames = min(frames, int(duration * native_rate))
+        if start:
+            f.seek(start)
+        
+        resampler = None
+        if native_rate != sample_rate:
+            resampler = soxr.ResampleStream(native_rate, sample_rate, 1, dtype='float32', quality='HQ')
+        # librosa.resample's output length, padded with zeros if short
+        length = int(np.ceil(frames * sample_rate / native_rate))
+        y = _decode_buffers.acquire(length)
+        try:
+            block = _decode_buffers.acquire((min(DECODE_BLOCK_FRAMES, max(frames, 1)), f.channels))
+            try:
+                written = read = 0
+                while True:
+                    wanted = min(frames - read, len(block))
+                    raw = f.read(wanted, dtype='float32', always_2d=True, out=block) if wanted else block[:0]
+                    read += len(raw)
+                    last = len(raw) < wanted or read >= frames
+                    mono = raw.mean(axis=1) if f.channels > 1 else raw[:, 0]
+                    if resampler is not None:
+                        mono = resampler.resample_chunk(mono, last=last)
+                    take = min(len(mono), length - written)
+                    y[written:written + take] = mono[:take]
+                    written += take
+                    if last:
+                        break
+                if read < frames:
+                    # The header overstated the length of the audio
+                    length = int(np.ceil(read * sample_rate / native_rate))
+                    written = min(written, length)
+                y[written:length] = 0.0
+            finally:
+                _decode_buffers.release(block)
+        except BaseException:
+            # The caller only releases what it receives
+            _decode_buffers.release(y)
+            raise
+    return y[:length]
+
+def _can_stream(audio_path: Path) -> bool:
+    """Whether libsndfile can read the file, so it can be streamed in blocks."""
+    try:
+        sf.info(str(audio_path))
+        return True
+    except Exception:
+        return False
+
+def _stream_blocks(
+    audio_path: Path,
+    sample_rate: int,
+    block_duration: float = STREAM_BLOCK_DURATION,
+    audio_cache: Optional[DecodedAudioCache] = None,
+    key: Optional[str] = None
+) -> Iterator[np.ndarray]:
+    """
+    Yield consecutive mono blocks of an audio file at the given sample rate.
+    
+    Only one block is decoded at a time, and resampling runs as a continuous
+    stream so there are no discontinuities at block boundaries. With an audio
+    cache, a cached track is read back from its memory-mapped entry instead,
+    and a decoded one is spooled into the cache as it streams by.
+    
+    Args:
+        audio_path: Path to the audio file (any format libsndfile can read)
+        sample_rate: Target sample rate
+        block_duration: Length of each block in seconds
+        audio_cache: Optional decoded-audio cache
+        key: The file's audio cache key, if the caller computed it already
+        
+    Yields:
+        float32 mono blocks
+    """
+    if audio_cache is None:
+        yield from _decode_blocks(audio_path, sample_rate, block_duration)
+        return
+    
+    if key is None:
+        key = audio_cache.key(audio_path, sample_rate)
+    cached = audio_cache.load(key)
+    if cached is not None:
+        block_length = max(1, int(block_duration * sample_rate))
+        for start in range(0, len(cached), block_length):
+            yield cached[start:start + block_length]
+        return
+    with audio_cache.writer(key) as writer:
+        for y in _decode_blocks(audio_path, sample_rate, block_duration):
+            writer.append(y)
+            yield y
+
+def _decode_blocks(audio_path: Path, sample_rate: int, block_duration: float) -> Iterator[np.ndarray]:
+    """Decode a file in consecutive mono blocks; see _stream_blocks."""
+    with sf.SoundFile(str(audio_path)) as f:
+        resampler = None
+        if f.samplerate != sample_rate:
+            resampler = soxr.ResampleStream(f.samplerate, sample_rate, 1, dtype='float32')
+        block_frames = max(1, int(block_duration * f.samplerate))
+        raw = _decode_buffers.acquire((block_frames, f.channels))
+        
+        try:
+            while True:
+                block = f.read(block_frames, dtype='float32', always_2d=True, out=raw)
+                last = len(block) < block_frames
+                y = block.mean(axis=1)
+                if resampler is not None:
+                    y = resampler.resample_chunk(y, last=last)
+                if len(y):
+                    yield y
+                if last:
+                    break
+        finally:
+            _decode_buffers.release(raw)
+
+def _analysis_windows(
+    blocks: Iterator[np.ndarray],
+    core_length: int,
+    context: int,
+    min_tail: int = 0
+) -> Iterator[Tuple[np.ndarray, Tuple[int, int]]]:
+    """
+    Regroup a stream of blocks into overlapping analysis windows.
+    
+    Each window covers a core region plus up to `context` samples on either
+    side. Cores tile the signal without gaps or overlap, so analyzing each
+    window and keeping only the frames centred in its core reproduces the
+    frames of a single full-length analysis. `core_length` and `context`
+    should be multiples of the analysis hop lengths.
+    
+    Args:
+        blocks: Consecutive signal blocks
+        core_length: Length of each core region in samples
+        context: Samples of context kept on either side of a core
+        min_tail: A final core shorter than this is merged into the previous one
+        
+    Yields:
+        (window, (core_start, core_end)) with core bounds relative to the window
+    """
+    buffer = np.zeros(0, dtype=np.float32)
+    buffer_start = 0  # Position of buffer[0] in the whole signal
+    core_start = 0
+    
+    for block in blocks:
+        # A single in-memory signal is windowed without copying it
+        buffer = np.concatenate([buffer, block]) if len(buffer) else block
+        while buffer_start + len(buffer) - core_start >= core_length + context + min_tail:
+            window_start = max(0, core_start - context)
+            window = buffer[window_start - buffer_start:core_start + core_length + context - buffer_start]
+            yield window, (core_start - window_start, core_start - window_start + core_length)
+            core_start += core_length
+            
+            # Drop samples no later window needs
+            keep_from = max(0, core_start - context)
+            buffer = buffer[keep_from - buffer_start:]
+            buffer_start = keep_from
+    
+    if buffer_start + len(buffer) > core_start:
+        window_start = max(0, core_start - context)
+        window = buffer[window_start - buffer_start:]
+        yield window, (core_start - window_start, len(window))
+
+def _window_layout(settings: Dict, duration: float) -> Tuple[int, int, int]:
+    """Core length, context and minimum tail in samples of analysis windows of about `duration` seconds."""
+    # Cores and context on whole multiples of the coarsest hop keep every
+    # window's frames on the same grid as a full-track analysis
+    sample_rate = settings['sample_rate']
+    hop = max(settings['hop_length'], settings['spectral_hop_length'])
+    core_length = max(1, int(duration * sample_rate) // hop) * hop
+    return core_length, STREAM_CONTEXT_FRAMES * hop, int(MIN_STREAM_BLOCK_DURATION * sample_rate)
+
+def _analyze_windows(
+    windows: Iterator[Tuple[np.ndarray, Tuple[int, int]]],
+    sample_rate: int,
+    profile: str,
+    groups: List[str],
+    threads: int = 1
+) -> _FeatureStats:
+    """
+    Analyze analysis windows (see _analysis_windows) and pool their statistics.
+    
+    With several threads, up to `threads` windows are analyzed concurrently
+    (the STFTs, filters and numba kernels release the GIL for most of their
+    run time). Windows are merged in signal order, so the result does not
+    depend on the number of threads, and no more than `threads` windows are
+    held at once.
+    
+    Args:
+        windows: (window, core bounds) pairs
+        sample_rate: Sample rate of the windows
+        profile: Name of the extraction profile
+        groups: Feature groups to compute
+        threads: Number of windows to analyze concurrently
+        
+    Returns:
+        Pooled statistics of all windows
+    """
+    def analyze(window: np.ndarray, core: Tuple[int, int]) -> _FeatureStats:
+        stats = _FeatureStats()
+        stats.add(
+            *_analyze_frames(window, sample_rate, profile, core=core, groups=groups),
+            (core[1] - core[0]) / sample_rate
+        )
+        return stats
+    
+    total = _FeatureStats()
+    if threads <= 1:
+        for window, core in windows:
+            total.merge(analyze(window, core))
+        return total
+    
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='dcm-chunk') as executor:
+        pending = deque()
+        for window, core in windows:
+            pending.append(executor.submit(analyze, window, core))
+            if len(pending) >= threads:
+                total.merge(pending.popleft().result())
+        while pending:
+            total.merge(pending.popleft().result())
+    return total
+
+def extract_features(
+    audio_path: Union[str, Path],
+    profile: str = DEFAULT_PROFILE,
+    excerpts: Optional[int] = None,
+    excerpt_duration: float = EXCERPT_DURATION,
+    streaming: bool = False,
+    block_duration: float = STREAM_BLOCK_DURATION,
+    audio_cache: Optional[DecodedAudioCache] = None,
+    groups: Optional[Iterable[str]] = None,
+    chunk_threads: int = 1,
+    chunk_duration: float = CHUNK_DURATION
+) -> Dict[str, Union[float, list]]:
     """
     Extract audio features from a single audio file with optimizations for Indian music.
     
+    In excerpt mode only `excerpts` windows of `excerpt_duration` seconds,
+    spread evenly over the track, are decoded and analyzed, and their
+    statistics are pooled into the usual feature columns. Tracks shorter than
+    the combined excerpts are analyzed in full.
+    
+    In streaming mode the track is decoded and analyzed in consecutive blocks
+    of `block_duration` seconds, so peak memory stays bounded however long the
+    track is. Mean/std columns match a full decode; tempo, tonic deviation and
+    rhythm regularity (PLP is normalized per block) are combined per block.
+    Formats libsndfile cannot stream fall back to a full decode.
+    
+    With an audio cache, the decoded signal is read from the cache when the
+    file was decoded at this sample rate before, and stored in it otherwise.
+    Excerpts of a cached track are cut from the cached signal.
+    
+    Features are computed in groups (see FEATURE_GROUP_VERSIONS), and the
+    version of every computed group is recorded in the feature_versions
+    column, so a later run can recompute just the groups that changed.
+    
+    With `chunk_threads` above 1, a track at least two chunks long is split
+    into overlapping chunks of `chunk_duration` seconds that are analyzed on
+    that many threads, so one very long recording uses several CPUs. The
+    chunk statistics are pooled like streaming blocks: mean/std columns match
+    a single-threaded analysis, tempo and the other per-chunk values are
+    combined by chunk duration. In streaming mode the blocks themselves are
+    analyzed on the chunk threads.
+    
     Args:
         audio_path: Path to the audio file
+        profile: Name of the extraction profile ('fast', 'standard' or 'full')
+        excerpts: Number of excerpts to analyze (None = analyze the whole track)
+        excerpt_duration: Length of each excerpt in seconds
+        streaming: Analyze the track block by block with bounded memory
+        block_duration: Length of each streaming block in seconds
+        audio_cache: Optional cache of decoded signals (see dcm.core.audio_cache)
+        groups: Feature groups to compute (None = all groups of the profile)
+        chunk_threads: Threads to analyze chunks of one long track on
+        chunk_duration: Length of each chunk in seconds
         
     Returns:
         Dictionary containing extracted features
@@ -64,137 +982,913 @@ def extract_features(audio_path: Union[str, Path]) -> Dict[str, Union[float, lis
     audio_path = Path(audio_path)
     if not audio_path.exists():
         raise FileNotFoundError(f"Audio file not found: {audio_path}")
-    
-    features = {
-        'file_path': str(audio_path),
-        'file_name': audio_path.name,
-        'file_extension': audio_path.suffix.lower(),
-        'file_size_mb': os.path.getsize(audio_path) / (1024 * 1024)  # Convert to MB
-    }
+    _resolve_groups(profile, groups)
     
     try:
-        # Try loading with different backends if needed
+        return _compute_features(
+            audio_path, profile, excerpts, excerpt_duration, streaming, block_duration, audio_cache, groups,
+            chunk_threads, chunk_duration
+        )
+    except Exception as e:
+        logger.error(f"Error processing {audio_path}: {str(e)}")
+        return {}
+
+def _decode(
+    audio_path: Path,
+    profile: str,
+    excerpts: Optional[int],
+    excerpt_duration: float,
+    streaming: bool,
+    audio_cache: Optional[DecodedAudioCache] = None
+) -> Tuple[Optional[List[Tuple[np.ndarray, int]]], Optional[float], Optional[str]]:
+    """
+    Decode stage of feature extraction.
+    
+    Returns:
+        Tuple of (decoded segments to analyze, or None when the track will be
+        streamed by the analysis stage; track duration when only excerpts
+        were decoded, else None; the file's audio cache key, so the analysis
+        stage does not fingerprint the file again, or None without a cache)
+    """
+    sample_rate = get_profile(profile)['sample_rate']
+    
+    cached = key = None
+    if audio_cache is not None:
+        key = audio_cache.key(audio_path, sample_rate)
+        cached = audio_cache.load(key)
+    
+    track_duration = None
+    if excerpts and cached is not None:
+        track_duration = len(cached) / sample_rate
+    elif excerpts:
         try:
-            y, sr = librosa.load(audio_path, sr=SAMPLE_RATE, mono=True)
+            track_duration = librosa.get_duration(path=audio_path)
         except Exception as e:
-            logger.warning(f"PySoundFile failed. Trying audioread instead.")
-            y, sr = librosa.load(audio_path, sr=SAMPLE_RATE, mono=True, res_type='kaiser_fast')
+            logger.warning(f"Could not read duration of {audio_path}, analyzing full track: {e}")
+    
+    if track_duration and track_duration > excerpts * excerpt_duration and cached is not None:
+        excerpt_length = int(excerpt_duration * sample_rate)
+        segments = [
+            (cached[int(offset * sample_rate):][:excerpt_length], sample_rate)
+            for offset in _excerpt_offsets(track_duration, excerpts, excerpt_duration)
+        ]
+        return segments, track_duration, key
+    if track_duration and track_duration > excerpts * excerpt_duration:
+        # Excerpts of an uncached track are decoded on their own and not cached
+        segments = []
+        try:
+            for offset in _excerpt_offsets(track_duration, excerpts, excerpt_duration):
+                segments.append(_load_audio(audio_path, sample_rate, offset=offset, duration=excerpt_duration))
+        except BaseException:
+            _release_segments(segments)
+            raise
+        return segments, track_duration, key
+    if streaming and (cached is not None or _can_stream(audio_path)):
+        return None, None, key
+    if streaming:
+        logger.warning(f"Cannot stream {audio_path.suffix} files, decoding {audio_path.name} in full")
+    if cached is not None:
+        return [(cached, sample_rate)], None, key
+    
+    y, sr = _load_audio(audio_path, sample_rate)
+    if audio_cache is not None:
+        try:
+            audio_cache.store(key, y)
+        except BaseException:
+            _decode_buffers.release(y)
+            raise
+    return [(y, sr)], None, key
+
+def _release_segments(segments: List[Tuple[np.ndarray, int]]) -> None:
+    """Hand the buffers of decoded segments back to the decode buffer pool."""
+    for y, _ in segments:
+        _decode_buffers.release(y)
+
+def _analyze(
+    audio_path: Path,
+    segments: Optional[List[Tuple[np.ndarray, int]]],
+    track_duration: Optional[float],
+    audio_key: Optional[str],
+    profile: str,
+    block_duration: float,
+    audio_cache: Optional[DecodedAudioCache] = None,
+    groups: Optional[Iterable[str]] = None,
+    chunk_threads: int = 1,
+    chunk_duration: float = CHUNK_DURATION
+) -> Dict[str, Union[float, list]]:
+    """
+    Analysis stage of feature extraction: compute features from decoded segments.
+    
+    Takes ownership of the segments: their buffers go back to the decode
+    buffer pool however the analysis ends.
+    """
+    try:
+        settings = get_profile(profile)
+        sample_rate = settings['sample_rate']
+        groups = _resolve_groups(profile, groups)
         
-        # Extract features
-        features = {}
+        stats = _FeatureStats()
+        if segments is not None:
+            core_length, context, min_tail = _window_layout(settings, chunk_duration)
+            for y, sr in segments:
+                if chunk_threads > 1 and len(y) >= 2 * core_length:
+                    windows = _analysis_windows(iter([y]), core_length, context, min_tail)
+                    stats.merge(_analyze_windows(windows, sr, profile, groups, chunk_threads))
+                else:
+                    stats.add(*_analyze_frames(y, sr, profile, groups=groups), librosa.get_duration(y=y, sr=sr))
+            if track_duration:
+                stats.duration = track_duration
+        else:
+            windows = _analysis_windows(
+                _stream_blocks(audio_path, sample_rate, block_duration, audio_cache, audio_key),
+                *_window_layout(settings, block_duration)
+            )
+            stats = _analyze_windows(windows, sample_rate, profile, groups, chunk_threads)
+    finally:
+        if segments is not None:
+            _release_segments(segments)
+    
+    # Extract features
+    features = stats.to_features(hpss='indian' in groups)
+    features['extraction_profile'] = profile
+    features[FEATURE_VERSIONS_COLUMN] = json.dumps({group: FEATURE_GROUP_VERSIONS[group] for group in groups})
+    
+    # Add file metadata
+    features['file_path'] = str(audio_path.resolve())
+    features['file_name'] = audio_path.name
+    features['file_extension'] = audio_path.suffix.lower()
+    features['file_size_mb'] = os.path.getsize(audio_path) / (1024 * 1024)
+    
+    return features
+
+def _compute_features(
+    audio_path: Path,
+    profile: str,
+    excerpts: Optional[int],
+    excerpt_duration: float,
+    streaming: bool,
+    block_duration: float,
+    audio_cache: Optional[DecodedAudioCache] = None,
+    groups: Optional[Iterable[str]] = None,
+    chunk_threads: int = 1,
+    chunk_duration: float = CHUNK_DURATION
+) -> Dict[str, Union[float, list]]:
+    """Body of extract_features; raises instead of returning an empty result."""
+    segments, track_duration, audio_key = _decode(
+        audio_path, profile, excerpts, excerpt_duration, streaming, audio_cache
+    )
+    return _analyze(
+        audio_path, segments, track_duration, audio_key, profile, block_duration, audio_cache, groups,
+        chunk_threads, chunk_duration
+    )
+
+def excerpt_drift_report(
+    audio_files: List[Union[str, Path]],
+    profile: str = DEFAULT_PROFILE,
+    excerpts: int = 3,
+    excerpt_duration: float = EXCERPT_DURATION
+) -> pd.DataFrame:
+    """
+    Measure how far excerpt-based features drift from full-track analysis.
+    
+    Each file is analyzed both ways; the report has one row per feature
+    column with the mean and maximum absolute difference, and the mean and
+    maximum difference relative to the spread of that column across files.
+    
+    Args:
+        audio_files: Files to compare on (a representative sample is enough)
+        profile: Name of the extraction profile to use
+        excerpts: Number of excerpts per track
+        excerpt_duration: Length of each excerpt in seconds
         
-        # Basic features
-        features['duration'] = librosa.get_duration(y=y, sr=sr)
+    Returns:
+        DataFrame indexed by feature column
+    """
+    full_rows, excerpt_rows = [], []
+    full_time = excerpt_time = 0.0
+    for audio_file in tqdm(audio_files, desc="Comparing excerpt analysis"):
+        started = time.perf_counter()
+        full = extract_features(audio_file, profile)
+        full_time += time.perf_counter() - started
         
-        # Spectral features
-        spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)
-        features['spectral_centroid_mean'] = float(np.mean(spectral_centroid))
-        features['spectral_centroid_std'] = float(np.std(spectral_centroid))
+        started = time.perf_counter()
+        partial = extract_features(audio_file, profile, excerpts, excerpt_duration)
+        excerpt_time += time.perf_counter() - started
         
-        spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)
-        features['spectral_bandwidth_mean'] = float(np.mean(spectral_bandwidth))
-        features['spectral_bandwidth_std'] = float(np.std(spectral_bandwidth))
+        if full and partial:
+            full_rows.append(full)
+            excerpt_rows.append(partial)
+    
+    if not full_rows:
+        return pd.DataFrame()
+    
+    full_df = pd.DataFrame(full_rows).select_dtypes(include='number')
+    full_df = full_df.drop(columns=['duration', 'file_size_mb'], errors='ignore')
+    excerpt_df = pd.DataFrame(excerpt_rows)[full_df.columns]
+    
+    difference = (excerpt_df - full_df).abs()
+    spread = full_df.std(ddof=0).where(lambda scale: scale > 0, full_df.abs().mean()).replace(0, 1)
+    relative = difference / spread
+    
+    logger.info(
+        f"Excerpt analysis of {len(full_rows)} files took {excerpt_time:.1f}s "
+        f"vs {full_time:.1f}s for full tracks ({full_time / max(excerpt_time, 1e-9):.1f}x faster)"
+    )
+    
+    return pd.DataFrame({
+        'mean_abs_diff': difference.mean(),
+        'max_abs_diff': difference.max(),
+        'mean_rel_diff': relative.mean(),
+        'max_rel_diff': relative.max(),
+    }).sort_values('mean_rel_diff', ascending=False)
+
+def estimate_duration(audio_path: Union[str, Path]) -> float:
+    """
+    Cheaply estimate the duration of an audio file without decoding it.
+    
+    Reads the duration from the file header when libsndfile understands the
+    format and falls back to a size-based estimate (assuming ~128 kbps) otherwise.
+    
+    Args:
+        audio_path: Path to the audio file
         
-        # Zero crossing rate
-        zcr = librosa.feature.zero_crossing_rate(y)
-        features['zero_crossing_rate_mean'] = float(np.mean(zcr))
-        features['zero_crossing_rate_std'] = float(np.std(zcr))
+    Returns:
+        Estimated duration in seconds
+    """
+    try:
+        return float(sf.info(str(audio_path)).duration)
+    except Exception:
+        try:
+            return os.path.getsize(audio_path) / (128 * 1024 / 8)
+        except OSError:
+            return 0.0
+
+def file_timeout(
+    audio_path: Union[str, Path],
+    timeout: Optional[float] = FILE_TIMEOUT,
+    timeout_per_minute: float = FILE_TIMEOUT_PER_MINUTE,
+    duration: Optional[float] = None
+) -> Optional[float]:
+    """
+    Wall-clock budget of one file, scaled with its length.
+    
+    A flat budget either kills long recordings (a 3-hour concert takes far
+    longer than a song) or leaves a hung short file running for hours, so
+    the budget is a base plus an allowance per minute of audio, with the
+    duration read cheaply from the header (see estimate_duration).
+    
+    Args:
+        audio_path: Path to the audio file
+        timeout: Base budget in seconds (None = unlimited)
+        timeout_per_minute: Extra budget per minute of audio in seconds
+        duration: The file's estimated duration in seconds, if already known
         
-        # Root Mean Square (Energy)
-        rms = librosa.feature.rms(y=y)
-        features['rms_mean'] = float(np.mean(rms))
-        features['rms_std'] = float(np.std(rms))
+    Returns:
+        Budget in seconds, or None if unlimited
+    """
+    if not timeout:
+        return None
+    if duration is None:
+        duration = estimate_duration(audio_path)
+    return timeout + timeout_per_minute * duration / 60
+
+# Defaults of the extract_features keyword arguments, for _extract_worker
+EXTRACT_DEFAULTS = {
+    'profile': DEFAULT_PROFILE,
+    'excerpts': None,
+    'excerpt_duration': EXCERPT_DURATION,
+    'streaming': False,
+    'block_duration': STREAM_BLOCK_DURATION,
+    'audio_cache': None,
+    'groups': None,
+    'chunk_threads': 1,
+    'chunk_duration': CHUNK_DURATION,
+}
+
+def _extract_worker(
+    audio_path: str,
+    options: Dict[str, object]
+) -> Dict[str, Union[float, list]]:
+    """Worker process entry point: extract features for one file, raising on failure."""
+    options = dict(EXTRACT_DEFAULTS, **options)
+    return _compute_features(
+        Path(audio_path), options['profile'], options['excerpts'], options['excerpt_duration'],
+        options['streaming'], options['block_duration'], options['audio_cache'], options['groups'],
+        options['chunk_threads'], options['chunk_duration']
+    )
+
+def _init_worker(profile: str, threads: int, niceness: int = 0) -> None:
+    """Pool worker initializer: lower the priority, cap library threads, then warm up."""
+    if niceness:
+        os.nice(niceness)
+    limit_threads(threads)
+    warm_up(profile)
+
+def _decode_worker(audio_path: str, options: Dict[str, object]):
+    """Pipelined worker, decode stage (runs ahead in the worker's reader thread)."""
+    options = dict(EXTRACT_DEFAULTS, **options)
+    return _decode(
+        Path(audio_path), options['profile'], options['excerpts'], options['excerpt_duration'],
+        options['streaming'], options['audio_cache']
+    )
+
+def _analyze_worker(decoded, audio_path: str, options: Dict[str, object]) -> Dict[str, Union[float, list]]:
+    """Pipelined worker, analysis stage: compute features from a decoded file."""
+    options = dict(EXTRACT_DEFAULTS, **options)
+    return _analyze(
+        Path(audio_path), *decoded, options['profile'], options['block_duration'], options['audio_cache'],
+        options['groups'], options['chunk_threads'], options['chunk_duration']
+    )
+
+# Number of upcoming files ordered longest-first when scheduling on a pool
+SCHEDULE_WINDOW = 256
+
+def _longest_first(
+    audio_files: Iterable[Path],
+    window: int = SCHEDULE_WINDOW,
+    durations: Optional[Dict[str, float]] = None
+) -> Iterator[Path]:
+    """
+    Reorder files longest-first within consecutive windows of `window` files.
+    
+    Args:
+        audio_files: Files to reorder; may be a lazy iterable
+        window: Number of upcoming files ordered at a time
+        durations: Filled with the estimated duration of every file, by path
+            string, so the file's budget does not read its header again
         
-        # Enhanced MFCCs for Indian music
-        mfcc = librosa.feature.mfcc(
-            y=y, 
-            sr=sr, 
-            n_mfcc=N_MFCC,
-            n_fft=N_FFT,
-            hop_length=HOP_LENGTH,
-            n_mels=128,  # More mel bands for better frequency resolution
-            fmin=27.5,   # Lower frequency bound (A0)
-            fmax=16000,  # Upper frequency bound for Indian instruments
-            htk=True     # Use HTK formula for mel scale
-        )
-        for i in range(N_MFCC):
-            features[f'mfcc_{i+1}_mean'] = float(np.mean(mfcc[i]))
-            features[f'mfcc_{i+1}_std'] = float(np.std(mfcc[i]))
+    Yields:
+        The files, longest first within each window
+    """
+    if durations is None:
+        durations = {}
+    audio_files = iter(audio_files)
+    while True:
+        batch = list(islice(audio_files, window))
+        if not batch:
+            return
+        for audio_file in batch:
+            durations[str(audio_file)] = estimate_duration(audio_file)
+        yield from sorted(batch, key=lambda audio_file: durations[str(audio_file)], reverse=True)
+
+def _extract_files(
+    audio_files: Iterable[Path],
+    workers: int = 1,
+    timeout: Optional[float] = None,
+    timeout_per_minute: float = FILE_TIMEOUT_PER_MINUTE,
+    memory_limit_mb: Optional[float] = None,
+    pipelined: bool = False,
+    queue_depth: int = PIPELINE_QUEUE_DEPTH,
+    file_options: Optional[Callable[[Path], Dict[str, object]]] = None,
+    niceness: int = 0,
+    **options
+) -> Iterator[Tuple[Path, Dict[str, Union[float, list]], Optional[str]]]:
+    """
+    Extract features for a list of files, yielding results as they complete.
+    
+    Files run in a supervised worker pool whenever there is more than one
+    worker or a budget is set: a file that runs longer than its wall-clock
+    budget (`timeout` plus `timeout_per_minute` per minute of audio, see
+    file_timeout) or grows its worker beyond `memory_limit_mb` is
+    abandoned, and the worker is killed and replaced. Each worker compiles or loads the numba kernels
+    once when it starts (see warm_up). With several workers files are submitted
+    longest-first (within a window of upcoming files, so a lazily scanned
+    list can be consumed as it grows), so a single long recording does not
+    end up running alone at the end of the batch.
+    
+    In pipelined mode every worker reads and decodes upcoming files in a
+    background thread, up to `queue_depth` files ahead, while it analyzes the
+    current one, so I/O overlaps with the feature computation. Stage timings
+    are logged at the end to show whether decoding or analysis is the
+    bottleneck.
+    
+    Decoded signals go into float32 buffers that each process reuses from
+    file to file (see dcm.core.buffer_pool), and the peak resident memory of
+    every file is logged at debug level and summarized at the end.
+    
+    With a `chunk_threads` option of 0, each worker analyzes long tracks in
+    chunks on as many threads as its share of the CPU budget (see
+    extract_features); the library thread cap is divided among the chunk
+    threads so the budget is not oversubscribed.
+    
+    Args:
+        audio_files: Files to analyze; may be a lazy iterable
+        workers: Number of worker processes (0 = one per CPU in the budget,
+            see dcm.core.concurrency); BLAS/numba threads are capped so
+            workers times threads fits the CPU budget
+        timeout: Base wall-clock budget per file in seconds (None = unlimited)
+        timeout_per_minute: Extra wall-clock budget per minute of audio in seconds
+        memory_limit_mb: Memory budget per worker in MB (None = unlimited)
+        pipelined: Overlap decoding of upcoming files with analysis
+        queue_depth: Decoded files each worker may hold ahead of analysis
+        file_options: Optional function giving per-file overrides of `options`
+        niceness: Run the workers at this lower scheduling priority (nice increment)
+        **options: Keyword arguments passed on to extract_features
         
-        # Enhanced Chroma features for Indian classical music
-        chroma = librosa.feature.chroma_stft(
-            y=y,
-            sr=sr,
-            n_chroma=N_CHROMA,
-            n_fft=N_FFT,
-            hop_length=HOP_LENGTH,
-            tuning=0.0,  # Standard tuning
-            norm=2      # Normalize each chroma band
+    Yields:
+        (audio_file, features, error) tuples in completion order; features
+        are empty and error describes the failure when a file failed
+    """
+    workers, threads = plan_workers(workers)
+    if options.get('chunk_threads') == 0:
+        options['chunk_threads'] = threads
+    threads = max(1, threads // max(1, options.get('chunk_threads', 1)))
+    if workers <= 1 and not timeout and not memory_limit_mb and not pipelined and not niceness:
+        limit_threads(threads)
+        peak_memory = PeakMemoryStats()
+        for audio_file in audio_files:
+            reset_peak_memory()
+            try:
+                file_opts = dict(options, **file_options(audio_file)) if file_options else options
+                features, error = _extract_worker(str(audio_file), file_opts), None
+            except Exception as e:
+                logger.error(f"Error processing {audio_file}: {str(e)}")
+                features, error = {}, f"{type(e).__name__}: {e}"
+            peak_memory.add(audio_file, peak_memory_mb())
+            yield audio_file, features, error
+        if peak_memory.tasks:
+            logger.info(f"Peak memory: {peak_memory.report()}")
+        return
+    
+    # Nothing to extract (e.g. a re-run over an up-to-date library): skip
+    # the warm-up and the worker processes altogether
+    # Durations estimated for scheduling, kept until the file's budget is set
+    durations = {}
+    schedule = iter(_longest_first(audio_files, durations=durations) if workers > 1 else audio_files)
+    first = next(schedule, None)
+    if first is None:
+        return
+    schedule = chain([first], schedule)
+    
+    by_path = {}
+    profile = options.get('profile', DEFAULT_PROFILE)
+    if multiprocessing.get_start_method() == 'fork':
+        # Warm up once here; forked workers inherit the compiled kernels
+        warm_up(profile)
+    budget = None
+    if timeout:
+        def budget(key):
+            return file_timeout(key, timeout, timeout_per_minute, durations.pop(key, None))
+    if workers > 1:
+        logger.info(f"Extracting with {workers} worker processes, {threads} threads each")
+    if pipelined:
+        pool = SupervisedPool(
+            _analyze_worker, workers, timeout=budget, memory_limit_mb=memory_limit_mb,
+            initializer=_init_worker, initargs=(profile, threads, niceness),
+            prepare=_decode_worker, queue_depth=queue_depth
         )
-        for i in range(chroma.shape[0]):
-            features[f'chroma_{i+1}_mean'] = float(np.mean(chroma[i, :]))
-            features[f'chroma_{i+1}_std'] = float(np.std(chroma[i, :]))
-        
-        # Tempo with Indian music optimization
-        tempo, _ = librosa.beat.beat_track(
-            y=y,
-            sr=sr,
-            trim=False,
-            start_bpm=80,  # Common starting BPM for Indian music
-            tightness=100   # Tighter tracking for Indian rhythms
+    else:
+        pool = SupervisedPool(
+            _extract_worker, workers, timeout=budget, memory_limit_mb=memory_limit_mb,
+            initializer=_init_worker, initargs=(profile, threads, niceness)
         )
-        features['tempo'] = float(tempo)
-        
-        # Indian music specific features
+    
+    def tasks():
+        for audio_file in schedule:
+            by_path[str(audio_file)] = audio_file
+            file_opts = dict(options, **file_options(audio_file)) if file_options else options
+            yield str(audio_file), (str(audio_file), file_opts)
+    
+    for audio_path, features, error in pool.imap_unordered(tasks()):
+        if error is not None:
+            logger.error(f"Error processing {audio_path}: {error}")
+        yield by_path[audio_path], features or {}, error
+    
+    if pipelined:
+        logger.info(f"Pipeline stages (decode = prepare, analysis = compute): {pool.bottleneck_report()}")
+    if pool.peak_memory.tasks:
+        logger.info(f"Peak worker memory: {pool.peak_memory.report()}")
+
+def _row_profile(row: Dict) -> str:
+    """Return the extraction profile a feature row was produced with."""
+    profile = row.get('extraction_profile')
+    if not isinstance(profile, str):  # Missing column or NaN from CSV
+        return 'full'
+    return profile
+
+# A column of each feature group, used to tell which groups a row from before
+# feature versioning has
+_GROUP_PROBE_COLUMNS = {
+    'spectral': 'spectral_centroid_mean',
+    'mfcc': 'mfcc_1_mean',
+    'chroma': 'chroma_1_mean',
+    'tempo': 'tempo',
+    'indian': 'tonic_deviation',
+}
+
+def _row_versions(row: Dict) -> Dict[str, int]:
+    """Return the version of every feature group in a row."""
+    versions = row.get(FEATURE_VERSIONS_COLUMN)
+    if isinstance(versions, str):  # Missing column or NaN from CSV otherwise
         try:
-            # Harmonic-percussive source separation
-            y_harmonic, y_percussive = librosa.effects.hpss(y)
-            
-            # Tonic detection (approximate for Indian music)
-            tonic_freq = librosa.estimate_tuning(y=y_harmonic, sr=sr)
-            features['tonic_deviation'] = float(tonic_freq)  # Deviation from A4=440Hz
+            return json.loads(versions)
+        except ValueError:
+            pass
+    # Rows written before feature versioning hold version 1 of the groups they have
+    return {
+        group: 1 for group, column in _GROUP_PROBE_COLUMNS.items()
+        if column in row and pd.notna(row[column])
+    }
+
+def _outdated_groups(row: Dict, profile: str) -> List[str]:
+    """Feature groups of a profile that a row lacks or holds an older version of."""
+    versions = _row_versions(row)
+    return [
+        group for group in profile_groups(profile)
+        if versions.get(group, 0) < FEATURE_GROUP_VERSIONS[group]
+    ]
+
+def _merge_groups(row: Dict, update: Dict) -> Dict:
+    """Merge freshly extracted feature groups (and file metadata) into an existing row."""
+    versions = _row_versions(row)
+    versions.update(_row_versions(update))
+    merged = dict(row)
+    merged.update(update)
+    merged[FEATURE_VERSIONS_COLUMN] = json.dumps(
+        {group: versions[group] for group in FEATURE_GROUP_VERSIONS if group in versions}
+    )
+    return merged
+
+def _merge_rows(features_list: List[Dict], new_rows: List[Dict]) -> List[Dict]:
+    """Replace rows with matching file paths and append the rest."""
+    merged = list(features_list)
+    positions = {row.get('file_path'): i for i, row in enumerate(merged)}
+    for row in new_rows:
+        if row['file_path'] in positions:
+            merged[positions[row['file_path']]] = row
+        else:
+            positions[row['file_path']] = len(merged)
+            merged.append(row)
+    return merged
+
+class _DirectoryJob:
+    """
+    Extraction state of one input directory and its output file.
+    
+    Loads the existing output and journal, decides which scanned files need
+    extracting, records results as they arrive and writes the final output.
+    """
+    
+    def __init__(
+        self,
+        input_dir: Path,
+        output_file: Optional[Union[str, Path]],
+        force: bool,
+        profile: str,
+        cache: Optional[FeatureCache] = None,
+        groups: Optional[List[str]] = None
+    ):
+        self.input_dir = input_dir
+        self.output_file = output_file
+        self.force = force
+        self.profile = profile
+        self.cache = cache
+        self.groups = _resolve_groups(profile, groups) if groups is not None else None
+        
+        # Check if output file exists and load it if force is False
+        self.features_list = []
+        if output_file and Path(output_file).exists() and not force:
+            try:
+                self.features_list = load_features(output_file).to_dict('records')
+                logger.info(f"Loaded {len(self.features_list)} existing features from {output_file}")
+            except Exception as e:
+                logger.warning(f"Error loading existing features: {e}")
+                self.features_list = []
+        
+        # Resume from the journal of an interrupted run
+        self.journal = FeatureJournal.for_output(output_file) if output_file else None
+        self.resumed_files = set()
+        if self.journal is not None and self.journal.exists():
+            if force:
+                self.journal.remove()
+            else:
+                resumed = self.journal.read()
+                self.features_list = _merge_rows(self.features_list, resumed)
+                self.resumed_files = {f['file_path'] for f in resumed}
+                logger.info(f"Resuming interrupted run: {len(resumed)} features recovered from journal")
+        
+        # Rows written before profiles existed were extracted with 'full'
+        self.existing_files = {
+            f['file_path'] for f in self.features_list
+            if _row_profile(f) == profile
+        }
+        self.existing_rows = {f['file_path']: f for f in self.features_list}
+        
+        self.quarantine = Quarantine.for_output(output_file)
+        self.scan_cache = ScanCache.for_output(output_file)
+        self.fingerprints = {}
+        self.seen_paths = set()
+        self.deltas = {}
+        self.reused = []
+        self.results = {}
+        self.order = {}
+        self.skipped_count = 0
+        self.quarantined_count = 0
+        self.processed_count = 0
+        self.updated_count = 0
+        self.error_count = 0
+        self.scan_complete = False
+    
+    @property
+    def done(self) -> bool:
+        """Whether the scan has finished and every submitted file has a result."""
+        return self.scan_complete and len(self.order) == self.processed_count + self.error_count
+    
+    def pending_files(self) -> Iterator[Path]:
+        """
+        Scan the directory and yield the files that need extracting.
+        
+        Files that were extracted before but lack feature groups, or hold an
+        outdated version of some, are yielded too; only those groups are
+        computed for them (see task_options) and merged into their rows.
+        """
+        cache = self.cache
+        for audio_file in iter_audio_files(self.input_dir, self.scan_cache):
+            file_path = str(audio_file.resolve())
+            self.seen_paths.add(file_path)
             
-            # Rhythm features
-            onset_env = librosa.onset.onset_strength(y=y_percussive, sr=sr)
-            pulse = librosa.beat.plp(onset_envelope=onset_env, sr=sr)
-            features['rhythm_regularity'] = float(np.mean(pulse))  # Higher = more regular rhythm
+            if cache is None:
+                # Skip files that were already processed
+                if file_path in self.existing_files:
+                    row = self.existing_rows[file_path]
+                    if not self._needs_delta(audio_file, row):
+                        self.skipped_count += 1
+                        continue
+            else:
+                # Reuse cached features for unchanged content, wherever it lives now
+                known = cache.has_file(file_path)
+                if self.force:
+                    cached, fingerprint = None, cache.fingerprint(file_path)
+                else:
+                    cached, fingerprint = cache.lookup(file_path, self.profile)
+                self.fingerprints[file_path] = fingerprint
+                
+                if (cached is None and (not known or file_path in self.resumed_files)
+                        and file_path in self.existing_files):
+                    # Adopt rows from an output written before the cache existed, or
+                    # recovered from the journal before they reached the cache
+                    cached = self.existing_rows[file_path]
+                    cache.store(fingerprint, self.profile, cached)
+                
+                if cached is not None and not self._needs_delta(audio_file, cached):
+                    self.reused.append(cached)
+                    self.skipped_count += 1
+                    continue
             
-            # Detect if the music has a drone (common in Indian classical)
-            spectral_flatness = librosa.feature.spectral_flatness(y=y_harmonic)
-            features['drone_likelihood'] = float(np.mean(1 - spectral_flatness))  # Lower = more drone-like
+            # Skip files that failed on an earlier run and have not changed since
+            if not self.force and file_path in self.quarantine:
+                self.quarantined_count += 1
+                continue
             
-        except Exception as e:
-            logger.warning(f"Could not extract Indian music features: {str(e)}")
-            features.update({
-                'tonic_deviation': 0.0,
-                'rhythm_regularity': 0.0,
-                'drone_likelihood': 0.0
-            })
-        
-        # Add file metadata
-        features['file_path'] = str(audio_path.resolve())
-        features['file_name'] = audio_path.name
-        features['file_extension'] = audio_path.suffix.lower()
-        features['file_size_mb'] = os.path.getsize(audio_path) / (1024 * 1024)
-        
-        return features
+            self.order[audio_file] = len(self.order)
+            yield audio_file
         
-    except Exception as e:
-        logger.error(f"Error processing {audio_path}: {str(e)}")
+        self.scan_complete = True
+        self.scan_cache.save()
+    
+    def _needs_delta(self, audio_file: Path, row: Dict) -> bool:
+        """Note which feature groups of an extracted file are missing or outdated."""
+        outdated = _outdated_groups(row, self.profile)
+        if self.groups is not None:
+            outdated = [group for group in outdated if group in self.groups]
+        if outdated:
+            self.deltas[audio_file] = (row, outdated)
+        return bool(outdated)
+    
+    def task_options(self, audio_file: Path) -> Dict[str, object]:
+        """Extraction options specific to one pending file."""
+        if audio_file in self.deltas:
+            return {'groups': self.deltas[audio_file][1]}
+        if self.groups is not None:
+            return {'groups': self.groups}
         return {}
+    
+    def record(self, audio_file: Path, features: Dict, error: Optional[str]) -> None:
+        """Record the extraction result of one file."""
+        file_path = audio_file.resolve()
+        delta = self.deltas.pop(audio_file, None)
+        if features and delta is not None:
+            features = _merge_groups(delta[0], features)
+            self.updated_count += 1
+        if features:
+            self.results[self.order[audio_file]] = features
+            self.processed_count += 1
+            if self.journal is not None:
+                self.journal.append(features)
+            if self.cache is not None:
+                self.cache.store(self.fingerprints[features['file_path']], self.profile, features)
+            if str(file_path) in self.quarantine.entries:
+                self.quarantine.discard(file_path)
+                self.quarantine.save()
+        else:
+            self.error_count += 1
+            self.quarantine.add(file_path, error or "No features extracted")
+            self.quarantine.save()
+    
+    def finish(self) -> pd.DataFrame:
+        """Merge the results, write the output and return all features."""
+        if not self.seen_paths:
+            logger.warning(f"No supported audio files found in {self.input_dir}")
+            return pd.DataFrame()
+        
+        logger.info(
+            f"Found {len(self.seen_paths)} audio files in {self.input_dir} "
+            f"({self.scan_cache.hits} directory listings reused from the scan cache)"
+        )
+        if self.quarantined_count:
+            logger.warning(
+                f"Skipped {self.quarantined_count} quarantined files (use --force to retry), "
+                f"see {self.quarantine.quarantine_path}"
+            )
+        
+        features_list = self.features_list
+        if self.cache is not None:
+            # Forget files that disappeared from the directory
+            root = str(self.input_dir.resolve()).rstrip(os.sep) + os.sep
+            features_list = [
+                f for f in features_list
+                if not str(f.get('file_path', '')).startswith(root) or f['file_path'] in self.seen_paths
+            ]
+            removed_count = self.cache.prune(self.input_dir, self.seen_paths)
+            features_list = _merge_rows(features_list, self.reused)
+            self.cache.commit()
+            logger.info(
+                f"Feature cache: {len(self.reused)} reused, "
+                f"{self.processed_count + self.error_count} extracted, {removed_count} removed"
+            )
+        
+        # Keep output in directory order regardless of completion order
+        features_list = _merge_rows(features_list, [self.results[i] for i in sorted(self.results)])
+        
+        logger.info(
+            f"Feature extraction complete. "
+            f"Processed: {self.processed_count}, "
+            f"Skipped: {self.skipped_count}, "
+            f"Errors: {self.error_count}"
+        )
+        if self.updated_count:
+            logger.info(f"Updated {self.updated_count} existing rows with missing or outdated feature groups")
+        
+        # Compact the journal into the final output
+        if self.output_file and features_list:
+            if save_features(features_list, self.output_file):
+                self.journal.remove()
+        
+        return pd.DataFrame(features_list)
+
+def _run_jobs(
+    jobs: List[_DirectoryJob],
+    workers: int = 1,
+    timeout: Optional[float] = None,
+    timeout_per_minute: float = FILE_TIMEOUT_PER_MINUTE,
+    memory_limit_mb: Optional[float] = None,
+    pipelined: bool = False,
+    queue_depth: int = PIPELINE_QUEUE_DEPTH,
+    niceness: int = 0,
+    **options
+) -> List[pd.DataFrame]:
+    """
+    Extract the pending files of several directory jobs on one shared pool.
+    
+    Files from all jobs are scheduled together, so work is balanced per file
+    rather than per directory, and each job writes its output as soon as its
+    last file completes.
+    
+    Args:
+        jobs: Directory jobs to run
+        workers: Number of worker processes
+        timeout: Base wall-clock budget per file in seconds (None = unlimited)
+        timeout_per_minute: Extra wall-clock budget per minute of audio in seconds
+        memory_limit_mb: Memory budget per worker in MB (None = unlimited)
+        pipelined: Overlap decoding of upcoming files with analysis
+        queue_depth: Decoded files each worker may hold ahead of analysis
+        niceness: Nice increment of the worker processes
+        **options: Keyword arguments passed on to extract_features
+        
+    Returns:
+        Features DataFrame of each job, in job order
+    """
+    job_of = {}
+    frames = [None] * len(jobs)
+    
+    def finish_ready():
+        for i, job in enumerate(jobs):
+            if frames[i] is None and job.done:
+                frames[i] = job.finish()
+    
+    def pending_files() -> Iterator[Path]:
+        for job in jobs:
+            for audio_file in job.pending_files():
+                job_of[audio_file] = job
+                yield audio_file
+            finish_ready()
+    
+    start_time = time.time()
+    audio_seconds = 0.0
+    progress = tqdm(
+        _extract_files(
+            pending_files(), workers, timeout=timeout, timeout_per_minute=timeout_per_minute,
+            memory_limit_mb=memory_limit_mb,
+            pipelined=pipelined, queue_depth=queue_depth, niceness=niceness,
+            file_options=lambda audio_file: job_of[audio_file].task_options(audio_file), **options
+        ),
+        desc="Extracting features",
+        unit="file"
+    )
+    for audio_file, features, error in progress:
+        job_of.pop(audio_file).record(audio_file, features, error)
+        if features:
+            audio_seconds += features.get('duration', 0.0)
+            elapsed = max(time.time() - start_time, 1e-9)
+            progress.set_postfix(audio=f"{audio_seconds / 3600:.1f}h", speed=f"{audio_seconds / elapsed:.0f}x")
+        finish_ready()
+    
+    finish_ready()
+    return frames
 
 def process_directory(
     input_dir: Union[str, Path],
     output_file: Optional[Union[str, Path]] = None,
-    force: bool = False
+    force: bool = False,
+    workers: int = 1,
+    profile: str = DEFAULT_PROFILE,
+    excerpts: Optional[int] = None,
+    excerpt_duration: float = EXCERPT_DURATION,
+    streaming: bool = False,
+    block_duration: float = STREAM_BLOCK_DURATION,
+    cache_file: Optional[Union[str, Path]] = None,
+    timeout: Optional[float] = FILE_TIMEOUT,
+    timeout_per_minute: float = FILE_TIMEOUT_PER_MINUTE,
+    memory_limit_mb: Optional[float] = None,
+    pipelined: bool = False,
+    queue_depth: int = PIPELINE_QUEUE_DEPTH,
+    audio_cache_dir: Optional[Union[str, Path]] = None,
+    audio_cache_size_gb: float = DEFAULT_AUDIO_CACHE_SIZE_GB,
+    groups: Optional[List[str]] = None,
+    niceness: int = 0,
+    chunk_threads: int = 1,
+    chunk_duration: float = CHUNK_DURATION
 ) -> pd.DataFrame:
     """
     Process all audio files in a directory and extract features.
     
+    Files already present in the output are skipped, unless they were
+    extracted with a different profile, in which case their rows are replaced.
+    Rows that lack a feature group of the profile, or hold an older version
+    of one (see FEATURE_GROUP_VERSIONS), get only those groups extracted and
+    merged in; rows written before feature versioning count as version 1.
+    
+    Restricting `groups` gives the first pass of a two-tier extraction:
+    with LIGHT_FEATURE_GROUPS new tracks are usable for recommendations
+    after only the cheap groups, and a later unrestricted run, typically
+    with a `niceness` so it stays out of the way (see start_backfill), fills
+    in the heavy groups and updates the rows in place.
+    
+    Each result is appended to a journal next to the output as soon as it is
+    extracted, and the journal is compacted into the output at the end. If a
+    run is interrupted, the next run resumes from the journal.
+    
+    With a cache file, files are instead matched by content (see FeatureCache):
+    moved, renamed and duplicate files reuse cached features, files modified
+    in place are re-extracted, and rows for files deleted from the directory
+    are dropped from the output.
+    
+    Every file is analyzed under a wall-clock (and optionally memory) budget
+    that grows with the length of the file (see file_timeout).
+    Files that fail, hang or exceed the budget are recorded with their error
+    in a quarantine list next to the output and skipped on later runs until
+    they change on disk, unless `force` is set.
+    
+    In pipelined mode each worker decodes upcoming files in a background
+    thread while it analyzes the current one (see _extract_files).
+    
+    With an audio cache directory, decoded signals are kept on disk (see
+    DecodedAudioCache), so re-extracting with changed analysis settings
+    (with `force`) skips decoding for every track still in the cache.
+    
     Args:
         input_dir: Directory containing audio files
         output_file: Optional path to save features as CSV/JSON
         force: If True, overwrite existing output file
+        workers: Number of worker processes to extract features with (0 = auto)
+        profile: Name of the extraction profile ('fast', 'standard' or 'full')
+        excerpts: Analyze only this many excerpts of long tracks (see extract_features)
+        excerpt_duration: Length of each excerpt in seconds
+        streaming: Analyze tracks block by block with bounded memory
+        block_duration: Length of each streaming block in seconds
+        cache_file: Optional path to a persistent feature cache (SQLite)
+        timeout: Base wall-clock budget per file in seconds (None = unlimited)
+        timeout_per_minute: Extra wall-clock budget per minute of audio in seconds
+        memory_limit_mb: Memory budget per worker process in MB (None = unlimited)
+        pipelined: Decode upcoming files in the background while analyzing
+        queue_depth: Decoded files each worker may hold ahead of analysis
+        audio_cache_dir: Optional directory to cache decoded audio in
+        audio_cache_size_gb: Size cap of the audio cache in GB
+        groups: Extract only these feature groups (None = all groups of the profile)
+        niceness: Run the worker processes at this lower scheduling priority
+        chunk_threads: Threads to analyze chunks of one long track on
+            (0 = each worker's share of the CPU budget, see extract_features)
+        chunk_duration: Length of each chunk in seconds
         
     Returns:
         DataFrame containing extracted features
@@ -202,89 +1896,166 @@ def process_directory(
     input_dir = Path(input_dir)
     if not input_dir.exists() or not input_dir.is_dir():
         raise ValueError(f"Input directory not found: {input_dir}")
+    _resolve_groups(profile, groups)
     
-    # Find all audio files
-    audio_files = get_audio_files(input_dir)
-    if not audio_files:
-        logger.warning(f"No supported audio files found in {input_dir}")
-        return pd.DataFrame()
+    cache = FeatureCache(cache_file) if cache_file else None
+    audio_cache = DecodedAudioCache(audio_cache_dir, audio_cache_size_gb) if audio_cache_dir else None
+    try:
+        job = _DirectoryJob(input_dir, output_file, force, profile, cache, groups)
+        return _run_jobs(
+            [job], workers, timeout=timeout, timeout_per_minute=timeout_per_minute,
+            memory_limit_mb=memory_limit_mb,
+            pipelined=pipelined, queue_depth=queue_depth, niceness=niceness, profile=profile, excerpts=excerpts,
+            excerpt_duration=excerpt_duration, streaming=streaming, block_duration=block_duration,
+            audio_cache=audio_cache, chunk_threads=chunk_threads, chunk_duration=chunk_duration
+        )[0]
+    finally:
+        if cache is not None:
+            cache.close()
+
+def process_directories(
+    directories: List[Tuple[Union[str, Path], Union[str, Path]]],
+    force: bool = False,
+    workers: int = 1,
+    profile: str = DEFAULT_PROFILE,
+    excerpts: Optional[int] = None,
+    excerpt_duration: float = EXCERPT_DURATION,
+    streaming: bool = False,
+    block_duration: float = STREAM_BLOCK_DURATION,
+    cache_file: Optional[Union[str, Path]] = None,
+    timeout: Optional[float] = FILE_TIMEOUT,
+    timeout_per_minute: float = FILE_TIMEOUT_PER_MINUTE,
+    memory_limit_mb: Optional[float] = None,
+    pipelined: bool = False,
+    queue_depth: int = PIPELINE_QUEUE_DEPTH,
+    audio_cache_dir: Optional[Union[str, Path]] = None,
+    audio_cache_size_gb: float = DEFAULT_AUDIO_CACHE_SIZE_GB,
+    groups: Optional[List[str]] = None,
+    niceness: int = 0,
+    chunk_threads: int = 1,
+    chunk_duration: float = CHUNK_DURATION
+) -> List[pd.DataFrame]:
+    """
+    Process several directories, each into its own output file, on one worker pool.
     
-    logger.info(f"Found {len(audio_files)} audio files in {input_dir}")
+    Behaves like process_directory for every (input_dir, output_file) pair,
+    but all files are scheduled on a single pool of long-lived workers, so
+    work is balanced per file across directories and each output is written
+    as soon as its directory is complete.
     
-    # Check if output file exists and load it if force is False
-    features_list = []
-    existing_files = set()
+    Args:
+        directories: (input_dir, output_file) pairs
+        force, workers, profile, excerpts, excerpt_duration, streaming,
+        block_duration, cache_file, timeout, timeout_per_minute, memory_limit_mb, pipelined,
+        queue_depth, audio_cache_dir, audio_cache_size_gb, groups, niceness,
+        chunk_threads, chunk_duration: See process_directory
+        
+    Returns:
+        DataFrame of features for each directory, in input order
+    """
+    _resolve_groups(profile, groups)
+    for input_dir, _ in directories:
+        if not Path(input_dir).is_dir():
+            raise ValueError(f"Input directory not found: {input_dir}")
     
-    if output_file and Path(output_file).exists() and not force:
-        try:
-            if str(output_file).endswith('.json'):
-                with open(output_file, 'r') as f:
-                    features_list = json.load(f)
-            else:  # CSV
-                df = pd.read_csv(output_file)
-                features_list = df.to_dict('records')
-            
-            existing_files = {f['file_path'] for f in features_list}
-            logger.info(f"Loaded {len(features_list)} existing features from {output_file}")
-        except Exception as e:
-            logger.warning(f"Error loading existing features: {e}")
-            features_list = []
+    cache = FeatureCache(cache_file) if cache_file else None
+    audio_cache = DecodedAudioCache(audio_cache_dir, audio_cache_size_gb) if audio_cache_dir else None
+    try:
+        jobs = [
+            _DirectoryJob(Path(input_dir), output_file, force, profile, cache, groups)
+            for input_dir, output_file in directories
+        ]
+        return _run_jobs(
+            jobs, workers, timeout=timeout, timeout_per_minute=timeout_per_minute,
+            memory_limit_mb=memory_limit_mb,
+            pipelined=pipelined, queue_depth=queue_depth, niceness=niceness, profile=profile, excerpts=excerpts,
+            excerpt_duration=excerpt_duration, streaming=streaming, block_duration=block_duration,
+            audio_cache=audio_cache, chunk_threads=chunk_threads, chunk_duration=chunk_duration
+        )
+    finally:
+        if cache is not None:
+            cache.close()
+
+def start_backfill(command: List[str], log_file: Union[str, Path]) -> subprocess.Popen:
+    """
+    Start the background pass of a two-tier extraction.
     
-    # Process audio files
-    processed_count = 0
-    skipped_count = 0
-    error_count = 0
+    Runs `command` (an extraction command line without group restriction)
+    detached in its own session with its output appended to `log_file`, so it
+    keeps running after the caller exits.
     
-    for audio_file in tqdm(audio_files, desc="Extracting features"):
-        file_path = str(audio_file.resolve())
-        
-        # Skip if already processed
-        if file_path in existing_files:
-            skipped_count += 1
-            continue
-        
-        # Extract features
-        features = extract_features(audio_file)
+    Args:
+        command: Command line to run
+        log_file: File to append the command's output to
         
-        if features:
-            features_list.append(features)
-            processed_count += 1
-            
-            # Save periodically (every 10 files)
-            if processed_count % 10 == 0 and output_file:
-                save_features(features_list, output_file)
-        else:
-            error_count += 1
-    
-    logger.info(
-        f"Feature extraction complete. "
-        f"Processed: {processed_count}, "
-        f"Skipped: {skipped_count}, "
-        f"Errors: {error_count}"
-    )
+    Returns:
+        The started process
+    """
+    with open(log_file, 'a') as log:
+        process = subprocess.Popen(
+            command, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+            start_new_session=True
+        )
+    logger.info(f"Filling in the remaining feature groups in the background (pid {process.pid}, log {log_file})")
+    return process
+
+def backfill_arguments(args: argparse.Namespace) -> List[str]:
+    """
+    Command-line arguments of the background pass of a two-tier extraction.
     
-    # Save the final results
-    if output_file and features_list:
-        save_features(features_list, output_file)
+    The arguments are rebuilt from the fields of the parsed `args` listed in
+    BACKFILL_POSITIONALS, BACKFILL_OPTIONS and BACKFILL_SWITCHES rather than
+    filtered from sys.argv, so abbreviated or clustered flags cannot slip
+    through. Options are written as --flag=value and positionals after --, so
+    values starting with a dash parse back unchanged. --two-tier and --force
+    are always dropped (forcing would discard the rows just written), and the
+    pass runs at BACKFILL_NICENESS.
     
-    return pd.DataFrame(features_list)
+    Args:
+        args: Arguments parsed by extract_features or extract_all_features
+        
+    Returns:
+        Arguments to run the same command with
+    """
+    arguments = []
+    for flag, field in BACKFILL_OPTIONS:
+        value = getattr(args, field, None)
+        if value is not None:
+            arguments.append(f'{flag}={value}')
+    for flag, field in BACKFILL_SWITCHES:
+        if getattr(args, field, False):
+            arguments.append(flag)
+    arguments.append(f'--nice={BACKFILL_NICENESS}')
+    arguments.append('--')
+    for field in BACKFILL_POSITIONALS:
+        value = getattr(args, field, None)
+        if value is not None:
+            arguments.append(str(value))
+    return arguments
 
 def save_features(
     features_list: List[Dict],
     output_file: Union[str, Path],
     format: str = 'auto'
-) -> None:
+) -> bool:
     """
     Save features to a file.
     
+    The file is replaced atomically, so an interrupted save never leaves a
+    truncated output behind. The 'npy' format writes a binary feature store
+    (see dcm.core.feature_store) that loads near-instantly via memory mapping.
+    
     Args:
         features_list: List of feature dictionaries
         output_file: Path to save the features
-        format: Output format ('csv', 'json', or 'auto' based on file extension)
+        format: Output format ('csv', 'json', 'parquet', 'npy', or 'auto' based on file extension)
+        
+    Returns:
+        True if the features were saved
     """
     if not features_list:
         logger.warning("No features to save")
-        return
+        return False
     
     output_file = Path(output_file)
     output_file.parent.mkdir(parents=True, exist_ok=True)
@@ -293,27 +2064,41 @@ def save_features(
     if format == 'auto':
         if str(output_file).endswith('.json'):
             format = 'json'
+        elif str(output_file).endswith('.parquet'):
+            format = 'parquet'
+        elif str(output_file).endswith(FEATURE_STORE_SUFFIX):
+            format = 'npy'
         else:
             format = 'csv'  # Default to CSV
     
     try:
-        if format == 'json':
-            with open(output_file, 'w') as f:
-                json.dump(features_list, f, indent=2)
-        else:  # CSV
-            df = pd.DataFrame(features_list)
-            df.to_csv(output_file, index=False)
+        if format == 'npy':
+            save_feature_store(pd.DataFrame(features_list), output_file)
+            logger.info(f"Saved {len(features_list)} features to {output_file}")
+            return True
+        
+        with atomic_write(output_file) as temp_file:
+            if format == 'json':
+                with open(temp_file, 'w') as f:
+                    json.dump(features_list, f, indent=2)
+            elif format == 'parquet':  # Requires pyarrow or fastparquet
+                pd.DataFrame(features_list).to_parquet(temp_file, index=False)
+            else:  # CSV
+                df = pd.DataFrame(features_list)
+                df.to_csv(temp_file, index=False)
         
         logger.info(f"Saved {len(features_list)} features to {output_file}")
+        return True
     except Exception as e:
         logger.error(f"Error saving features to {output_file}: {e}")
+        return False
 
 def load_features(input_file: Union[str, Path]) -> pd.DataFrame:
     """
     Load features from a file.
     
     Args:
-        input_file: Path to the features file (CSV or JSON)
+        input_file: Path to the features file (CSV, JSON, Parquet or .npy feature store)
         
     Returns:
         DataFrame containing the loaded features
@@ -327,28 +2112,101 @@ def load_features(input_file: Union[str, Path]) -> pd.DataFrame:
             with open(input_file, 'r') as f:
                 features = json.load(f)
             return pd.DataFrame(features)
+        elif str(input_file).endswith('.parquet'):
+            return pd.read_parquet(input_file)
+        elif str(input_file).endswith(FEATURE_STORE_SUFFIX):
+            return load_feature_store(input_file)
         else:  # CSV
             return pd.read_csv(input_file)
     except Exception as e:
         raise ValueError(f"Error loading features from {input_file}: {e}")
 
-if __name__ == "__main__":
-    import argparse
-    
+def build_arg_parser() -> argparse.ArgumentParser:
+    """Command-line parser of this module."""
     parser = argparse.ArgumentParser(description='Extract audio features from music files')
     parser.add_argument('input_dir', help='Directory containing audio files')
-    parser.add_argument('-o', '--output', help='Output file (CSV or JSON)', default='audio_features.csv')
+    parser.add_argument('-o', '--output', help='Output file (CSV, JSON, Parquet or .npy feature store)',
+                        default='audio_features.csv')
     parser.add_argument('-f', '--force', action='store_true', help='Overwrite existing output file')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Number of parallel worker processes, 0 for one per CPU (default: 1)')
+    parser.add_argument('--cpus', type=int,
+                        help='CPUs DCM may use in total (default: all, or the DCM_CPUS environment variable)')
+    parser.add_argument('-p', '--profile', choices=sorted(EXTRACTION_PROFILES), default=DEFAULT_PROFILE,
+                        help=f'Extraction profile (default: {DEFAULT_PROFILE})')
+    parser.add_argument('--excerpts', type=int,
+                        help='Analyze only this many excerpts of long tracks')
+    parser.add_argument('--excerpt-duration', type=float, default=EXCERPT_DURATION,
+                        help=f'Length of each excerpt in seconds (default: {EXCERPT_DURATION:g})')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Decode and analyze tracks in blocks to bound memory use')
+    parser.add_argument('--block-duration', type=float, default=STREAM_BLOCK_DURATION,
+                        help=f'Streaming block length in seconds (default: {STREAM_BLOCK_DURATION:g})')
+    parser.add_argument('--chunk-threads', type=int, default=1, metavar='N',
+                        help='Analyze long tracks in chunks on N threads each, 0 for the CPUs '
+                             'left per worker (default: 1)')
+    parser.add_argument('--chunk-duration', type=float, default=CHUNK_DURATION,
+                        help=f'Chunk length in seconds for --chunk-threads (default: {CHUNK_DURATION:g})')
+    parser.add_argument('--cache', metavar='FILE',
+                        help='Persistent feature cache; reuses features for unchanged, '
+                             'moved or duplicate files')
+    parser.add_argument('--audio-cache', metavar='DIR',
+                        help='Cache decoded audio in DIR, so re-extracting with other settings skips decoding')
+    parser.add_argument('--audio-cache-size', type=float, default=DEFAULT_AUDIO_CACHE_SIZE_GB, metavar='GB',
+                        help=f'Size cap of the audio cache in GB (default: {DEFAULT_AUDIO_CACHE_SIZE_GB:g})')
+    parser.add_argument('--timeout', type=float, default=FILE_TIMEOUT,
+                        help=f'Base wall-clock limit per file in seconds, 0 to disable (default: {FILE_TIMEOUT:g})')
+    parser.add_argument('--timeout-per-minute', type=float, default=FILE_TIMEOUT_PER_MINUTE,
+                        help='Extra wall-clock limit per minute of audio in seconds '
+                             f'(default: {FILE_TIMEOUT_PER_MINUTE:g})')
+    parser.add_argument('--memory-limit', type=float, metavar='MB',
+                        help='Memory limit per worker process in MB')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='Decode upcoming files in the background while analyzing')
+    parser.add_argument('--queue-depth', type=int, default=PIPELINE_QUEUE_DEPTH,
+                        help=f'Decoded files held ahead of analysis per worker (default: {PIPELINE_QUEUE_DEPTH})')
+    parser.add_argument('--two-tier', action='store_true',
+                        help='Extract the cheap feature groups first, then fill in the heavy ones '
+                             '(tempo, Indian music features) in a low-priority background process')
+    parser.add_argument('--nice', type=int, default=0, metavar='N',
+                        help='Run the worker processes at a lower priority (nice increment)')
+    parser.add_argument('--drift-report', metavar='FILE',
+                        help='Compare excerpt and full-track features on a sample of files, '
+                             'write the report to FILE and exit')
     parser.add_argument('-v', '--verbose', action='store_true', help='Enable verbose logging')
-    
-    args = parser.parse_args()
+    return parser
+
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
     
     # Configure logging
     log_level = logging.DEBUG if args.verbose else logging.INFO
     logging.basicConfig(level=log_level, format='%(asctime)s - %(levelname)s - %(message)s')
+    set_cpu_budget(args.cpus)
+    
+    if args.drift_report:
+        audio_files = get_audio_files(args.input_dir)
+        sample = audio_files[::max(1, len(audio_files) // 20)]
+        report = excerpt_drift_report(
+            sample, args.profile, args.excerpts or 3, args.excerpt_duration
+        )
+        report.to_csv(args.drift_report)
+        print(report.head(20).to_string())
+        exit(0)
     
     # Process the directory
-    df = process_directory(args.input_dir, args.output, args.force)
+    df = process_directory(
+        args.input_dir, args.output, args.force,
+        workers=args.workers, profile=args.profile,
+        excerpts=args.excerpts, excerpt_duration=args.excerpt_duration,
+        streaming=args.streaming, block_duration=args.block_duration,
+        cache_file=args.cache, timeout=args.timeout or None, timeout_per_minute=args.timeout_per_minute,
+        memory_limit_mb=args.memory_limit,
+        pipelined=args.pipelined, queue_depth=args.queue_depth,
+        audio_cache_dir=args.audio_cache, audio_cache_size_gb=args.audio_cache_size,
+        groups=LIGHT_FEATURE_GROUPS if args.two_tier else None, niceness=args.nice,
+        chunk_threads=args.chunk_threads, chunk_duration=args.chunk_duration
+    )
     
     if not df.empty:
         print(f"\nExtracted features for {len(df)} audio files.")
@@ -356,3 +2214,10 @@ if __name__ == "__main__":
     else:
         print("No features were extracted. Check the log for errors.")
         exit(1)
+    
+    if args.two_tier:
+        # Same run again without the group restriction, at low priority
+        start_backfill(
+            [sys.executable, '-m', 'dcm.core.extract_features'] + backfill_arguments(args),
+            f"{args.output}.backfill.log"
+        )
@@ -0,0 +1,208 @@
+"""
+Incremental extraction cache for DCM.
+
+Remembers extracted features by file content so re-indexing a mostly unchanged
+library only analyzes new or modified files. Files are matched by path, size
+and modification time first; when those change, a fast partial-content hash
+decides whether the audio itself changed, which also lets moved, renamed and
+duplicate files reuse existing features.
+"""
+
+import os
+import json
+import hashlib
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Bytes hashed from the start, middle and end of a file for its fingerprint
+FINGERPRINT_CHUNK_SIZE = 64 * 1024
+
+def file_fingerprint(file_path: Union[str, Path], size: Optional[int] = None) -> str:
+    """
+    Compute a fast partial-content fingerprint of a file.
+
+    Hashes the file size together with three fixed-size chunks taken from the
+    start, middle and end of the file, so the cost is independent of file length.
+
+    Args:
+        file_path: Path to the file
+        size: File size in bytes, if already known
+
+    Returns:
+        Hex digest identifying the file content
+    """
+    if size is None:
+        size = os.path.getsize(file_path)
+
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(file_path, 'rb') as f:
+        if size <= 3 * FINGERPRINT_CHUNK_SIZE:
+            digest.update(f.read())
+        else:
+            for offset in (0, size // 2, size - FINGERPRINT_CHUNK_SIZE):
+                f.seek(offset)
+                digest.update(f.read(FINGERPRINT_CHUNK_SIZE))
+    return digest.hexdigest()
+
+class FeatureCache:
+    """Persistent cache of extracted features keyed by file content."""
+
+    def __init__(self, cache_path: Union[str, Path]):
+        """
+        Open (or create) a feature cache.
+
+        Args:
+            cache_path: Path to the SQLite cache file
+        """
+        self.cache_path = Path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.cache_path))
+        self._init_db()
+
+    def _init_db(self):
+        """Initialize cache tables if they don't exist."""
+        cursor = self.conn.cursor()
+
+        # Last known state of each file
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS files (
+            file_path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            fingerprint TEXT NOT NULL
+        )''')
+
+        # Extracted features per content fingerprint and extraction profile
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS features (
+            fingerprint TEXT NOT NULL,
+            profile TEXT NOT NULL,
+            features TEXT NOT NULL,  -- JSON-encoded feature row
+            PRIMARY KEY (fingerprint, profile)
+        )''')
+
+        self.conn.commit()
+
+    def has_file(self, file_path: Union[str, Path]) -> bool:
+        """Whether the cache has seen a file at this path before."""
+        row = self.conn.execute(
+            'SELECT 1 FROM files WHERE file_path = ?', (str(file_path),)
+        ).fetchone()
+        return row is not None
+
+    def fingerprint(self, file_path: Union[str, Path]) -> str:
+        """
+        Get the content fingerprint of a file, hashing it only if it changed.
+
+        Args:
+            file_path: Resolved path to the file
+
+        Returns:
+            Content fingerprint
+        """
+        file_path = str(file_path)
+        stat = os.stat(file_path)
+
+        row = self.conn.execute(
+            'SELECT size, mtime_ns, fingerprint FROM files WHERE file_path = ?', (file_path,)
+        ).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+
+        fingerprint = file_fingerprint(file_path, stat.st_size)
+        self.conn.execute(
+            'INSERT OR REPLACE INTO files (file_path, size, mtime_ns, fingerprint) VALUES (?, ?, ?, ?)',
+            (file_path, stat.st_size, stat.st_mtime_ns, fingerprint)
+        )
+        return fingerprint
+
+    def lookup(self, file_path: Union[str, Path], profile: str) -> Tuple[Optional[Dict], str]:
+        """
+        Find cached features for a file.
+
+        Features cached for identical content under another path are returned
+        with their file metadata rewritten for this path.
+
+        Args:
+            file_path: Resolved path to the file
+            profile: Extraction profile the features must have been produced with
+
+        Returns:
+            Tuple of (features or None, content fingerprint)
+        """
+        fingerprint = self.fingerprint(file_path)
+        row = self.conn.execute(
+            'SELECT features FROM features WHERE fingerprint = ? AND profile = ?',
+            (fingerprint, profile)
+        ).fetchone()
+        if row is None:
+            return None, fingerprint
+
+        features = json.loads(row[0])
+        file_path = Path(file_path)
+        features['file_path'] = str(file_path)
+        features['file_name'] = file_path.name
+        features['file_extension'] = file_path.suffix.lower()
+        features['file_size_mb'] = os.path.getsize(file_path) / (1024 * 1024)
+        return features, fingerprint
+
+    def store(self, fingerprint: str, profile: str, features: Dict) -> None:
+        """
+        Cache the features extracted for a fingerprint.
+
+        Args:
+            fingerprint: Content fingerprint of the analyzed file
+            profile: Extraction profile used
+            features: Extracted feature row
+        """
+        self.conn.execute(
+            'INSERT OR REPLACE INTO features (fingerprint, profile, features) VALUES (?, ?, ?)',
+            (fingerprint, profile, json.dumps(features))
+        )
+
+    def prune(self, root: Union[str, Path], seen_paths: Iterable[str]) -> int:
+        """
+        Forget files under a directory that were not seen in the latest scan.
+
+        Features no longer referenced by any known file are dropped as well.
+
+        Args:
+            root: Directory that was scanned
+            seen_paths: Resolved paths of the files found in the scan
+
+        Returns:
+            Number of files removed from the cache
+        """
+        prefix = str(Path(root).resolve()).rstrip(os.sep) + os.sep
+        seen = set(seen_paths)
+        known = [
+            path for (path,) in self.conn.execute(
+                'SELECT file_path FROM files WHERE substr(file_path, 1, ?) = ?', (len(prefix), prefix)
+            )
+        ]
+        removed = [(path,) for path in known if path not in seen]
+
+        self.conn.executemany('DELETE FROM files WHERE file_path = ?', removed)
+        self.conn.execute(
+            'DELETE FROM features WHERE fingerprint NOT IN (SELECT fingerprint FROM files)'
+        )
+        return len(removed)
+
+    def commit(self) -> None:
+        """Write pending changes to disk."""
+        self.conn.commit()
+
+    def close(self) -> None:
+        """Commit and close the cache."""
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,361 @@
+"""
+Feature storage helpers for DCM.
+
+Provides crash-safe writing of feature files (an append-only journal that
+records each extracted row as it is produced, and atomic replacement of the
+final output so readers never see a half-written file), a quarantine list of
+files that failed extraction, and a binary feature store: a float32 matrix in
+an .npy file, memory-mapped on load, with a JSON sidecar holding the column
+names and non-numeric metadata such as file paths.
+"""
+
+import os
+import json
+import uuid
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# File extension of the binary feature store matrix
+FEATURE_STORE_SUFFIX = '.npy'
+
+# Marks the trailer appended to a feature store matrix after the array data:
+# the generation id it shares with its sidecar (np.load ignores trailing bytes)
+STORE_GENERATION_MAGIC = b'DCMGEN01'
+
+# Length of a generation id (hex digits of a UUID)
+STORE_GENERATION_LENGTH = 32
+
+# Bytes read per step when scanning back for the last complete journal line
+JOURNAL_SCAN_BLOCK = 64 * 1024
+
+@contextmanager
+def atomic_write(output_file: Union[str, Path]) -> Iterator[Path]:
+    """
+    Write a file atomically.
+
+    Yields a temporary path next to the output; once the block completes the
+    temporary file replaces the output in a single rename. If the block fails
+    the existing output is left untouched.
+
+    Args:
+        output_file: Final path of the file
+    """
+    output_file = Path(output_file)
+    temp_file = output_file.with_name(f".{output_file.name}.tmp")
+    try:
+        yield temp_file
+        os.replace(temp_file, output_file)
+    finally:
+        if temp_file.exists():
+            temp_file.unlink()
+
+class FeatureJournal:
+    """
+    Append-only journal of extracted feature rows (JSON Lines).
+
+    Each row is written as one line and flushed to disk before `append`
+    returns, so after a crash the journal holds every completed row. A line
+    cut short by the crash is ignored when reading, and cut off before the
+    next row is appended.
+    """
+
+    def __init__(self, journal_path: Union[str, Path]):
+        """
+        Args:
+            journal_path: Path to the journal file
+        """
+        self.journal_path = Path(journal_path)
+        self._file = None
+
+    @classmethod
+    def for_output(cls, output_file: Union[str, Path]) -> 'FeatureJournal':
+        """Get the journal that belongs to a feature output file."""
+        output_file = Path(output_file)
+        return cls(output_file.with_name(f"{output_file.name}.journal.jsonl"))
+
+    def exists(self) -> bool:
+        """Whether a journal was left behind by an earlier run."""
+        return self.journal_path.exists()
+
+    def read(self) -> List[Dict]:
+        """
+        Read all complete rows from the journal.
+
+        Returns:
+            List of feature rows in the order they were appended
+        """
+        if not self.journal_path.exists():
+            return []
+
+        rows = []
+        with open(self.journal_path, 'r') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.endswith('\n'):
+                    logger.warning(f"Ignoring incomplete journal entry at line {line_number}")
+                    break
+                try:
+                    rows.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Ignoring corrupt journal entry at line {line_number}")
+        return rows
+
+    def append(self, row: Dict) -> None:
+        """
+        Append a row and flush it to disk.
+
+        Args:
+            row: Feature row to record
+        """
+        if self._file is None:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            self._drop_incomplete_line()
+            self._file = open(self.journal_path, 'a')
+        self._file.write(json.dumps(row) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _drop_incomplete_line(self) -> None:
+        """Cut off a last line left incomplete by a crash, so new rows start on a line of their own."""
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b'\n':
+                return
+            # Scan back for the end of the last complete line
+            position, keep = end, 0
+            while position > 0:
+                start = max(0, position - JOURNAL_SCAN_BLOCK)
+                f.seek(start)
+                newline = f.read(position - start).rfind(b'\n')
+                if newline >= 0:
+                    keep = start + newline + 1
+                    break
+                position = start
+            f.truncate(keep)
+
+    def close(self) -> None:
+        """Close the journal file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self) -> None:
+        """Close and delete the journal once its rows have been compacted."""
+        self.close()
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+
+def _store_metadata_path(store_path: Path) -> Path:
+    """Path of the metadata sidecar that belongs to a feature store matrix."""
+    return store_path.with_suffix('.meta.json')
+
+def save_feature_store(features_df: pd.DataFrame, store_path: Union[str, Path]) -> None:
+    """
+    Save features as a binary feature store.
+
+    Numeric columns go into a float32 matrix (`store_path`, .npy); all other
+    columns, the column order and the matrix shape go into a JSON sidecar
+    (`<name>.meta.json`). Both files are replaced atomically and carry the
+    same random generation id, so a crash between the two replacements is
+    detected on load instead of pairing a matrix with another save's columns.
+
+    Args:
+        features_df: DataFrame of feature rows
+        store_path: Path of the .npy matrix file
+    """
+    store_path = Path(store_path)
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+
+    numeric_columns = [
+        column for column in features_df.columns
+        if pd.api.types.is_numeric_dtype(features_df[column])
+        and not pd.api.types.is_bool_dtype(features_df[column])
+    ]
+    matrix = np.ascontiguousarray(features_df[numeric_columns].to_numpy(dtype=np.float32))
+
+    generation = uuid.uuid4().hex
+    metadata = {
+        'generation': generation,
+        'columns': [str(column) for column in features_df.columns],
+        'numeric_columns': [str(column) for column in numeric_columns],
+        'shape': list(matrix.shape),
+        'metadata': {
+            str(column): features_df[column].where(features_df[column].notna(), None).tolist()
+            for column in features_df.columns if column not in numeric_columns
+        },
+    }
+
+    # Matrix first: a reader checks it against the generation and shape in the sidecar
+    with atomic_write(store_path) as temp_file:
+        with open(temp_file, 'wb') as f:
+            np.save(f, matrix)
+            f.write(STORE_GENERATION_MAGIC + generation.encode('ascii'))
+    with atomic_write(_store_metadata_path(store_path)) as temp_file:
+        with open(temp_file, 'w') as f:
+            json.dump(metadata, f)
+
+def load_feature_matrix(
+    store_path: Union[str, Path],
+    mmap: bool = True
+) -> Tuple[np.ndarray, List[str], pd.DataFrame]:
+    """
+    Load the raw parts of a binary feature store.
+
+    Args:
+        store_path: Path of the .npy matrix file
+        mmap: Memory-map the matrix instead of reading it into memory
+
+    Returns:
+        Tuple of (float32 matrix, numeric column names, metadata DataFrame)
+    """
+    store_path = Path(store_path)
+    with open(_store_metadata_path(store_path), 'r') as f:
+        metadata = json.load(f)
+
+    matrix = np.load(store_path, mmap_mode='r' if mmap else None)
+    if list(matrix.shape) != metadata['shape']:
+        raise ValueError(
+            f"Feature store {store_path} is inconsistent: matrix shape {matrix.shape} "
+            f"does not match metadata shape {tuple(metadata['shape'])}"
+        )
+
+    generation = _matrix_generation(store_path)
+    if generation != metadata.get('generation'):
+        raise ValueError(
+            f"Feature store {store_path} is inconsistent: the matrix and its metadata "
+            f"come from different saves (interrupted save?)"
+        )
+
+    return matrix, metadata['numeric_columns'], pd.DataFrame(metadata['metadata'])
+
+def _matrix_generation(store_path: Path) -> Optional[str]:
+    """Generation id in the trailer of a feature store matrix, None if it has none."""
+    trailer_length = len(STORE_GENERATION_MAGIC) + STORE_GENERATION_LENGTH
+    with open(store_path, 'rb') as f:
+        if f.seek(0, os.SEEK_END) < trailer_length:
+            return None
+        f.seek(-trailer_length, os.SEEK_END)
+        trailer = f.read(trailer_length)
+    if not trailer.startswith(STORE_GENERATION_MAGIC):
+        return None
+    return trailer[len(STORE_GENERATION_MAGIC):].decode('ascii', errors='replace')
+
+def load_feature_store(store_path: Union[str, Path], mmap: bool = True) -> pd.DataFrame:
+    """
+    Load a binary feature store as a DataFrame.
+
+    Numeric columns are float32 and, with `mmap`, backed by the memory-mapped
+    matrix rather than copied into memory.
+
+    Args:
+        store_path: Path of the .npy matrix file
+        mmap: Memory-map the matrix instead of reading it into memory
+
+    Returns:
+        DataFrame with the original column order
+    """
+    matrix, numeric_columns, metadata_df = load_feature_matrix(store_path, mmap=mmap)
+    with open(_store_metadata_path(Path(store_path)), 'r') as f:
+        columns = json.load(f)['columns']
+
+    features_df = pd.DataFrame(matrix, columns=numeric_columns, copy=False)
+
+    # Insert metadata columns in place; reindexing would copy the matrix
+    for position, column in enumerate(columns):
+        if column in metadata_df.columns:
+            features_df.insert(position, column, metadata_df[column].to_numpy())
+
+    return features_df
+
+class Quarantine:
+    """
+    List of files that failed extraction (JSON), with the error for each.
+
+    Quarantined files are skipped on later runs until they change on disk
+    (size or modification time) or the quarantine is bypassed.
+    """
+
+    def __init__(self, quarantine_path: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            quarantine_path: Path to the quarantine file (None = keep in memory only)
+        """
+        self.quarantine_path = Path(quarantine_path) if quarantine_path else None
+        self.entries = {}
+        if self.quarantine_path is not None and self.quarantine_path.exists():
+            try:
+                with open(self.quarantine_path, 'r') as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable quarantine file {self.quarantine_path}: {e}")
+
+    @classmethod
+    def for_output(cls, output_file: Optional[Union[str, Path]]) -> 'Quarantine':
+        """Get the quarantine that belongs to a feature output file."""
+        if not output_file:
+            return cls()
+        output_file = Path(output_file)
+        return cls(output_file.with_name(f"{output_file.name}.quarantine.json"))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, file_path: Union[str, Path]) -> bool:
+        """Whether a file is quarantined and unchanged since it failed."""
+        entry = self.entries.get(str(file_path))
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        return entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns
+
+    def add(self, file_path: Union[str, Path], error: str) -> None:
+        """
+        Quarantine a file.
+
+        Args:
+            file_path: Resolved path to the file
+            error: Description of the failure
+        """
+        try:
+            stat = os.stat(file_path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            size, mtime_ns = None, None
+        self.entries[str(file_path)] = {
+            'error': error,
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'quarantined_at': datetime.now().isoformat(timespec='seconds'),
+        }
+
+    def discard(self, file_path: Union[str, Path]) -> None:
+        """Release a file from quarantine."""
+        self.entries.pop(str(file_path), None)
+
+    def save(self) -> None:
+        """Write the quarantine file, removing it once the quarantine is empty."""
+        if self.quarantine_path is None:
+            return
+        if not self.entries:
+            if self.quarantine_path.exists():
+                self.quarantine_path.unlink()
+            return
+        self.quarantine_path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(self.quarantine_path) as temp_file:
+            with open(temp_file, 'w') as f:
+                json.dump(self.entries, f, indent=2)
@@ -11,6 +11,9 @@ import numpy as np
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics.pairwise import cosine_similarity
 
+from dcm.core.feature_store import FEATURE_STORE_SUFFIX, load_feature_store
+from dcm.core.track_index import TrackIndex
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,15 +27,19 @@ class PlaylistGenerator:
     def __init__(self, features_file: str):
         """Initialize with path to features CSV file."""
         self.features_df = None
+        self.track_index = None
         self.load_features(features_file)
     
     def load_features(self, features_file: str) -> None:
-        """Load and validate features from CSV file."""
+        """Load and validate features from a CSV file or .npy feature store."""
         try:
             if not os.path.exists(features_file):
                 raise FileNotFoundError(f"Features file not found: {features_file}")
             
-            self.features_df = pd.read_csv(features_file)
+            if str(features_file).endswith(FEATURE_STORE_SUFFIX):
+                self.features_df = load_feature_store(features_file)
+            else:
+                self.features_df = pd.read_csv(features_file)
             
             if self.features_df.empty:
                 raise ValueError("Features file is empty")
@@ -41,6 +48,9 @@ class PlaylistGenerator:
             for col in required_columns:
                 if col not in self.features_df.columns:
                     raise ValueError(f"Missing required column: {col}")
+            
+            # Songs are looked up the same way as in the recommender
+            self.track_index = TrackIndex(self.features_df['file_path'].astype(str))
                     
             logger.info(f"Successfully loaded {len(self.features_df)} songs")
             
@@ -79,9 +89,9 @@ class PlaylistGenerator:
             # Convert to absolute paths
             abs_paths = [str(Path(p).resolve()) for p in song_paths]
             
-            # Filter valid songs
-            valid_songs = [p for p in abs_paths 
-                         if p in self.features_df['file_path'].values]
+            # Resolve each song to its path in the features
+            positions = [self.track_index.find(p) for p in abs_paths]
+            valid_songs = [self.track_index.paths[i] for i in positions if i is not None]
             
             if not valid_songs:
                 logger.error("No valid songs found in features")
@@ -151,13 +161,12 @@ class PlaylistGenerator:
             # Get feature vectors
             features = self.get_feature_vectors()
             
-            # Find index of reference song
-            ref_idx = self.features_df.index[self.features_df['file_path'] == song_path].tolist()
-            if not ref_idx:
+            # Find row of reference song
+            ref_idx = self.track_index.find(song_path)
+            if ref_idx is None:
                 logger.warning(f"Song not found in features: {song_path}")
                 return []
                 
-            ref_idx = ref_idx[0]
             ref_features = features[ref_idx].reshape(1, -1)
             
             # Calculate similarities
@@ -192,7 +201,10 @@ class PlaylistGenerator:
                        if c not in ['file_path', 'genre', 'mood'] 
                        and pd.api.types.is_numeric_dtype(self.features_df[c])]
         
-        features = self.features_df[feature_cols].values
+        # Songs still waiting for their heavy feature groups (two-tier
+        # extraction) get the column mean, i.e. 0 after scaling
+        features = self.features_df[feature_cols]
+        features = features.fillna(features.mean()).fillna(0.0).values
         return StandardScaler().fit_transform(features)
     
     def save_playlist(
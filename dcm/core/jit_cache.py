@@ -0,0 +1,50 @@
+"""
+Persistent numba compile cache for DCM.
+
+librosa compiles its numba kernels (beat tracking, PLP, HPSS helpers, ...)
+on first use in every process. Kernels marked for caching are written to
+disk and reused by later processes, but only if numba has a writable cache
+directory, which a system-wide or read-only install does not provide. This
+module points numba at a cache directory under the user's DCM directory.
+
+configure_jit_cache() must run before numba (and therefore librosa) is
+imported, because numba picks the cache location when a kernel is defined.
+"""
+
+import os
+import sys
+import logging
+from pathlib import Path
+from typing import Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Default location of the numba compile cache
+DEFAULT_JIT_CACHE_DIR = Path.home() / '.dcm' / 'numba_cache'
+
+def configure_jit_cache(cache_dir: Optional[Union[str, Path]] = None) -> Optional[Path]:
+    """
+    Configure the directory numba caches compiled kernels in.
+
+    An explicit NUMBA_CACHE_DIR in the environment takes precedence over the
+    default, so users can relocate or share the cache.
+
+    Args:
+        cache_dir: Cache directory to use instead of the default
+
+    Returns:
+        The cache directory in use, or None if it could not be set up
+    """
+    if 'numba' in sys.modules and 'NUMBA_CACHE_DIR' not in os.environ:
+        logger.debug("numba is already imported; the JIT cache directory cannot be changed")
+        return None
+
+    cache_dir = Path(os.environ.get('NUMBA_CACHE_DIR') or cache_dir or DEFAULT_JIT_CACHE_DIR)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        logger.warning(f"Cannot create JIT cache directory {cache_dir}: {e}")
+        return None
+
+    os.environ['NUMBA_CACHE_DIR'] = str(cache_dir)
+    return cache_dir
@@ -0,0 +1,313 @@
+"""
+Merge per-album feature files into one combined feature store for DCM.
+
+The batch extractor writes one `<album>_features.csv` per album, while the
+recommender, playlist generator and UI read a single combined file. Merging
+is incremental: a manifest next to the combined file records the size and
+modification time of every album file and the rows it contributed, so a
+refresh only re-reads albums that changed and, when albums were only added,
+appends their rows to the combined file instead of rewriting it.
+
+Rows are de-duplicated by file path and by content (a hash of the feature
+values and file size), so the same track in two albums appears once.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Union
+
+import numpy as np
+import pandas as pd
+
+from dcm.core.extract_features import load_features, save_features
+from dcm.core.feature_store import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# File name pattern of per-album feature files
+ALBUM_FEATURES_PATTERN = '*_features.csv'
+
+# Columns describing the file rather than its audio content
+FILE_COLUMNS = {'file_path', 'file_name', 'file_extension', 'file_size_mb'}
+
+# Decimal places feature values are rounded to before hashing, so values that
+# went through a text format still hash the same
+CONTENT_KEY_DECIMALS = 5
+
+def content_keys(features_df: pd.DataFrame) -> List[str]:
+    """
+    Compute a content key for each feature row.
+
+    The key hashes the numeric feature values together with the file size,
+    so identical audio stored under different paths gets the same key.
+
+    Args:
+        features_df: DataFrame of feature rows
+
+    Returns:
+        Hex digest per row
+    """
+    value_columns = sorted(
+        column for column in features_df.columns
+        if column not in FILE_COLUMNS and pd.api.types.is_numeric_dtype(features_df[column])
+    )
+    values = np.round(features_df[value_columns].to_numpy(dtype=np.float64), CONTENT_KEY_DECIMALS)
+    values = np.nan_to_num(values, nan=0.0) + 0.0  # Normalize NaN and -0.0
+    sizes = features_df['file_size_mb'].to_numpy(dtype=np.float64) if 'file_size_mb' in features_df else None
+
+    keys = []
+    for i, row in enumerate(values):
+        digest = hashlib.blake2b(row.tobytes(), digest_size=16)
+        if sizes is not None:
+            digest.update(np.round(sizes[i], CONTENT_KEY_DECIMALS).tobytes())
+        keys.append(digest.hexdigest())
+    return keys
+
+class MergeManifest:
+    """Record of which album files went into a combined feature file (JSON)."""
+
+    def __init__(self, manifest_path: Union[str, Path]):
+        """
+        Args:
+            manifest_path: Path to the manifest file
+        """
+        self.manifest_path = Path(manifest_path)
+        self.output_size = None
+        self.albums = {}
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path, 'r') as f:
+                    data = json.load(f)
+                self.output_size = data['output_size']
+                self.albums = data['albums']
+            except (OSError, KeyError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable merge manifest {self.manifest_path}: {e}")
+
+    @classmethod
+    def for_output(cls, output_file: Union[str, Path]) -> 'MergeManifest':
+        """Get the manifest that belongs to a combined feature file."""
+        output_file = Path(output_file)
+        return cls(output_file.with_name(f"{output_file.name}.manifest.json"))
+
+    def matches(self, output_file: Path) -> bool:
+        """Whether the combined file is exactly the one this manifest describes."""
+        return (
+            self.output_size is not None and output_file.exists()
+            and output_file.stat().st_size == self.output_size
+        )
+
+    def save(self, output_file: Path) -> None:
+        """Write the manifest for the current state of the combined file."""
+        self.output_size = output_file.stat().st_size
+        with atomic_write(self.manifest_path) as temp_file:
+            with open(temp_file, 'w') as f:
+                json.dump({'output_size': self.output_size, 'albums': self.albums}, f)
+
+def _album_state(album_file: Path) -> Dict[str, int]:
+    stat = album_file.stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def merge_feature_files(
+    album_files: List[Union[str, Path]],
+    output_file: Union[str, Path],
+    force: bool = False
+) -> Dict[str, int]:
+    """
+    Merge per-album feature files into a combined feature file.
+
+    Args:
+        album_files: Per-album feature files to merge
+        output_file: Combined feature file (CSV, JSON, Parquet or .npy store)
+        force: Rebuild the combined file from scratch
+
+    Returns:
+        Merge statistics: albums re-read, rows added, duplicates dropped,
+        total rows
+    """
+    output_file = Path(output_file)
+    album_files = sorted(str(Path(f).resolve()) for f in album_files)
+    manifest = MergeManifest.for_output(output_file)
+    rebuild = force or not manifest.matches(output_file)
+    if rebuild:
+        # Unknown state of the combined file: rebuild everything
+        manifest.albums = {}
+
+    current = {album_file: _album_state(Path(album_file)) for album_file in album_files}
+    changed = {
+        album_file for album_file, state in current.items()
+        if manifest.albums.get(album_file, {}).get('state') != state
+    }
+    removed = set(manifest.albums) - set(current)
+
+    # Albums whose duplicates were dropped in favor of rows that are about to
+    # be released must be merged again, until nothing more is released
+    stale = changed | removed
+    released_paths, released_keys = set(), set()
+    while True:
+        for album_file in stale:
+            entry = manifest.albums.get(album_file)
+            if entry:
+                released_paths.update(entry['paths'])
+                released_keys.update(entry['keys'])
+        affected = {
+            album_file for album_file, entry in manifest.albums.items()
+            if album_file not in stale and any(
+                path in released_paths or key in released_keys for path, key in entry['dropped']
+            )
+        }
+        if not affected:
+            break
+        stale |= affected
+        changed |= affected
+
+    # Paths and content keys already owned by albums that stay as they are
+    owned_paths: Set[str] = set()
+    owned_keys: Set[str] = set()
+    for album_file, entry in manifest.albums.items():
+        if album_file not in stale:
+            owned_paths.update(entry['paths'])
+            owned_keys.update(entry['keys'])
+    kept_paths = set(owned_paths)
+
+    new_rows = []
+    dropped_count = 0
+    for album_file in album_files:
+        if album_file not in changed:
+            continue
+        try:
+            album_df = load_features(album_file)
+        except ValueError as e:
+            logger.error(str(e))
+            manifest.albums.pop(album_file, None)
+            continue
+        if album_df.empty or 'file_path' not in album_df.columns:
+            keys = []
+        else:
+            keys = content_keys(album_df)
+
+        entry = {'state': current[album_file], 'paths': [], 'keys': [], 'dropped': []}
+        keep = []
+        for i, (path, key) in enumerate(zip(album_df.get('file_path', []), keys)):
+            if path in owned_paths or key in owned_keys:
+                entry['dropped'].append([path, key])
+                dropped_count += 1
+                continue
+            owned_paths.add(path)
+            owned_keys.add(key)
+            entry['paths'].append(path)
+            entry['keys'].append(key)
+            keep.append(i)
+        manifest.albums[album_file] = entry
+        if keep:
+            new_rows.append(album_df.iloc[keep])
+
+    for album_file in removed:
+        manifest.albums.pop(album_file, None)
+
+    added_df = pd.concat(new_rows, ignore_index=True) if new_rows else pd.DataFrame()
+    total_rows = sum(len(entry['paths']) for entry in manifest.albums.values())
+
+    if not rebuild and not released_paths and _append(output_file, added_df):
+        # Only albums were added: the rows already in the combined file stay valid
+        if not added_df.empty:
+            logger.info(f"Appended {len(added_df)} rows to {output_file}")
+    else:
+        existing_df = pd.DataFrame()
+        if not rebuild and kept_paths:
+            existing_df = load_features(output_file)
+            existing_df = existing_df[existing_df['file_path'].isin(kept_paths)]
+        combined_df = pd.concat([existing_df, added_df], ignore_index=True)
+        if not save_features(combined_df.to_dict('records'), output_file):
+            raise OSError(f"Could not write combined features to {output_file}")
+
+    manifest.save(output_file)
+
+    stats = {
+        'albums_merged': len(changed),
+        'albums_removed': len(removed),
+        'rows_added': len(added_df),
+        'duplicates_dropped': dropped_count,
+        'total_rows': total_rows,
+    }
+    logger.info(
+        f"Merged {stats['albums_merged']} changed albums into {output_file} "
+        f"({stats['rows_added']} rows added, {stats['duplicates_dropped']} duplicates dropped, "
+        f"{stats['albums_removed']} albums removed, {stats['total_rows']} rows total)"
+    )
+    return stats
+
+def _append(output_file: Path, added_df: pd.DataFrame) -> bool:
+    """
+    Append rows to an existing CSV file if its columns allow it.
+
+    Returns:
+        True if the rows were appended (or there was nothing to append)
+    """
+    if not output_file.exists():
+        return False
+    if added_df.empty:
+        return True
+    if output_file.suffix != '.csv':
+        return False
+
+    header = pd.read_csv(output_file, nrows=0).columns.tolist()
+    if not set(added_df.columns) <= set(header):
+        return False
+
+    with open(output_file, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+        else:
+            needs_newline = False
+    with open(output_file, 'a') as f:
+        if needs_newline:
+            f.write('\n')
+        added_df.reindex(columns=header).to_csv(f, header=False, index=False)
+    return True
+
+def find_album_files(features_dir: Union[str, Path], exclude: Optional[Path] = None) -> List[Path]:
+    """
+    Find per-album feature files in a directory.
+
+    Args:
+        features_dir: Directory the batch extractor wrote to
+        exclude: Combined output file to leave out if it matches the pattern
+
+    Returns:
+        Sorted list of album feature files
+    """
+    album_files = sorted(Path(features_dir).glob(ALBUM_FEATURES_PATTERN))
+    if exclude is not None:
+        album_files = [f for f in album_files if f.resolve() != Path(exclude).resolve()]
+    return album_files
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Merge per-album feature files into one combined file')
+    parser.add_argument('features_dir', help='Directory containing <album>_features.csv files')
+    parser.add_argument('-o', '--output', help='Combined feature file '
+                        '(default: <features_dir>/combined_features.csv)')
+    parser.add_argument('-f', '--force', action='store_true', help='Rebuild the combined file from scratch')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Enable verbose logging')
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    output = Path(args.output or os.path.join(args.features_dir, 'combined_features.csv'))
+    album_files = find_album_files(args.features_dir, exclude=output)
+    if not album_files:
+        print(f"No {ALBUM_FEATURES_PATTERN} files found in {args.features_dir}")
+        exit(1)
+
+    stats = merge_feature_files(album_files, output, force=args.force)
+    print(f"\n{stats['total_rows']} songs in {output}")
@@ -0,0 +1,165 @@
+"""
+Directory scanner for DCM.
+
+Walks a music library once with os.scandir and yields matching files as they
+are found, so callers can start working before the walk ends. An optional
+scan cache remembers each directory's listing by modification time; on a
+rescan, directories whose mtime is unchanged are not listed again, which
+saves most of the cost of rescanning a large network-mounted library.
+"""
+
+import os
+import json
+import time
+import logging
+from pathlib import Path
+from typing import Collection, Iterator, List, Optional, Set, Union
+
+from dcm.core.feature_store import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Directories modified this recently are not cached: a change within the same
+# mtime tick as the scan would otherwise go unnoticed on the next rescan
+MTIME_SLACK_NS = 2 * 10**9
+
+class ScanCache:
+    """
+    Directory listings keyed by path and modification time (JSON).
+
+    A directory's mtime changes whenever an entry is added, removed or
+    renamed in it, so an unchanged mtime means its cached listing is still
+    accurate. Subdirectories are still visited (and stat'ed), because changes
+    deeper in the tree do not touch their parents' mtimes.
+    """
+
+    def __init__(self, cache_path: Optional[Union[str, Path]] = None):
+        """
+        Args:
+            cache_path: Path to the cache file (None = keep in memory only)
+        """
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.directories = {}
+        self.hits = 0
+        self.misses = 0
+        if self.cache_path is not None and self.cache_path.exists():
+            try:
+                with open(self.cache_path, 'r') as f:
+                    self.directories = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.warning(f"Ignoring unreadable scan cache {self.cache_path}: {e}")
+
+    @classmethod
+    def for_output(cls, output_file: Optional[Union[str, Path]]) -> 'ScanCache':
+        """Get the scan cache that belongs to a feature output file."""
+        if not output_file:
+            return cls()
+        output_file = Path(output_file)
+        return cls(output_file.with_name(f"{output_file.name}.scan.json"))
+
+    def get(self, directory: str, mtime_ns: int) -> Optional[List[List]]:
+        """Cached [name, is_dir] entries of a directory, if its mtime is unchanged."""
+        cached = self.directories.get(directory)
+        if cached is not None and cached['mtime_ns'] == mtime_ns:
+            self.hits += 1
+            return cached['entries']
+        self.misses += 1
+        return None
+
+    def put(self, directory: str, mtime_ns: int, entries: List[List]) -> None:
+        """Remember the listing of a directory."""
+        if time.time_ns() - mtime_ns < MTIME_SLACK_NS:
+            self.directories.pop(directory, None)
+            return
+        self.directories[directory] = {'mtime_ns': mtime_ns, 'entries': entries}
+
+    def prune(self, root: str, visited: Set[str]) -> None:
+        """Forget directories under `root` that no longer exist."""
+        prefix = root.rstrip(os.sep) + os.sep
+        for directory in list(self.directories):
+            if (directory == root or directory.startswith(prefix)) and directory not in visited:
+                del self.directories[directory]
+
+    def save(self) -> None:
+        """Write the cache file."""
+        if self.cache_path is None:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(self.cache_path) as temp_file:
+            with open(temp_file, 'w') as f:
+                json.dump(self.directories, f)
+
+def _list_directory(directory: str) -> List[List]:
+    """Sorted [name, is_dir] entries of a directory."""
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                continue
+            entries.append([entry.name, is_dir])
+    entries.sort()
+    return entries
+
+def scan_files(
+    directory: Union[str, Path],
+    extensions: Collection[str],
+    cache: Optional[ScanCache] = None
+) -> Iterator[Path]:
+    """
+    Recursively yield files with the given extensions, in sorted path order.
+
+    Extensions are matched case-insensitively. Symlinked directories are
+    followed, but each directory is visited at most once.
+
+    Args:
+        directory: Root directory to scan
+        extensions: Lower-case extensions to match, including the dot
+        cache: Optional scan cache to consult and update
+
+    Yields:
+        Paths of matching files
+    """
+    root = os.path.abspath(directory)
+    extensions = {ext.lower() for ext in extensions}
+    visited = set()
+    visited_inodes = set()
+
+    def entries_of(path: str) -> Iterator[List]:
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            logger.warning(f"Cannot access {path}: {e}")
+            return iter(())
+        if (stat.st_dev, stat.st_ino) in visited_inodes:
+            return iter(())
+        visited_inodes.add((stat.st_dev, stat.st_ino))
+        visited.add(path)
+
+        entries = cache.get(path, stat.st_mtime_ns) if cache is not None else None
+        if entries is None:
+            try:
+                entries = _list_directory(path)
+            except OSError as e:
+                logger.warning(f"Cannot list {path}: {e}")
+                return iter(())
+            if cache is not None:
+                cache.put(path, stat.st_mtime_ns, entries)
+        return iter([(os.path.join(path, name), is_dir) for name, is_dir in entries])
+
+    # Depth-first over sorted listings, so files come out in path order
+    stack = [entries_of(root)]
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+            continue
+        path, is_dir = entry
+        if is_dir:
+            stack.append(entries_of(path))
+        elif os.path.splitext(path)[1].lower() in extensions:
+            yield Path(path)
+
+    if cache is not None:
+        cache.prune(root, visited)
@@ -3,13 +3,16 @@ Song recommendation engine for DCM Player.
 Uses cosine similarity and KNN to find musically similar songs.
 """
 
+import io
 import os
 import re
+import sys
 import json
 import time
+import hashlib
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Optional, Union, Tuple
+from typing import List, Dict, Iterable, Iterator, Optional, Union, Tuple
 
 import pandas as pd
 import numpy as np
@@ -28,6 +31,11 @@ from rich.panel import Panel
 from rich.text import Text
 from rich import box
 
+from dcm.core.ann_index import DEFAULT_N_PROBE, ExactCosineIndex, IVFIndex
+from dcm.core.concurrency import cpu_budget
+from dcm.core.feature_store import FEATURE_STORE_SUFFIX, load_feature_store
+from dcm.core.track_index import TrackIndex
+
 # Initialize console for rich output
 console = Console()
 
@@ -38,6 +46,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Query songs answered per neighbor search in batch mode
+QUERY_BATCH_SIZE = 1024
+
+# Neighbor search engines: exact search (blocked float32 cosine scoring, or
+# sklearn for other metrics), or an approximate inverted-file index for very
+# large libraries (see dcm.core.ann_index)
+NEIGHBOR_INDEXES = ('exact', 'ivf')
+
 class SongRecommender:
     """Song recommendation engine using audio feature similarity."""
     
@@ -54,6 +70,12 @@ class SongRecommender:
         self.pca = None
         self.model = None
         self.feature_columns = None
+        # Scaled and projected features of every loaded song (see build_embedding)
+        self.embedding = None
+        # Lookup of songs by path (see dcm.core.track_index)
+        self.track_index = None
+        # Fingerprint of the songs the neighbor index was fitted on (see library_fingerprint)
+        self.trained_fingerprint = None
         
         # Debug info
         logger.debug(f"Initializing SongRecommender with features_path={features_path}, model_path={model_path}")
@@ -78,7 +100,6 @@ class SongRecommender:
                 self.features_df = pd.DataFrame()
             
             logger.debug("SongRecommender initialization complete")
-            n
         except Exception as e:
             logger.error(f"Error initializing SongRecommender: {str(e)}")
             logger.debug(f"Features DataFrame: {self.features_df}")
@@ -88,16 +109,20 @@ class SongRecommender:
     
     def load_features(self, filepath: str) -> None:
         """
-        Load and preprocess song features from a CSV file.
+        Load and preprocess song features from a CSV file or binary feature store.
         
         Args:
-            filepath: Path to the CSV file containing song features
+            filepath: Path to the CSV file or .npy feature store containing song features
         """
         logger.info(f"Loading features from {filepath}")
         
         try:
-            # Read the CSV file with explicit handling for file paths
-            self.features_df = pd.read_csv(filepath, dtype={'file_path': str, 'file_name': str})
+            if str(filepath).endswith(FEATURE_STORE_SUFFIX):
+                # Memory-mapped float32 matrix, no parsing needed
+                self.features_df = load_feature_store(filepath)
+            else:
+                # Read the CSV file with explicit handling for file paths
+                self.features_df = pd.read_csv(filepath, dtype={'file_path': str, 'file_name': str})
             
             # Debug: Print the columns we found
             logger.debug(f"Columns in features file: {self.features_df.columns.tolist()}")
@@ -118,12 +143,22 @@ class SongRecommender:
             
             # Ensure file_path is treated as string and clean it
             self.features_df['file_path'] = self.features_df['file_path'].astype(str).str.strip()
+            self.track_index = TrackIndex(self.features_df['file_path'])
+            
+            # Set the feature columns (all numeric columns except metadata, and
+            # except columns no song has a value for yet); a loaded model keeps
+            # the columns its scaler and PCA were fitted on
+            if self.model is None:
+                metadata_columns = ['file_path', 'file_name', 'file_extension', 'file_size_mb']
+                self.feature_columns = [col for col in self.features_df.columns 
+                                      if col not in metadata_columns 
+                                      and pd.api.types.is_numeric_dtype(self.features_df[col])
+                                      and self.features_df[col].notna().any()]
             
-            # Set the feature columns (all numeric columns except metadata)
-            metadata_columns = ['file_path', 'file_name', 'file_extension', 'file_size_mb']
-            self.feature_columns = [col for col in self.features_df.columns 
-                                  if col not in metadata_columns 
-                                  and pd.api.types.is_numeric_dtype(self.features_df[col])]
+            # A model loaded before the features is projected onto the new songs
+            self.embedding = None
+            if self.model is not None:
+                self.attach_library()
             
             # Log some debug info
             logger.info(f"Loaded {len(self.features_df)} songs with {len(self.feature_columns)} features each")
@@ -137,6 +172,48 @@ class SongRecommender:
                     logger.error(f"First row data: {self.features_df.iloc[0].to_dict()}")
             raise
     
+    def feature_matrix(self) -> pd.DataFrame:
+        """
+        Get the feature columns of all songs, with missing values filled in.
+        
+        Songs from a two-tier extraction lack the heavy feature groups until
+        the background pass has filled them in. A missing value is replaced by
+        the column mean (or the mean the scaler was fitted with, for a column
+        no loaded song has yet), which scales to 0 and so neither pulls the
+        song towards nor pushes it away from any other.
+        """
+        X = self.features_df.reindex(columns=self.feature_columns)
+        fill = X.mean()
+        if hasattr(self.scaler, 'mean_'):
+            fill = fill.fillna(pd.Series(self.scaler.mean_, index=self.feature_columns))
+        return X.fillna(fill).fillna(0.0)
+    
+    def transform(self, X: Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        """Scale feature rows and project them onto the principal components, if any."""
+        X = self.scaler.transform(X)
+        if self.pca is not None:
+            X = self.pca.transform(X)
+        return X
+    
+    def build_embedding(self, X: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Compute and keep the embedding of all loaded songs.
+        
+        The embedding is computed once, when the model is trained or loaded,
+        and stored as a contiguous float32 matrix, so a query only looks up
+        its row instead of transforming the whole library again.
+        
+        Args:
+            X: Already transformed features of all songs (computed if None)
+            
+        Returns:
+            The (n_songs, n_components) embedding matrix
+        """
+        if X is None:
+            X = self.transform(self.feature_matrix())
+        self.embedding = np.ascontiguousarray(X, dtype=np.float32)
+        return self.embedding
+    
     def preprocess_features(self, n_components: float = 0.95) -> np.ndarray:
         """
         Preprocess features with scaling and optional PCA.
@@ -150,7 +227,7 @@ class SongRecommender:
         
         # Scale features
         logger.info("Scaling features...")
-        X = self.scaler.fit_transform(self.features_df[self.feature_columns])
+        X = self.scaler.fit_transform(self.feature_matrix())
         
         # Apply PCA if requested
         if n_components is not None:
@@ -161,19 +238,51 @@ class SongRecommender:
         
         return X
     
-    def train_model(self, n_neighbors: int = 5, metric: str = 'cosine') -> None:
-        """Train the KNN model on the preprocessed features."""
+    def train_model(
+        self,
+        n_neighbors: int = 5,
+        metric: str = 'cosine',
+        index: str = 'exact',
+        n_lists: Optional[int] = None,
+        n_probe: int = DEFAULT_N_PROBE
+    ) -> None:
+        """
+        Train the KNN model on the preprocessed features.
+        
+        Args:
+            n_neighbors: Default number of neighbors per query
+            metric: Distance metric of exact search ('ivf' supports only 'cosine')
+            index: Neighbor search engine, one of NEIGHBOR_INDEXES
+            n_lists: Number of IVF lists (None = about 4 * sqrt(n_songs))
+            n_probe: IVF lists searched per query; higher is slower but more accurate
+        """
         if self.features_df is None:
             raise ValueError("No features loaded. Call load_features() first.")
-        
-        X = self.preprocess_features()
-        
-        logger.info(f"Training KNN model with {n_neighbors} neighbors...")
-        self.model = NearestNeighbors(
-            n_neighbors=min(n_neighbors + 1, len(self.features_df)),  # +1 to exclude self
-            metric=metric,
-            n_jobs=-1  # Use all available cores
-        )
+        if index not in NEIGHBOR_INDEXES:
+            raise ValueError(f"Unknown neighbor index '{index}', expected one of {', '.join(NEIGHBOR_INDEXES)}")
+        if index == 'ivf' and metric != 'cosine':
+            raise ValueError("The IVF index only supports the cosine metric")
+        
+        X = self.build_embedding(self.preprocess_features())
+        self.trained_fingerprint = self.library_fingerprint()
+        
+        logger.info(f"Training KNN model ({index} search) with {n_neighbors} neighbors...")
+        if index == 'ivf':
+            self.model = IVFIndex(
+                n_neighbors=min(n_neighbors + 1, len(self.features_df)),  # +1 to exclude self
+                n_lists=n_lists,
+                n_probe=n_probe
+            )
+        elif metric == 'cosine':
+            self.model = ExactCosineIndex(
+                n_neighbors=min(n_neighbors + 1, len(self.features_df))  # +1 to exclude self
+            )
+        else:
+            self.model = NearestNeighbors(
+                n_neighbors=min(n_neighbors + 1, len(self.features_df)),  # +1 to exclude self
+                metric=metric,
+                n_jobs=cpu_budget()  # Stay within the DCM CPU budget
+            )
         self.model.fit(X)
         logger.info("Model training complete")
     
@@ -191,71 +300,172 @@ class SongRecommender:
         if self.features_df is None or self.model is None:
             raise ValueError("Features and model must be loaded before finding similar songs")
         
-        # Ensure file_path is treated as string
-        self.features_df['file_path'] = self.features_df['file_path'].astype(str)
-        
-        # Extract just the filename if a full path was provided
-        song_filename = os.path.basename(song_path)
-        
-        # Try to find the song in our features using different matching strategies
-        song_match = None
-        
-        # 1. Try exact match on full path
-        song_match = self.features_df[self.features_df['file_path'] == song_path]
-        
-        # 2. Try matching just the filename
-        if song_match.empty:
-            song_match = self.features_df[self.features_df['file_path'].str.endswith(song_filename)]
-        
-        # 3. Try partial match if filename contains ' - ' (common in music files)
-        if song_match.empty and ' - ' in song_filename:
-            song_part = song_filename.split(' - ')[0].strip()
-            song_match = self.features_df[self.features_df['file_path'].str.contains(song_part, regex=False)]
-        
-        # 4. Try with just the base filename (without extension)
-        if song_match.empty:
-            base_name = os.path.splitext(song_filename)[0]
-            song_match = self.features_df[self.features_df['file_path'].str.contains(base_name, regex=False)]
+        # Exact path, then file name, then artist or name as part of a path
+        song_idx = self.song_position(song_path)
         
-        if song_match.empty:
+        if song_idx is None:
             # For debugging: print available paths if we can't find a match
             logger.error(f"Could not find song: {song_path}")
-            logger.error(f"Available paths start with: {self.features_df['file_path'].head(3).tolist()}")
+            logger.error(f"Available paths start with: {self.track_index.paths[:3]}")
             raise ValueError(f"Song not found in database: {song_path}")
         
-        song_idx = song_match.index[0]
-        
         try:
-            # Get the song's features and find nearest neighbors
-            features = self.pca.transform(self.scaler.transform(
-                self.features_df[self.feature_columns]
-            ))
-            
-            distances, indices = self.model.kneighbors(
-                features[song_idx].reshape(1, -1),
-                n_neighbors=min(n_songs + 1, len(self.features_df))  # Ensure we don't ask for more than we have
-            )
-            
-            # Get the similar songs (skip the first one as it's the query song itself)
-            similar_indices = indices[0][1:]
-            similar_distances = 1 - distances[0][1:]  # Convert distance to similarity
-            
-            # Create result DataFrame
-            result = self.features_df.iloc[similar_indices].copy()
-            result['similarity_score'] = similar_distances
-            
-            # Sort by similarity (descending)
-            result = result.sort_values('similarity_score', ascending=False)
-            
-            return result
+            indices, similarities = self._neighbors([song_idx], n_songs)
+            return self._result_frame(indices[0], similarities[0])
             
         except Exception as e:
             logger.error(f"Error finding similar songs: {str(e)}")
-            logger.error(f"Features shape: {features.shape if 'features' in locals() else 'N/A'}")
+            logger.error(f"Features shape: {self.embedding.shape if self.embedding is not None else 'N/A'}")
             logger.error(f"Song index: {song_idx}")
             logger.error(f"Feature columns: {self.feature_columns}")
             raise
     
+    def find_similar_songs_batch(self, song_paths: List[str], n_songs: int = 5) -> List[pd.DataFrame]:
+        """
+        Find songs similar to each of several songs with one neighbor search.
+        
+        Args:
+            song_paths: Paths of the query songs (full paths or just filenames)
+            n_songs: Number of similar songs to return per query
+            
+        Returns:
+            One DataFrame per query song, in input order, as find_similar_songs
+            returns it; empty for songs that are not in the database
+        """
+        if self.features_df is None or self.model is None:
+            raise ValueError("Features and model must be loaded before finding similar songs")
+        
+        positions = [self.song_position(song_path) for song_path in song_paths]
+        found = [position for position in positions if position is not None]
+        if len(found) < len(positions):
+            logger.warning(f"{len(positions) - len(found)} of {len(positions)} query songs not found in database")
+        
+        results = iter(zip(*self._neighbors(found, n_songs))) if found else iter(())
+        empty = self.features_df.iloc[:0].copy()
+        empty['similarity_score'] = pd.Series(dtype=float)
+        return [
+            empty.copy() if position is None else self._result_frame(*next(results))
+            for position in positions
+        ]
+    
+    def iter_similar_songs(
+        self,
+        song_paths: Iterable[str],
+        n_songs: int = 5,
+        batch_size: int = QUERY_BATCH_SIZE
+    ) -> Iterator[Dict]:
+        """
+        Stream similar songs for a (possibly very long) sequence of query songs.
+        
+        Queries are consumed lazily and answered `batch_size` at a time with
+        one neighbor search per batch. Results are plain dicts, ready to be
+        written as JSON lines, so large jobs do not build a DataFrame per query.
+        
+        Args:
+            song_paths: Paths of the query songs; may be a lazy iterable
+            n_songs: Number of similar songs to return per query
+            batch_size: Number of queries per neighbor search
+            
+        Yields:
+            {'query': path, 'results': [{'file_path': ..., 'similarity_score': ...}, ...]}
+            per query in input order, or {'query': path, 'error': message}
+            for songs that are not in the database
+        """
+        if self.features_df is None or self.model is None:
+            raise ValueError("Features and model must be loaded before finding similar songs")
+        
+        song_paths = iter(song_paths)
+        while True:
+            batch = [song_path for _, song_path in zip(range(batch_size), song_paths)]
+            if not batch:
+                return
+            
+            positions = [self.song_position(song_path) for song_path in batch]
+            found = [position for position in positions if position is not None]
+            results = iter(zip(*self._neighbors(found, n_songs))) if found else iter(())
+            for song_path, position in zip(batch, positions):
+                if position is None:
+                    yield {'query': song_path, 'error': 'Song not found in database'}
+                    continue
+                indices, similarities = next(results)
+                yield {
+                    'query': song_path,
+                    'results': [
+                        {'file_path': self.track_index.paths[i], 'similarity_score': round(float(similarity), 6)}
+                        for i, similarity in zip(indices, similarities)
+                    ]
+                }
+    
+    def song_position(self, song_path: str) -> Optional[int]:
+        """Row of a song in the features (see TrackIndex.find), or None if it is not there."""
+        if self.track_index is None:
+            self.track_index = TrackIndex(self.features_df['file_path'])
+        return self.track_index.find(song_path)
+    
+    def _neighbors(self, positions: List[int], n_songs: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the nearest songs of several songs with one vectorized search.
+        
+        Args:
+            positions: Rows of the query songs
+            n_songs: Number of neighbors per query song
+            
+        Returns:
+            Tuple of (row indices, similarity scores) arrays with one row per
+            query song, most similar first, not including the query song itself
+        """
+        features = self.embedding if self.embedding is not None else self.build_embedding()
+        positions = np.asarray(positions, dtype=np.intp)
+        n_neighbors = min(n_songs + 1, len(self.features_df))  # Ensure we don't ask for more than we have
+        distances, indices = self.model.kneighbors(features[positions], n_neighbors=n_neighbors)
+        
+        # Drop each query song from its own neighbors (or the farthest
+        # neighbor, when an exact duplicate pushed the query song out)
+        own = indices == positions[:, None]
+        own[~own.any(axis=1), -1] = True
+        shape = (len(positions), n_neighbors - 1)
+        return indices[~own].reshape(shape), 1 - distances[~own].reshape(shape)  # Distance to similarity
+    
+    def library_fingerprint(self) -> str:
+        """Fingerprint of the loaded songs and their order, which the neighbor indices refer to."""
+        digest = hashlib.sha1(f"{len(self.features_df)}\n".encode())
+        for path in self.features_df['file_path']:
+            digest.update(f"{path}\n".encode())
+        return digest.hexdigest()
+    
+    def attach_library(self) -> None:
+        """
+        Use a loaded model with the loaded songs.
+        
+        The songs are projected with the model's scaler and PCA. The neighbor
+        index returns row numbers of the songs it was fitted on, so if the
+        loaded songs are not those (in the same order), the index is refitted
+        on the new embedding instead of returning the wrong songs.
+        """
+        self.build_embedding()
+        fingerprint = self.library_fingerprint()
+        if self.trained_fingerprint is not None:
+            same_library = self.trained_fingerprint == fingerprint
+        else:
+            # Models saved without a fingerprint can only be checked by size
+            same_library = getattr(self.model, 'n_samples_fit_', None) == len(self.features_df)
+        
+        if not same_library:
+            logger.warning(
+                f"Loaded features ({len(self.features_df)} songs) differ from the songs the model "
+                "was trained on; refitting the neighbor index on the loaded songs"
+            )
+            self.model.fit(self.embedding)
+            self.trained_fingerprint = fingerprint
+    
+    def _result_frame(self, indices: np.ndarray, similarities: np.ndarray) -> pd.DataFrame:
+        """Build the result DataFrame of one query from its neighbors."""
+        result = self.features_df.iloc[indices].copy()
+        result['similarity_score'] = similarities
+        
+        # Sort by similarity (descending)
+        return result.sort_values('similarity_score', ascending=False)
+    
     def save_model(self, output_path: str) -> None:
         """Save the trained model and preprocessing objects."""
         if not os.path.exists(os.path.dirname(output_path)):
@@ -265,7 +475,8 @@ class SongRecommender:
             'scaler': self.scaler,
             'pca': self.pca,
             'model': self.model,
-            'feature_columns': self.feature_columns
+            'feature_columns': self.feature_columns,
+            'library_fingerprint': self.trained_fingerprint
         }
         
         joblib.dump(model_data, output_path)
@@ -281,9 +492,14 @@ class SongRecommender:
         self.scaler = model_data.get('scaler', StandardScaler())
         self.pca = model_data.get('pca')
         self.feature_columns = model_data.get('feature_columns', [])
+        self.trained_fingerprint = model_data.get('library_fingerprint')
         
         if self.model is None or self.pca is None:
             raise ValueError("Invalid model file: missing required components")
+        
+        self.embedding = None
+        if self.features_df is not None and not self.features_df.empty:
+            self.attach_library()
             
         logger.info(f"Loaded model from {model_path}")
         return self
@@ -323,13 +539,20 @@ def format_duration(seconds: float) -> str:
     minutes, seconds = divmod(int(seconds), 60)
     return f"{minutes}:{seconds:02d}"
 
-def print_similar_songs(query_song: str, similar_songs: pd.DataFrame, features_df: pd.DataFrame):
+def print_similar_songs(
+    query_song: str,
+    similar_songs: pd.DataFrame,
+    features_df: pd.DataFrame,
+    track_index: Optional[TrackIndex] = None
+):
     """Print similar songs in a formatted table.
     
     Args:
         query_song: Path to the query song
         similar_songs: DataFrame containing similar songs and their similarity scores
         features_df: DataFrame containing all song features
+        track_index: Lookup of features_df's paths (built from features_df if None),
+            used to find the query song the same way find_similar_songs does
     """
     if features_df is None or features_df.empty:
         console.print("[red]Error:[/] No song features loaded")
@@ -361,25 +584,14 @@ def print_similar_songs(query_song: str, similar_songs: pd.DataFrame, features_d
         if 'file_path' not in features_df.columns:
             raise KeyError("'file_path' column not found in features data")
             
-        # Ensure we're working with strings
-        features_df['file_path'] = features_df['file_path'].astype(str)
-        
-        # Try exact match first
-        query_match = features_df[features_df['file_path'].str.endswith(query_filename, na=False)]
-        
-        # If no exact match, try partial match
-        if query_match.empty and ' - ' in query_filename:
-            song_part = query_filename.split(' - ')[0].strip()
-            query_match = features_df[features_df['file_path'].str.contains(song_part, na=False, regex=False)]
-        
-        # If still no match, try with just the base filename
-        if query_match.empty:
-            base_name = os.path.splitext(query_filename)[0]
-            query_match = features_df[features_df['file_path'].str.contains(base_name, na=False, regex=False)]
+        # Exact path, then file name, then artist or name as part of a path
+        if track_index is None:
+            track_index = TrackIndex(features_df['file_path'])
+        query_idx = track_index.find(query_song)
         
         # Get duration if we found a match
-        if not query_match.empty:
-            query_duration = query_match['duration'].iloc[0]
+        if query_idx is not None:
+            query_duration = features_df['duration'].iloc[query_idx] if 'duration' in features_df.columns else 0
             console.print(f"[green]✓[/] Found query song in features")
         else:
             query_duration = 0
@@ -451,6 +663,60 @@ def print_similar_songs(query_song: str, similar_songs: pd.DataFrame, features_d
         console.print(f"- Features columns: {features_df.columns.tolist() if not features_df.empty else 'Empty'}")
         console.print(f"- Similar songs columns: {similar_songs.columns.tolist() if not similar_songs.empty else 'Empty'}")
 
+def stream_queries(
+    recommender: SongRecommender,
+    queries_file: str,
+    n_songs: int = 5,
+    output_file: Optional[str] = None,
+    batch_size: int = QUERY_BATCH_SIZE
+) -> int:
+    """
+    Answer query songs read from a file or stdin, writing JSON lines.
+    
+    One JSON object is written per query, in input order (see
+    SongRecommender.iter_similar_songs), and output is flushed after every
+    batch, so another process can consume results while the job runs. Blank
+    lines are skipped; a line that is not valid UTF-8 is read with
+    replacement characters, so it gets a not-found record instead of
+    aborting the job.
+    
+    Args:
+        recommender: Recommender with features and model loaded
+        queries_file: File with one query path per line, or '-' for stdin
+        n_songs: Number of similar songs per query
+        output_file: File to write to (None = stdout)
+        batch_size: Query songs answered per neighbor search
+        
+    Returns:
+        Exit status: 0 if every query song was found, 1 otherwise
+    """
+    if queries_file == '-':
+        source = sys.stdin
+        if isinstance(source, io.TextIOWrapper):
+            source.reconfigure(errors='replace')
+    else:
+        source = open(queries_file, encoding='utf-8', errors='replace')
+    sink = open(output_file, 'w', encoding='utf-8') if output_file else sys.stdout
+    answered = missing = 0
+    start_time = time.time()
+    try:
+        queries = (line.strip() for line in source if line.strip())
+        for record in recommender.iter_similar_songs(queries, n_songs, batch_size):
+            sink.write(json.dumps(record) + '\n')
+            answered += 1
+            missing += 'error' in record
+            if answered % batch_size == 0:
+                sink.flush()
+        sink.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+    
+    logger.info(f"Answered {answered} queries in {time.time() - start_time:.1f}s ({missing} not found)")
+    return 1 if missing else 0
+
 def main():
     """Main entry point for the recommendation system."""
     import argparse
@@ -468,7 +734,8 @@ def main():
     )
     parser.add_argument(
         "query_song",
-        help="Path to the query song (must be in the features file)"
+        nargs="?",
+        help="Path to the query song (must be in the features file); omit with --queries"
     )
     
     # Optional arguments
@@ -480,7 +747,19 @@ def main():
     )
     parser.add_argument(
         "-o", "--output",
-        help="Output file for results (CSV)"
+        help="Output file for results (CSV, or JSON lines with --queries)"
+    )
+    parser.add_argument(
+        "--queries",
+        metavar="FILE",
+        help="Answer every query song listed in FILE, one path per line ('-' for stdin), "
+             "and stream one JSON result per line to --output or stdout"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=QUERY_BATCH_SIZE,
+        help="Query songs answered per neighbor search with --queries"
     )
     parser.add_argument(
         "--save-model",
@@ -490,6 +769,22 @@ def main():
         "--load-model",
         help="Path to load a pre-trained model"
     )
+    parser.add_argument(
+        "--index",
+        choices=NEIGHBOR_INDEXES,
+        default="exact",
+        help="Neighbor search engine; 'ivf' is approximate and scales to millions of songs"
+    )
+    parser.add_argument(
+        "--n-lists",
+        type=int,
+        help="Number of IVF lists (default: about 4 * sqrt(number of songs))"
+    )
+    parser.add_argument(
+        "--n-probe",
+        type=int,
+        help=f"IVF lists searched per query; more is slower but more accurate (default: {DEFAULT_N_PROBE})"
+    )
     parser.add_argument(
         "--debug",
         action="store_true",
@@ -497,6 +792,11 @@ def main():
     )
     
     args = parser.parse_args()
+    if not args.query_song and not args.queries:
+        parser.error("a query song or --queries is required")
+    
+    # Keep stdout clean for the JSON lines of --queries
+    status_console = Console(stderr=True) if args.queries else console
     
     # Configure logging level
     if args.debug:
@@ -509,7 +809,7 @@ def main():
         logger.debug("Debug logging enabled")
     
     # Initialize recommender with progress
-    with console.status("[bold green]Initializing...") as status:
+    with status_console.status("[bold green]Initializing...") as status:
         try:
             # Always load features file, even with a pre-trained model
             recommender = SongRecommender(
@@ -529,13 +829,21 @@ def main():
     
     # Train or load model with progress
     if args.load_model:
-        console.print(f"[green]✓[/] Using pre-trained model from {args.load_model}")
+        status_console.print(f"[green]✓[/] Using pre-trained model from {args.load_model}")
+        if args.n_probe and isinstance(recommender.model, IVFIndex):
+            recommender.model.n_probe = args.n_probe
     else:
-        with console.status("[bold green]Training recommendation model..."):
-            recommender.train_model(n_neighbors=args.num_songs)
+        with status_console.status("[bold green]Training recommendation model..."):
+            recommender.train_model(
+                n_neighbors=args.num_songs, index=args.index,
+                n_lists=args.n_lists, n_probe=args.n_probe or DEFAULT_N_PROBE
+            )
             if args.save_model:
                 recommender.save_model(args.save_model)
-                console.print(f"[green]✓[/] Model saved to {args.save_model}")
+                status_console.print(f"[green]✓[/] Model saved to {args.save_model}")
+    
+    if args.queries:
+        return stream_queries(recommender, args.queries, args.num_songs, args.output, args.batch_size)
     
     # Find similar songs
     try:
@@ -546,7 +854,9 @@ def main():
             )
         
         # Print results
-        print_similar_songs(args.query_song, similar_songs, recommender.features_df)
+        print_similar_songs(
+            args.query_song, similar_songs, recommender.features_df, recommender.track_index
+        )
         
         # Save to file if requested
         if args.output:
@@ -560,5 +870,4 @@ def main():
     return 0
 
 if __name__ == "__main__":
-    import sys
     sys.exit(main())
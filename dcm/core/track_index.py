@@ -0,0 +1,140 @@
+"""
+Track lookup index for DCM.
+
+The recommender and the playlist generator both have to turn a user-supplied
+song path into a row of the feature table. Scanning the file_path column for
+every query (exact match, then suffix and substring matches) costs O(N) per
+lookup. A TrackIndex is built once when the features are loaded and resolves
+a query with dictionary lookups instead:
+
+1. the exact path,
+2. the file name (tracks in another directory, or given without one),
+3. for "Artist - Title" names, the artist part as a substring of a path,
+4. the file name without extension as a substring of a path.
+
+Substring queries go through an inverted index of the word tokens of every
+path: only the tracks that contain all of the query's tokens are checked for
+the actual substring, so a query costs O(k) in the number of candidates
+rather than O(N). When several tracks match at a step, the first one in
+table order wins, as with the column scans this replaces; for substrings,
+tracks that contain the query's words as whole words are preferred, and
+the rest of the table is only scanned when the query starts or ends in
+the middle of a word and no such track matches.
+"""
+
+import os
+import re
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Word tokens of paths and queries
+TOKEN_PATTERN = re.compile(r'\w+')
+
+class TrackIndex:
+    """Exact, file name and token lookups of the tracks of a feature table."""
+
+    def __init__(self, paths: Iterable[str]):
+        """
+        Args:
+            paths: file_path column of the feature table, in row order
+        """
+        self.paths: List[str] = [str(path).strip() for path in paths]
+        self._by_path: Dict[str, int] = {}
+        self._by_name: Dict[str, int] = {}
+        self._by_token: Dict[str, List[int]] = {}
+
+        for position, path in enumerate(self.paths):
+            self._by_path.setdefault(path, position)
+            self._by_name.setdefault(os.path.basename(path), position)
+            for token in set(_tokens(path)):
+                self._by_token.setdefault(token, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def __contains__(self, path: str) -> bool:
+        return str(path).strip() in self._by_path
+
+    def position(self, path: str) -> Optional[int]:
+        """Row of an exact path, or None if it is not in the table."""
+        return self._by_path.get(str(path).strip())
+
+    def find(self, query: str) -> Optional[int]:
+        """
+        Resolve a song path the way a user would expect (see module docstring).
+
+        Args:
+            query: Full path, file name, or part of a path
+
+        Returns:
+            Row of the matching track, or None if nothing matches
+        """
+        query = str(query).strip()
+        position = self._by_path.get(query)
+        if position is not None:
+            return position
+
+        file_name = os.path.basename(query)
+        position = self._by_name.get(file_name)
+        if position is not None:
+            return position
+
+        if ' - ' in file_name:
+            position = self.find_substring(file_name.split(' - ')[0].strip())
+            if position is not None:
+                return position
+
+        return self.find_substring(os.path.splitext(file_name)[0])
+
+    def find_substring(self, text: str) -> Optional[int]:
+        """
+        Find the first track whose path contains `text`.
+
+        Args:
+            text: Substring to look for (case-sensitive)
+
+        Returns:
+            Row of the first matching track, or None
+        """
+        if not text:
+            return None
+        for candidates in self._candidates(text):
+            for position in candidates:
+                if text in self.paths[position]:
+                    return position
+        return None
+
+    def _candidates(self, text: str) -> Iterator[Iterable[int]]:
+        """Rows that may contain `text`, in table order, most likely rows first."""
+        tokens = _tokens(text)
+        if not tokens:
+            yield range(len(self.paths))
+            return
+        # Rows that have every token of the text as a whole token
+        yield self._intersection(tokens)
+
+        # The outer tokens may also be cut-off parts of longer path tokens;
+        # only tokens delimited on both sides are sure to occur whole
+        inner = tokens[:]
+        if inner and TOKEN_PATTERN.match(text[-1]):
+            inner.pop()
+        if inner and TOKEN_PATTERN.match(text[0]):
+            inner.pop(0)
+        if inner != tokens:
+            yield self._intersection(inner) if inner else range(len(self.paths))
+
+    def _intersection(self, tokens: List[str]) -> List[int]:
+        """Rows that have all of the given tokens, in table order."""
+        postings = sorted((self._by_token.get(token, []) for token in set(tokens)), key=len)
+        candidates: Set[int] = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                break
+        return sorted(candidates)
+
+def _tokens(text: str) -> List[str]:
+    """Lower-cased word tokens of a path or query."""
+    return TOKEN_PATTERN.findall(text.lower())
@@ -0,0 +1,415 @@
+"""
+Supervised worker pool for DCM.
+
+Runs tasks in worker processes under a per-task wall-clock and memory budget.
+A worker that exceeds its budget, hangs or crashes is killed (together with
+any decoder subprocess it started) and replaced, and its task is reported as
+failed, so a single pathological file cannot stall a batch.
+
+Tasks can optionally be split into two stages: an I/O-bound `prepare` stage
+that a reader thread in each worker runs ahead of time into a bounded queue,
+and a CPU-bound stage that consumes it. Per-stage timings show which stage
+limits throughput.
+
+Workers also report the peak resident memory of every task (on Linux), so a
+footprint that grows over a long batch shows up in the logs.
+"""
+
+import os
+import queue
+import signal
+import threading
+import time
+import logging
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import wait
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Seconds between budget checks of busy workers
+POLL_INTERVAL = 0.5
+
+# Per-task stage timings reported by workers, in seconds
+STAGE_TIMINGS = ('prepare', 'prepare_blocked', 'compute', 'compute_starved')
+
+def _describe(e: Exception) -> str:
+    return f"{type(e).__name__}: {e}"
+
+def _run_tasks(conn, func: Callable) -> None:
+    """Single-stage worker loop: receive a task, run it, send the result."""
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        key, args = task
+        reset_peak_memory()
+        started = time.perf_counter()
+        try:
+            value, error = func(*args), None
+        except Exception as e:
+            value, error = None, _describe(e)
+        stats = {'compute': time.perf_counter() - started, 'peak_rss_mb': peak_memory_mb()}
+        conn.send((key, value, error, stats))
+
+def _run_pipelined_tasks(conn, func: Callable, prepare: Callable, queue_depth: int) -> None:
+    """
+    Two-stage worker loop.
+
+    A reader thread receives tasks and runs `prepare` on them into a queue of
+    at most `queue_depth` prepared tasks; this thread runs `func` on them in
+    order and sends the results. The peak memory of a task is measured over
+    its compute stage, and so includes decoding done ahead meanwhile.
+    """
+    prepared = queue.Queue(maxsize=queue_depth)
+
+    def reader():
+        while True:
+            try:
+                task = conn.recv()
+            except (EOFError, OSError):
+                task = None
+            if task is None:
+                prepared.put(None)
+                return
+            key, args = task
+            started = time.perf_counter()
+            try:
+                value, error = prepare(*args), None
+            except Exception as e:
+                value, error = None, _describe(e)
+            stats = {'prepare': time.perf_counter() - started}
+            started = time.perf_counter()
+            prepared.put((key, args, value, error, stats))
+            stats['prepare_blocked'] = time.perf_counter() - started
+
+    threading.Thread(target=reader, daemon=True).start()
+
+    while True:
+        started = time.perf_counter()
+        item = prepared.get()
+        compute_starved = time.perf_counter() - started
+        if item is None:
+            break
+        key, args, value, error, stats = item
+        stats['compute_starved'] = compute_starved
+        if error is None:
+            reset_peak_memory()
+            started = time.perf_counter()
+            try:
+                value = func(value, *args)
+            except Exception as e:
+                value, error = None, _describe(e)
+            stats['compute'] = time.perf_counter() - started
+            stats['peak_rss_mb'] = peak_memory_mb()
+        conn.send((key, value, error, stats))
+
+def _worker_main(
+    conn,
+    func: Callable,
+    prepare: Optional[Callable],
+    queue_depth: int,
+    initializer: Optional[Callable],
+    initargs: Tuple
+) -> None:
+    """Worker process entry point: run tasks received over `conn` until told to stop."""
+    if hasattr(os, 'setpgrp'):
+        # Own process group, so killing the worker also kills decoder subprocesses
+        os.setpgrp()
+    if initializer is not None:
+        initializer(*initargs)
+
+    if prepare is None:
+        _run_tasks(conn, func)
+    else:
+        _run_pipelined_tasks(conn, func, prepare, queue_depth)
+
+def _proc_status_mb(pid: Union[int, str], field: str) -> Optional[float]:
+    """A memory field of /proc/<pid>/status in MB, or None where /proc is unavailable."""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith(f'{field}:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def _resident_memory_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process in MB, or None where /proc is unavailable."""
+    return _proc_status_mb(pid, 'VmRSS')
+
+def reset_peak_memory() -> bool:
+    """
+    Reset the peak resident set size of this process to its current size.
+
+    Returns:
+        True if the kernel supports resetting it (Linux 4.0+)
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_memory_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB since the last reset, if known."""
+    return _proc_status_mb('self', 'VmHWM')
+
+class PeakMemoryStats:
+    """Peak resident memory per task, aggregated over a run."""
+
+    def __init__(self):
+        self.tasks = 0
+        self.total_mb = 0.0
+        self.max_mb = 0.0
+        self.max_key = None
+
+    def add(self, key: Any, peak_mb: Optional[float]) -> None:
+        """Record the peak memory of one task (None if it was not measured)."""
+        if peak_mb is None:
+            return
+        logger.debug(f"{key}: peak memory {peak_mb:.0f} MB")
+        self.tasks += 1
+        self.total_mb += peak_mb
+        if peak_mb > self.max_mb:
+            self.max_mb, self.max_key = peak_mb, key
+
+    def report(self) -> str:
+        """Summarize the recorded peaks."""
+        if not self.tasks:
+            return "not measured on this platform"
+        return (
+            f"{self.total_mb / self.tasks:.0f} MB per task on average, "
+            f"{self.max_mb:.0f} MB at most ({self.max_key})"
+        )
+
+class _Worker:
+    """A worker process and the tasks it is currently running, oldest first."""
+
+    def __init__(self, context, target_args: Tuple):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn,) + target_args, daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = deque()
+        self.started = None
+
+    def submit(self, key: Any, args: Tuple) -> None:
+        if not self.tasks:
+            self.started = time.monotonic()
+        self.tasks.append((key, args))
+        self.conn.send((key, args))
+
+    def finish(self) -> None:
+        """Retire the oldest task; the budget clock restarts for the next one."""
+        self.tasks.popleft()
+        self.started = time.monotonic() if self.tasks else None
+
+    @property
+    def busy(self) -> bool:
+        return bool(self.tasks)
+
+    def kill(self) -> None:
+        """Kill the worker and everything in its process group."""
+        try:
+            if hasattr(os, 'killpg'):
+                os.killpg(self.process.pid, signal.SIGKILL)
+            else:
+                self.process.kill()
+        except (ProcessLookupError, PermissionError):
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self) -> None:
+        """Ask an idle worker to exit, killing it if it does not."""
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+class SupervisedPool:
+    """
+    Process pool that enforces a wall-clock and memory budget per task.
+
+    Results are yielded as (key, value, error) tuples in completion order,
+    where `error` is None on success and a description of the failure
+    otherwise (an exception raised by the task, a timeout, an exceeded memory
+    budget or a crashed worker).
+
+    With a `prepare` function each task runs as `func(prepare(*args), *args)`,
+    and every worker prepares up to `queue_depth` upcoming tasks in a
+    background thread while it computes the current one. The budget applies
+    to a worker's oldest outstanding task; when a worker is killed, its other
+    outstanding tasks are resubmitted.
+    """
+
+    def __init__(
+        self,
+        func: Callable,
+        workers: int = 1,
+        timeout: Optional[Union[float, Callable[[Any], Optional[float]]]] = None,
+        memory_limit_mb: Optional[float] = None,
+        initializer: Optional[Callable] = None,
+        initargs: Tuple = (),
+        prepare: Optional[Callable] = None,
+        queue_depth: int = 2
+    ):
+        """
+        Args:
+            func: Picklable module-level function run for each task
+            workers: Number of worker processes
+            timeout: Wall-clock budget per task in seconds (None = unlimited), or a
+                function giving the budget of a task from its key
+            memory_limit_mb: Resident memory budget per worker in MB (None = unlimited)
+            initializer: Optional function run once in each new worker
+            initargs: Arguments for the initializer
+            prepare: Optional picklable function for the I/O stage of each task
+            queue_depth: Prepared tasks each worker may hold ahead of the compute stage
+        """
+        self.func = func
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.initializer = initializer
+        self.initargs = initargs
+        self.prepare = prepare
+        self.queue_depth = max(1, queue_depth)
+        self.timings = dict.fromkeys(STAGE_TIMINGS, 0.0)
+        self.peak_memory = PeakMemoryStats()
+        self._timeouts = {}
+        self._context = multiprocessing.get_context()
+
+        if memory_limit_mb and _resident_memory_mb(os.getpid()) is None:
+            logger.warning("Memory budget is not supported on this platform and will not be enforced")
+
+    @property
+    def _tasks_in_flight(self) -> int:
+        # One task in each stage plus a full queue between them
+        return 1 if self.prepare is None else self.queue_depth + 2
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._context, (
+            self.func, self.prepare, self.queue_depth, self.initializer, self.initargs
+        ))
+
+    def _timeout_of(self, key: Any) -> Optional[float]:
+        """Wall-clock budget of a task, computed once while it is outstanding."""
+        if not callable(self.timeout):
+            return self.timeout
+        if key not in self._timeouts:
+            self._timeouts[key] = self.timeout(key)
+        return self._timeouts[key]
+
+    def _check_budget(self, worker: _Worker) -> Optional[str]:
+        """Describe how a busy worker exceeded its budget, if it did."""
+        elapsed = time.monotonic() - worker.started
+        timeout = self._timeout_of(worker.tasks[0][0])
+        if timeout and elapsed > timeout:
+            return f"Timed out after {elapsed:.0f}s"
+        if self.memory_limit_mb:
+            rss = _resident_memory_mb(worker.process.pid)
+            if rss is not None and rss > self.memory_limit_mb:
+                return f"Exceeded memory limit ({rss:.0f} MB > {self.memory_limit_mb:.0f} MB)"
+        return None
+
+    def bottleneck_report(self) -> str:
+        """Summarize the accumulated stage timings of a two-stage pool."""
+        t = self.timings
+        if t['prepare_blocked'] > t['compute_starved']:
+            verdict = "compute is the bottleneck (prepared tasks waited for it)"
+        else:
+            verdict = "prepare is the bottleneck (compute waited for input)"
+        return (
+            f"prepare {t['prepare']:.1f}s (blocked on full queue {t['prepare_blocked']:.1f}s), "
+            f"compute {t['compute']:.1f}s (starved {t['compute_starved']:.1f}s): {verdict}"
+        )
+
+    def imap_unordered(self, tasks: Iterable[Tuple[Any, Tuple]]) -> Iterator[Tuple[Any, Any, Optional[str]]]:
+        """
+        Run tasks and yield their results as they complete.
+
+        Args:
+            tasks: (key, args) pairs; `func(*args)` is run for each
+
+        Yields:
+            (key, value, error) tuples
+        """
+        tasks = iter(tasks)
+        retry = deque()
+        pool = [self._spawn() for _ in range(self.workers)]
+
+        def fill(worker: _Worker) -> None:
+            while len(worker.tasks) < self._tasks_in_flight:
+                task = retry.popleft() if retry else next(tasks, None)
+                if task is None:
+                    return
+                worker.submit(*task)
+
+        try:
+            for worker in pool:
+                fill(worker)
+
+            while any(worker.busy for worker in pool):
+                busy = [worker for worker in pool if worker.busy]
+                ready = wait(
+                    [worker.conn for worker in busy] + [worker.process.sentinel for worker in busy],
+                    timeout=POLL_INTERVAL
+                )
+
+                for i, worker in enumerate(pool):
+                    if not worker.busy:
+                        continue
+
+                    error = None
+                    if worker.conn in ready:
+                        try:
+                            key, value, task_error, stats = worker.conn.recv()
+                        except (EOFError, OSError):
+                            error = f"Worker exited with code {worker.process.exitcode}"
+                        else:
+                            self.peak_memory.add(key, stats.pop('peak_rss_mb', None))
+                            for stage, seconds in stats.items():
+                                self.timings[stage] += seconds
+                            worker.finish()
+                            self._timeouts.pop(key, None)
+                            yield key, value, task_error
+                            fill(worker)
+                            continue
+                    elif worker.process.sentinel in ready:
+                        worker.process.join()
+                        error = f"Worker exited with code {worker.process.exitcode}"
+                    else:
+                        error = self._check_budget(worker)
+
+                    if error is None:
+                        continue
+
+                    # Replace the failed worker and resubmit its other tasks
+                    key, _ = worker.tasks.popleft()
+                    retry.extendleft(reversed(worker.tasks))
+                    logger.warning(f"Killing worker {worker.process.pid}: {error}")
+                    worker.kill()
+                    pool[i] = self._spawn()
+                    self._timeouts.pop(key, None)
+                    yield key, None, error
+                    fill(pool[i])
+        finally:
+            for worker in pool:
+                if worker.busy:
+                    worker.kill()
+                else:
+                    worker.stop()
@@ -1,13 +1,29 @@
 """
 Script to batch extract features from all audio files in the DATA directory.
+
+All albums are extracted in this one process on a single pool of worker
+processes, so librosa is imported and warmed up once per worker rather than
+once per album, and files from different albums are balanced across workers.
+Each album still gets its own `<album>_features.csv`.
 """
 
 import argparse
 import logging
 import os
+import sys
 from pathlib import Path
 import time
-from tqdm import tqdm
+
+# Allow running as a plain script from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dcm.core.extract_features import (
+    CHUNK_DURATION, DEFAULT_AUDIO_CACHE_SIZE_GB, DEFAULT_PROFILE, EXTRACTION_PROFILES, FILE_TIMEOUT,
+    FILE_TIMEOUT_PER_MINUTE, LIGHT_FEATURE_GROUPS, PIPELINE_QUEUE_DEPTH, backfill_arguments,
+    process_directories, start_backfill
+)
+from dcm.core.concurrency import set_cpu_budget
+from dcm.core.merge_features import find_album_files, merge_feature_files
 
 # Set up logging
 logging.basicConfig(
@@ -20,36 +36,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def process_album(album_path, output_dir, force=False):
-    """Process all audio files in a single album directory."""
-    try:
-        # Create a safe directory name for output
-        album_name = os.path.basename(album_path.rstrip('/'))
-        safe_album_name = "".join(c if c.isalnum() or c in ' ._-' else '_' for c in album_name)
-        output_file = os.path.join(output_dir, f"{safe_album_name}_features.csv")
-        
-        # Skip if output file exists and force is False
-        if not force and os.path.exists(output_file):
-            logger.info(f"Skipping {album_name} - features already extracted")
-            return True
-            
-        logger.info(f"Processing album: {album_name}")
-        
-        # Run the extract command
-        cmd = f"dcm extract \"{album_path}\" -o \"{output_file}\""
-        if force:
-            cmd += " --force"
-        
-        return_code = os.system(cmd)
-        if return_code != 0:
-            logger.error(f"Error processing {album_name}")
-            return False
-            
-        return True
-        
-    except Exception as e:
-        logger.error(f"Error processing {album_path}: {str(e)}")
-        return False
+def album_output_file(album_path, output_dir):
+    """Get the feature file of an album directory."""
+    # Create a safe file name for output
+    album_name = os.path.basename(album_path.rstrip('/'))
+    safe_album_name = "".join(c if c.isalnum() or c in ' ._-' else '_' for c in album_name)
+    return os.path.join(output_dir, f"{safe_album_name}_features.csv")
 
 def main():
     parser = argparse.ArgumentParser(description='Batch extract features from music library')
@@ -60,9 +52,41 @@ def main():
     parser.add_argument('-f', '--force', action='store_true',
                        help='Force re-extraction even if features exist')
     parser.add_argument('--max-workers', type=int, default=1,
-                       help='Number of parallel workers (not implemented yet)')
+                       help='Number of parallel worker processes, 0 for one per CPU (default: 1)')
+    parser.add_argument('--cpus', type=int,
+                       help='CPUs to use in total (default: all, or the DCM_CPUS environment variable)')
+    parser.add_argument('-p', '--profile', choices=sorted(EXTRACTION_PROFILES), default=DEFAULT_PROFILE,
+                       help=f'Extraction profile (default: {DEFAULT_PROFILE})')
+    parser.add_argument('--chunk-threads', type=int, default=1, metavar='N',
+                       help='Analyze long tracks in chunks on N threads each, 0 for the CPUs '
+                            'left per worker (default: 1)')
+    parser.add_argument('--chunk-duration', type=float, default=CHUNK_DURATION,
+                       help=f'Chunk length in seconds for --chunk-threads (default: {CHUNK_DURATION:g})')
+    parser.add_argument('--cache', metavar='FILE',
+                       help='Persistent feature cache shared by all albums')
+    parser.add_argument('--audio-cache', metavar='DIR',
+                       help='Cache decoded audio in DIR, so re-extracting with other settings skips decoding')
+    parser.add_argument('--audio-cache-size', type=float, default=DEFAULT_AUDIO_CACHE_SIZE_GB, metavar='GB',
+                       help=f'Size cap of the audio cache in GB (default: {DEFAULT_AUDIO_CACHE_SIZE_GB:g})')
+    parser.add_argument('--timeout', type=float, default=FILE_TIMEOUT,
+                       help=f'Base wall-clock limit per file in seconds, 0 to disable (default: {FILE_TIMEOUT:g})')
+    parser.add_argument('--timeout-per-minute', type=float, default=FILE_TIMEOUT_PER_MINUTE,
+                       help='Extra wall-clock limit per minute of audio in seconds '
+                            f'(default: {FILE_TIMEOUT_PER_MINUTE:g})')
+    parser.add_argument('--pipelined', action='store_true',
+                       help='Decode upcoming files in the background while analyzing')
+    parser.add_argument('--queue-depth', type=int, default=PIPELINE_QUEUE_DEPTH,
+                       help=f'Decoded files held ahead of analysis per worker (default: {PIPELINE_QUEUE_DEPTH})')
+    parser.add_argument('--combined', metavar='FILE',
+                       help='Merge all album feature files into FILE after extraction')
+    parser.add_argument('--two-tier', action='store_true',
+                       help='Extract the cheap feature groups first, then fill in the heavy ones '
+                            'in a low-priority background process')
+    parser.add_argument('--nice', type=int, default=0, metavar='N',
+                       help='Run the worker processes at a lower priority (nice increment)')
     
     args = parser.parse_args()
+    set_cpu_budget(args.cpus)
     
     # Create output directory if it doesn't exist
     os.makedirs(args.output_dir, exist_ok=True)
@@ -85,21 +109,39 @@ def main():
     
     logger.info(f"Found {len(album_dirs)} album directories")
     
-    # Process each album
-    success_count = 0
+    # Extract all albums on one shared worker pool; albums whose files are all
+    # extracted already are only scanned
     start_time = time.time()
-    
-    for album_path in tqdm(album_dirs, desc="Processing albums"):
-        try:
-            if process_album(album_path, args.output_dir, args.force):
-                success_count += 1
-        except Exception as e:
-            logger.error(f"Unexpected error processing {album_path}: {str(e)}")
+    directories = [
+        (album_path, album_output_file(album_path, args.output_dir))
+        for album_path in sorted(album_dirs)
+    ]
+    results = process_directories(
+        directories, force=args.force, workers=args.max_workers, profile=args.profile,
+        cache_file=args.cache, timeout=args.timeout or None, timeout_per_minute=args.timeout_per_minute,
+        pipelined=args.pipelined, queue_depth=args.queue_depth,
+        audio_cache_dir=args.audio_cache, audio_cache_size_gb=args.audio_cache_size,
+        groups=LIGHT_FEATURE_GROUPS if args.two_tier else None, niceness=args.nice,
+        chunk_threads=args.chunk_threads, chunk_duration=args.chunk_duration
+    )
+    success_count = sum(1 for df in results if df is not None and not df.empty)
     
     # Print summary
     elapsed = time.time() - start_time
     logger.info(f"Processed {success_count}/{len(album_dirs)} albums successfully in {elapsed:.2f} seconds")
     logger.info(f"Feature files saved to: {os.path.abspath(args.output_dir)}")
+    
+    if args.combined:
+        album_files = find_album_files(args.output_dir, exclude=Path(args.combined))
+        merge_feature_files(album_files, args.combined)
+    
+    if args.two_tier:
+        # Same run again without the group restriction, at low priority; it
+        # re-merges --combined when it is done
+        start_backfill(
+            [sys.executable, os.path.abspath(__file__)] + backfill_arguments(args),
+            os.path.join(args.output_dir, 'backfill.log')
+        )
 
 if __name__ == "__main__":
     main()
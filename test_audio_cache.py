@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the decoded-audio cache.
+
+The cache must evict least recently used entries from its running index
+without listing its directory on every store, and a cached track must be
+read back instead of decoded, with its file fingerprinted only once.
+"""
+
+import os
+import pickle
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import dcm.core.audio_cache as audio_cache_module
+import dcm.core.extract_features as extract_features
+from conftest import write_tone
+from dcm.core.audio_cache import DecodedAudioCache
+from dcm.core.extract_features import extract_features as extract
+
+# Samples per test entry; an entry file is its data plus a 128-byte .npy header
+ENTRY_SAMPLES = 1024
+
+def entry_names(cache: DecodedAudioCache) -> list:
+    """Keys of the entries on disk, sorted."""
+    return sorted(path.stem for path in cache.cache_dir.glob('*.npy'))
+
+def test_lru_eviction(tmp_path, monkeypatch):
+    """A store over the cap evicts the least recently used entries, without listing the directory."""
+    signal = np.zeros(ENTRY_SAMPLES, dtype=np.float32)
+    entry_size = signal.nbytes + 128
+    cache = DecodedAudioCache(tmp_path, max_size_gb=2.5 * entry_size / 1024 ** 3)
+
+    listings = []
+    scandir = os.scandir
+    monkeypatch.setattr(audio_cache_module.os, 'scandir', lambda path: listings.append(path) or scandir(path))
+    cache.store('a', signal)
+    cache.store('b', signal)
+    assert cache.load('a') is not None  # a is now the most recently used
+    cache.store('c', signal)
+    assert listings == []
+    assert entry_names(cache) == ['a', 'c']
+    assert cache.total_bytes == 2 * entry_size
+    assert cache.load('b') is None
+
+    cache.store('d', signal)
+    assert entry_names(cache) == ['c', 'd']
+    monkeypatch.undo()
+
+    # Another process picks the entries up in LRU order from their modification times
+    mtime_ns = (cache.cache_dir / 'd.npy').stat().st_mtime_ns + 1_000_000_000
+    os.utime(cache.cache_dir / 'c.npy', ns=(mtime_ns, mtime_ns))
+    other = DecodedAudioCache(tmp_path, max_size_gb=cache.max_size_gb)
+    assert other.total_bytes == 2 * entry_size
+    other.store('e', signal)
+    assert entry_names(other) == ['c', 'e']
+
+def test_workers_share_one_index(tmp_path):
+    """Unpickled copies of a cache, one per task sent to a worker, are one object per process."""
+    cache = DecodedAudioCache(tmp_path / 'cache', max_size_gb=1.0)
+    first, second = pickle.loads(pickle.dumps(cache)), pickle.loads(pickle.dumps(cache))
+    assert first is second and first.cache_dir == cache.cache_dir and first.max_bytes == cache.max_bytes
+
+def test_cache_hit_reuses_decoded_audio(tmp_path, monkeypatch):
+    """A cached track is analyzed from the cache, fingerprinted once, with the same features."""
+    tone = write_tone(tmp_path / 'tone.wav', duration=3.0)
+    cache = DecodedAudioCache(tmp_path / 'cache', max_size_gb=1.0)
+    for streaming in (False, True):
+        expected = extract(tone, profile='fast', streaming=streaming, block_duration=1.0, audio_cache=cache)
+        assert len(entry_names(cache)) == 1
+
+        fingerprinted = []
+        fingerprint = audio_cache_module.file_fingerprint
+        with monkeypatch.context() as patch:
+            patch.setattr(audio_cache_module, 'file_fingerprint',
+                          lambda path: fingerprinted.append(path) or fingerprint(path))
+            patch.setattr(extract_features, '_decode_blocks', None)
+            patch.setattr(extract_features, '_load_audio', None)
+            features = extract(tone, profile='fast', streaming=streaming, block_duration=1.0, audio_cache=cache)
+
+        assert fingerprinted == [tone]
+        assert features == expected
+
+if __name__ == "__main__":
+    import tempfile
+    import pytest
+
+    for test in (test_lru_eviction, test_cache_hit_reuses_decoded_audio):
+        with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+            test(Path(tmp), monkeypatch)
+            print(f"✅ {test.__name__}")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_workers_share_one_index(Path(tmp))
+        print("✅ test_workers_share_one_index")
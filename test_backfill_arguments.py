@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the command line of the background pass of a two-tier extraction.
+
+Arguments rebuilt by backfill_arguments must parse back to the options of
+the first pass, except --two-tier and --force, which are dropped, and the
+priority, which is lowered.
+"""
+
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dcm.core.extract_features import BACKFILL_NICENESS, backfill_arguments, build_arg_parser
+
+def round_trip(argv):
+    """Parse a command line, and the background pass arguments rebuilt from it."""
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    return vars(args), vars(parser.parse_args(backfill_arguments(args)))
+
+def assert_inherited(first, backfill):
+    """Everything but --two-tier, --force and --nice carries over unchanged."""
+    assert backfill['two_tier'] is False and backfill['force'] is False
+    assert backfill['nice'] == BACKFILL_NICENESS
+    for field in ('two_tier', 'force', 'nice'):
+        del first[field], backfill[field]
+    assert backfill == first
+
+def test_defaults_round_trip():
+    """A command line with only the required arguments parses back the same."""
+    first, backfill = round_trip(['music', '--two-tier'])
+    assert_inherited(first, backfill)
+
+def test_every_option_round_trips():
+    """Every option, including values that start with a dash, parses back the same."""
+    first, backfill = round_trip([
+        '-fv', '--two-tier', '--output=-features.npy', '-w', '3', '--cpus', '4', '-p', 'fast',
+        '--excerpts', '2', '--excerpt-duration', '12.5', '--streaming', '--block-duration', '7',
+        '--chunk-threads', '0', '--chunk-duration', '0.1', '--cache', 'cache.db',
+        '--audio-cache', '/tmp/audio cache', '--audio-cache-size', '1.5', '--timeout', '0',
+        '--timeout-per-minute', '2.25', '--memory-limit', '512', '--pipelined', '--queue-depth', '5',
+        '--nice', '3', '--', '-music',
+    ])
+    assert first['output'] == '-features.npy' and first['input_dir'] == '-music'
+    assert_inherited(first, backfill)
+
+def test_abbreviated_flags():
+    """Abbreviated and clustered flags are written out in full."""
+    parser = build_arg_parser()
+    arguments = backfill_arguments(parser.parse_args(['music', '--two', '-fv', '--pipe', '--excerpt-d', '9']))
+    assert '--two-tier' not in arguments and '--force' not in arguments
+    assert '--verbose' in arguments and '--pipelined' in arguments
+    assert '--excerpt-duration=9.0' in arguments
+    assert arguments[-2:] == ['--', 'music']
+
+if __name__ == "__main__":
+    test_defaults_round_trip()
+    test_every_option_round_trips()
+    test_abbreviated_flags()
+    print("✅ Background pass arguments round-trip through parse_args")
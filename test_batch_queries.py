@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for batch and streamed similarity queries.
+
+find_similar_songs_batch and the JSON lines of `suggest_next --queries`
+must answer every query exactly as find_similar_songs does, in input order,
+and report unknown songs and unreadable lines per query without aborting.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dcm.core import suggest_next
+from dcm.core.suggest_next import SongRecommender, stream_queries
+
+def create_features(n_songs: int = 80, seed: int = 5) -> pd.DataFrame:
+    """Create a feature table with a few numeric feature columns."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(size=(n_songs, 6)), columns=[f'f{i}' for i in range(6)])
+    df['file_path'] = [f'/music/Artist{i % 9} - Song {i}.mp3' for i in range(n_songs)]
+    return df
+
+def trained_recommender(tmp_path: Path) -> SongRecommender:
+    """A recommender trained on create_features(), saved as CSV in tmp_path."""
+    features_file = tmp_path / 'features.csv'
+    create_features().to_csv(features_file, index=False)
+    recommender = SongRecommender(str(features_file))
+    recommender.train_model(n_neighbors=5)
+    return recommender
+
+# Queries by full path, file name and duplicate, with an unknown song in between
+QUERIES = [
+    '/music/Artist3 - Song 12.mp3', 'Artist0 - Song 0.mp3', 'Nobody - Nothing.flac',
+    '/music/Artist3 - Song 12.mp3', '/elsewhere/Artist8 - Song 35.mp3',
+]
+
+def test_batch_matches_single_queries(tmp_path):
+    """Batch results equal single-query results, with an empty frame for unknown songs."""
+    recommender = trained_recommender(tmp_path)
+    batch = recommender.find_similar_songs_batch(QUERIES, n_songs=7)
+    assert len(batch) == len(QUERIES)
+    for query, result in zip(QUERIES, batch):
+        if query.startswith('Nobody'):
+            assert result.empty and 'similarity_score' in result.columns
+            continue
+        pd.testing.assert_frame_equal(result, recommender.find_similar_songs(query, n_songs=7))
+
+def test_streamed_results_match_single_queries(tmp_path):
+    """Streamed records, across several batches, equal single-query results in input order."""
+    recommender = trained_recommender(tmp_path)
+    queries_file = tmp_path / 'queries.txt'
+    queries_file.write_text('\n'.join(QUERIES * 3) + '\n')
+    output_file = tmp_path / 'results.jsonl'
+
+    assert stream_queries(recommender, str(queries_file), 4, str(output_file), batch_size=2) == 1
+
+    records = [json.loads(line) for line in output_file.read_text().splitlines()]
+    assert [record['query'] for record in records] == QUERIES * 3
+    for record in records:
+        if 'error' in record:
+            assert record['query'].startswith('Nobody')
+            continue
+        expected = recommender.find_similar_songs(record['query'], n_songs=4)
+        assert [row['file_path'] for row in record['results']] == expected['file_path'].tolist()
+        np.testing.assert_allclose(
+            [row['similarity_score'] for row in record['results']], expected['similarity_score'], atol=1e-6
+        )
+
+def test_main_queries_handles_bad_lines(tmp_path, monkeypatch):
+    """main --queries skips blank lines and reports unknown songs and undecodable lines per query."""
+    features_file = tmp_path / 'features.csv'
+    create_features().to_csv(features_file, index=False)
+    queries_file = tmp_path / 'queries.txt'
+    queries_file.write_bytes(
+        b'  /music/Artist1 - Song 10.mp3  \n'
+        b'\n'
+        b'   \n'
+        b'Unknown Artist - Unknown Song.mp3\n'
+        b'/music/\xff\xfe broken.mp3\n'
+        b'Artist2 - Song 2.mp3'  # No final newline
+    )
+    output_file = tmp_path / 'results.jsonl'
+
+    def run_main(queries):
+        monkeypatch.setattr(sys, 'argv', [
+            'suggest_next', str(features_file), '--queries', str(queries), '-o', str(output_file), '-n', '3'
+        ])
+        status = suggest_next.main()
+        return status, [json.loads(line) for line in output_file.read_text(encoding='utf-8').splitlines()]
+
+    status, records = run_main(queries_file)
+    assert status == 1
+    assert [record['query'] for record in records] == [
+        '/music/Artist1 - Song 10.mp3', 'Unknown Artist - Unknown Song.mp3',
+        '/music/�� broken.mp3', 'Artist2 - Song 2.mp3',
+    ]
+    assert [len(record.get('results', [])) for record in records] == [3, 0, 0, 3]
+    assert [record.get('error') for record in records] == [
+        None, 'Song not found in database', 'Song not found in database', None
+    ]
+
+    # Every query found: success
+    queries_file.write_text('Artist2 - Song 2.mp3\n')
+    status, records = run_main(queries_file)
+    assert status == 0 and len(records) == 1
+
+if __name__ == "__main__":
+    import tempfile
+    import pytest
+
+    for test in (test_batch_matches_single_queries, test_streamed_results_match_single_queries):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+            print(f"✅ {test.__name__}")
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        test_main_queries_handles_bad_lines(Path(tmp), monkeypatch)
+        print("✅ test_main_queries_handles_bad_lines")
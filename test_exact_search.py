@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Parity test for the blocked exact-search engine of the recommender.
+
+Compares ExactCosineIndex against sklearn's brute-force cosine
+NearestNeighbors, which the recommender used for exact search before.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+from sklearn.neighbors import NearestNeighbors
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dcm.core.ann_index import ExactCosineIndex
+
+# Similarity differences below this count as ties (float32 round-off)
+TIE_TOLERANCE = 1e-5
+
+def create_embedding(n_songs: int = 3000, n_dims: int = 40) -> np.ndarray:
+    """Create a clustered float32 embedding with a few exact duplicates."""
+    rng = np.random.default_rng(7)
+    centers = rng.normal(size=(30, n_dims))
+    X = centers[rng.integers(0, len(centers), n_songs)] + 0.5 * rng.normal(size=(n_songs, n_dims))
+    X[10] = X[11]
+    return X.astype(np.float32)
+
+def assert_same_ranking(distances, indices, expected_distances, expected_indices):
+    """Rankings agree wherever neighbors are not tied within TIE_TOLERANCE."""
+    np.testing.assert_allclose(distances, expected_distances, atol=TIE_TOLERANCE)
+    for row in range(len(indices)):
+        for rank in range(indices.shape[1]):
+            if indices[row, rank] != expected_indices[row, rank]:
+                tied = np.abs(expected_distances[row] - distances[row, rank]) < TIE_TOLERANCE
+                assert indices[row, rank] in expected_indices[row][tied], (
+                    f"query {row}, rank {rank}: got {indices[row, rank]}, expected {expected_indices[row, rank]}"
+                )
+
+def test_exact_search_matches_sklearn():
+    """Blocked float32 search ranks neighbors like sklearn's brute-force cosine search."""
+    X = create_embedding()
+    queries = X[::7]
+    reference = NearestNeighbors(n_neighbors=11, metric='cosine', algorithm='brute').fit(X)
+    expected_distances, expected_indices = reference.kneighbors(queries)
+
+    # A small block size forces many blocks per batch
+    index = ExactCosineIndex(n_neighbors=11, block_elements=len(X) * 5).fit(X)
+    distances, indices = index.kneighbors(queries)
+
+    assert indices.shape == expected_indices.shape
+    assert_same_ranking(distances, indices, expected_distances, expected_indices)
+
+def test_exact_search_single_query_and_small_library():
+    """Single queries and k close to the library size give the same rankings."""
+    X = create_embedding(n_songs=20)
+    reference = NearestNeighbors(n_neighbors=20, metric='cosine', algorithm='brute').fit(X)
+    index = ExactCosineIndex(n_neighbors=20).fit(X)
+
+    for row in (0, 10, 19):
+        expected_distances, expected_indices = reference.kneighbors(X[row:row + 1])
+        distances, indices = index.kneighbors(X[row])
+        assert_same_ranking(distances, indices, expected_distances, expected_indices)
+
+if __name__ == "__main__":
+    test_exact_search_matches_sklearn()
+    test_exact_search_single_query_and_small_library()
+    print("✅ Blocked exact search matches sklearn's cosine rankings")
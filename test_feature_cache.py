@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for the content-addressed feature cache.
+
+Moved, renamed and duplicated files must reuse cached features, files
+modified in place must miss, and prune must forget deleted files (and the
+features no other file references) under the scanned directory only.
+"""
+
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from conftest import record_extractions, write_tone
+from dcm.core.extract_features import process_directory
+from dcm.core.feature_cache import FINGERPRINT_CHUNK_SIZE, FeatureCache, file_fingerprint
+
+def write_bytes(path: Path, data: bytes) -> Path:
+    """Write a file, giving it a modification time distinct from any earlier write."""
+    previous = path.stat().st_mtime_ns if path.exists() else 0
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    mtime_ns = max(path.stat().st_mtime_ns, previous + 1_000_000_000)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path.resolve()
+
+def cached_row(cache: FeatureCache, file_path: Path, tempo: float) -> None:
+    """Cache a feature row for a file, as extraction would."""
+    _, fingerprint = cache.lookup(file_path, 'fast')
+    cache.store(fingerprint, 'fast', {'file_path': str(file_path), 'file_name': file_path.name, 'tempo': tempo})
+
+def test_moved_and_duplicated_files_reuse_features(tmp_path):
+    """Features follow the content to a new path and to copies, with the metadata of the new path."""
+    original = write_bytes(tmp_path / 'music' / 'a.wav', b'audio-a' * 1000)
+    with FeatureCache(tmp_path / 'cache.db') as cache:
+        cached_row(cache, original, 120.0)
+
+        moved = tmp_path / 'music' / 'sub' / 'renamed.wav'
+        moved.parent.mkdir()
+        shutil.move(original, moved)
+        features, _ = cache.lookup(moved.resolve(), 'fast')
+        assert features['tempo'] == 120.0
+        assert features['file_path'] == str(moved.resolve())
+        assert features['file_name'] == 'renamed.wav'
+
+        copy = tmp_path / 'elsewhere' / 'copy.wav'
+        copy.parent.mkdir()
+        shutil.copy(moved, copy)
+        features, _ = cache.lookup(copy.resolve(), 'fast')
+        assert features['tempo'] == 120.0
+        assert features['file_path'] == str(copy.resolve())
+
+        # Features are kept per profile
+        assert cache.lookup(copy.resolve(), 'full')[0] is None
+
+def test_modified_in_place_misses(tmp_path):
+    """New content under the same path and size is not served stale features."""
+    path = write_bytes(tmp_path / 'a.wav', b'a' * 5000)
+    with FeatureCache(tmp_path / 'cache.db') as cache:
+        cached_row(cache, path, 120.0)
+        old_fingerprint = cache.fingerprint(path)
+
+        write_bytes(path, b'b' * 5000)
+        features, fingerprint = cache.lookup(path, 'fast')
+        assert features is None
+        assert fingerprint != old_fingerprint
+
+def test_fingerprint_samples_start_middle_and_end(tmp_path):
+    """A change in any sampled chunk of a large file changes its fingerprint."""
+    size = 10 * FINGERPRINT_CHUNK_SIZE
+    data = bytearray(np.random.default_rng(0).bytes(size))
+    path = write_bytes(tmp_path / 'big.wav', bytes(data))
+    fingerprint = file_fingerprint(path)
+    for offset in (0, size // 2, size - 1):
+        changed = bytearray(data)
+        changed[offset] ^= 0xFF
+        write_bytes(path, bytes(changed))
+        assert file_fingerprint(path) != fingerprint
+
+def test_prune_forgets_deleted_files(tmp_path):
+    """Prune drops unseen files under the root and features only they referenced."""
+    music = tmp_path / 'music'
+    kept = write_bytes(music / 'kept.wav', b'kept' * 1000)
+    deleted = write_bytes(music / 'deleted.wav', b'gone' * 1000)
+    duplicate = write_bytes(music / 'dup.wav', b'kept' * 1000)
+    outside = write_bytes(tmp_path / 'music2' / 'other.wav', b'other' * 1000)
+    with FeatureCache(tmp_path / 'cache.db') as cache:
+        for path in (kept, deleted, duplicate, outside):
+            cached_row(cache, path, 100.0)
+        deleted_fingerprint = cache.fingerprint(deleted)
+        os.remove(deleted)
+        os.remove(duplicate)
+
+        assert cache.prune(music, [str(kept)]) == 2
+
+        assert not cache.has_file(deleted) and not cache.has_file(duplicate)
+        # The sibling directory sharing the name prefix is not touched
+        assert cache.has_file(kept) and cache.has_file(outside)
+        fingerprints = {row[0] for row in cache.conn.execute('SELECT fingerprint FROM features')}
+        assert deleted_fingerprint not in fingerprints
+        assert cache.lookup(kept, 'fast')[0]['tempo'] == 100.0
+
+def test_rescan_reuses_cache(tmp_path, extracted):
+    """A re-scan extracts only modified files and drops rows of deleted ones."""
+    music = tmp_path / 'music'
+    music.mkdir()
+    for name, frequency in (('a', 220.0), ('b', 330.0), ('c', 440.0), ('d', 550.0)):
+        write_tone(music / f'{name}.wav', frequency)
+    output, cache_file = tmp_path / 'features.csv', tmp_path / 'cache.db'
+    process_directory(music, output, profile='fast', cache_file=cache_file, timeout=None)
+
+    (music / 'sub').mkdir()
+    shutil.move(music / 'a.wav', music / 'sub' / 'moved.wav')
+    shutil.copy(music / 'b.wav', music / 'b copy.wav')
+    os.remove(music / 'c.wav')
+    mtime_ns = (music / 'd.wav').stat().st_mtime_ns
+    write_tone(music / 'd.wav', 660.0)
+    os.utime(music / 'd.wav', ns=(mtime_ns + 1_000_000_000,) * 2)
+
+    extracted.clear()
+    df = process_directory(music, output, profile='fast', cache_file=cache_file, timeout=None)
+
+    assert [path.name for path in extracted] == ['d.wav']
+    assert sorted(os.path.relpath(p, music.resolve()) for p in df['file_path']) == [
+        'b copy.wav', 'b.wav', 'd.wav', os.path.join('sub', 'moved.wav')
+    ]
+    with FeatureCache(cache_file) as cache:
+        assert not cache.has_file((music / 'c.wav').resolve())
+
+if __name__ == "__main__":
+    import tempfile
+    import pytest
+
+    tests = [
+        test_moved_and_duplicated_files_reuse_features, test_modified_in_place_misses,
+        test_fingerprint_samples_start_middle_and_end, test_prune_forgets_deleted_files,
+    ]
+    for test in tests:
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+            print(f"✅ {test.__name__}")
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        test_rescan_reuses_cache(Path(tmp), record_extractions(monkeypatch))
+        print("✅ test_rescan_reuses_cache")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for delta extraction of versioned feature groups.
+
+Bumping the version of one feature group must recompute just that group on
+the next run, and the merged rows must keep the columns of every other
+group as they were.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import dcm.core.extract_features as extract_features
+from conftest import record_extractions, write_tone
+from dcm.core.extract_features import (
+    FEATURE_GROUP_VERSIONS, FEATURE_VERSIONS_COLUMN, _merge_groups, process_directory, profile_groups
+)
+
+# Marks a stored value the next run must keep (or replace)
+SENTINEL = -12345.0
+
+def test_merge_groups_keeps_untouched_columns():
+    """Merged rows take the update's columns and versions and keep everything else."""
+    row = {
+        'file_path': '/music/a.wav', 'file_size_mb': 1.0, 'rms_mean': 0.5, 'chroma_1_mean': 0.1,
+        FEATURE_VERSIONS_COLUMN: json.dumps({'spectral': 1, 'chroma': 1}),
+    }
+    update = {
+        'file_path': '/music/a.wav', 'file_size_mb': 2.0, 'chroma_1_mean': 0.7,
+        FEATURE_VERSIONS_COLUMN: json.dumps({'chroma': 2}),
+    }
+    merged = _merge_groups(row, update)
+    assert merged['rms_mean'] == 0.5
+    assert merged['chroma_1_mean'] == 0.7 and merged['file_size_mb'] == 2.0
+    assert json.loads(merged[FEATURE_VERSIONS_COLUMN]) == {'spectral': 1, 'chroma': 2}
+    assert json.loads(row[FEATURE_VERSIONS_COLUMN]) == {'spectral': 1, 'chroma': 1}
+
+def test_version_bump_recomputes_only_that_group(tmp_path, monkeypatch):
+    """After a chroma version bump only chroma is recomputed; other columns are kept as stored."""
+    music = tmp_path / 'music'
+    music.mkdir()
+    for name, frequency in (('a', 220.0), ('b', 330.0)):
+        write_tone(music / f'{name}.wav', frequency)
+    output = tmp_path / 'features.csv'
+    first = process_directory(music, output, profile='fast', timeout=None)
+
+    # Mark a spectral and a chroma value, so the rerun shows which group it rewrote
+    stored = pd.read_csv(output)
+    stored['rms_mean'] = SENTINEL
+    stored['chroma_1_mean'] = SENTINEL
+    stored.to_csv(output, index=False)
+
+    monkeypatch.setitem(FEATURE_GROUP_VERSIONS, 'chroma', FEATURE_GROUP_VERSIONS['chroma'] + 1)
+    analyzed_groups = []
+    analyze_frames = extract_features._analyze_frames
+
+    def recording_analyze_frames(*args, groups=None, **kwargs):
+        analyzed_groups.append(list(groups))
+        return analyze_frames(*args, groups=groups, **kwargs)
+
+    monkeypatch.setattr(extract_features, '_analyze_frames', recording_analyze_frames)
+    extracted = record_extractions(monkeypatch)
+    df = process_directory(music, output, profile='fast', timeout=None).set_index('file_name')
+
+    assert sorted(path.name for path in extracted) == ['a.wav', 'b.wav']
+    assert analyzed_groups == [['chroma'], ['chroma']]
+    assert (df['rms_mean'] == SENTINEL).all()
+    first = first.set_index('file_name').loc[df.index]
+    assert (df['chroma_1_mean'] - first['chroma_1_mean']).abs().max() < 1e-6
+    current = {group: FEATURE_GROUP_VERSIONS[group] for group in profile_groups('fast')}
+    assert all(json.loads(versions) == current for versions in df[FEATURE_VERSIONS_COLUMN])
+
+    # Up to date now: a third run extracts nothing
+    extracted.clear()
+    process_directory(music, output, profile='fast', timeout=None)
+    assert extracted == []
+
+if __name__ == "__main__":
+    import tempfile
+    import pytest
+
+    test_merge_groups_keeps_untouched_columns()
+    print("✅ test_merge_groups_keeps_untouched_columns")
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        test_version_bump_recomputes_only_that_group(Path(tmp), monkeypatch)
+        print("✅ test_version_bump_recomputes_only_that_group")
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Parity test for the shared spectrogram pipeline in extract_features.
+
+Compares the pipeline output against the original per-feature librosa calls,
+each of which computed its own STFT/onset pass from the raw signal.
+"""
+
+import sys
+from pathlib import Path
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dcm.core.extract_features import (
+    N_CHROMA, N_FFT, N_MFCC, HOP_LENGTH, SAMPLE_RATE, _analyze_signal, extract_features
+)
+
+# Relative tolerance for float32 round-off between the two computations
+TOLERANCE = 1e-4
+
+def create_test_signal(duration: float = 8.0, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Create a drone-plus-percussion test signal."""
+    rng = np.random.default_rng(42)
+    t = np.arange(int(duration * sr)) / sr
+    drone = 0.3 * np.sin(2 * np.pi * 146.8 * t) + 0.2 * np.sin(2 * np.pi * 220.0 * t)
+    clicks = (np.mod(t, 0.6) < 0.01) * rng.normal(0, 0.5, len(t))
+    noise = 0.01 * rng.normal(size=len(t))
+    return (drone + clicks + noise).astype(np.float32)
+
+def create_varying_signal(duration: float = 20.0, sr: int = SAMPLE_RATE) -> np.ndarray:
+    """Create the test signal under a slow 60 dB swell, so windows differ in loudness."""
+    t = np.arange(int(duration * sr)) / sr
+    gain_db = -30 - 30 * np.cos(2 * np.pi * t / duration)
+    return (create_test_signal(duration, sr) * 10 ** (gain_db / 20)).astype(np.float32)
+
+def reference_features(y: np.ndarray, sr: int) -> dict:
+    """Original extract_features computation, one librosa call per feature."""
+    features = {'duration': librosa.get_duration(y=y, sr=sr)}
+
+    spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)
+    features['spectral_centroid_mean'] = np.mean(spectral_centroid)
+    features['spectral_centroid_std'] = np.std(spectral_centroid)
+
+    spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)
+    features['spectral_bandwidth_mean'] = np.mean(spectral_bandwidth)
+    features['spectral_bandwidth_std'] = np.std(spectral_bandwidth)
+
+    zcr = librosa.feature.zero_crossing_rate(y)
+    features['zero_crossing_rate_mean'] = np.mean(zcr)
+    features['zero_crossing_rate_std'] = np.std(zcr)
+
+    rms = librosa.feature.rms(y=y)
+    features['rms_mean'] = np.mean(rms)
+    features['rms_std'] = np.std(rms)
+
+    mfcc = librosa.feature.mfcc(
+        y=y, sr=sr, n_mfcc=N_MFCC, n_fft=N_FFT, hop_length=HOP_LENGTH,
+        n_mels=128, fmin=27.5, fmax=16000, htk=True
+    )
+    for i in range(N_MFCC):
+        features[f'mfcc_{i+1}_mean'] = np.mean(mfcc[i])
+        features[f'mfcc_{i+1}_std'] = np.std(mfcc[i])
+
+    chroma = librosa.feature.chroma_stft(
+        y=y, sr=sr, n_chroma=N_CHROMA, n_fft=N_FFT, hop_length=HOP_LENGTH,
+        tuning=0.0, norm=2
+    )
+    for i in range(chroma.shape[0]):
+        features[f'chroma_{i+1}_mean'] = np.mean(chroma[i, :])
+        features[f'chroma_{i+1}_std'] = np.std(chroma[i, :])
+
+    tempo, _ = librosa.beat.beat_track(y=y, sr=sr, trim=False, start_bpm=80, tightness=100)
+    features['tempo'] = np.atleast_1d(tempo)[0]
+
+    y_harmonic, y_percussive = librosa.effects.hpss(y)
+    features['tonic_deviation'] = librosa.estimate_tuning(y=y_harmonic, sr=sr)
+    onset_env = librosa.onset.onset_strength(y=y_percussive, sr=sr)
+    features['rhythm_regularity'] = np.mean(librosa.beat.plp(onset_envelope=onset_env, sr=sr))
+    features['drone_likelihood'] = np.mean(1 - librosa.feature.spectral_flatness(y=y_harmonic))
+
+    return {name: float(value) for name, value in features.items()}
+
+def test_pipeline_matches_reference():
+    """Every feature column matches the per-call reference computation."""
+    y = create_test_signal()
+    expected = reference_features(y, SAMPLE_RATE)
+    actual = _analyze_signal(y, SAMPLE_RATE)
+
+    assert list(actual) == list(expected)
+    for name, value in expected.items():
+        assert np.isclose(actual[name], value, rtol=TOLERANCE, atol=1e-6), (
+            f"{name}: pipeline={actual[name]:.6g} reference={value:.6g}"
+        )
+
+def test_streaming_matches_full_track(tmp_path):
+    """Block-wise streaming gives the same mean/std columns as a full decode."""
+    audio_file = tmp_path / 'drone.flac'
+    sf.write(str(audio_file), create_varying_signal(duration=20.0, sr=48000), 48000, subtype='PCM_24')
+
+    full = extract_features(audio_file, profile='standard')
+    streamed = extract_features(audio_file, profile='standard', streaming=True, block_duration=6.0)
+
+    assert full and streamed
+    for name, value in full.items():
+        if name.endswith('_mean') or name.endswith('_std'):
+            assert np.isclose(streamed[name], value, rtol=TOLERANCE, atol=1e-6), (
+                f"{name}: streamed={streamed[name]:.6g} full={value:.6g}"
+            )
+
+def test_chunked_matches_single_threaded(tmp_path):
+    """Chunks analyzed on several threads give the same mean/std columns as one pass."""
+    audio_file = tmp_path / 'drone.wav'
+    sf.write(str(audio_file), create_varying_signal(duration=20.0), SAMPLE_RATE, subtype='FLOAT')
+
+    single = extract_features(audio_file, profile='standard')
+    chunked = extract_features(audio_file, profile='standard', chunk_threads=3, chunk_duration=6.0)
+
+    assert single and chunked
+    for name, value in single.items():
+        if name.endswith('_mean') or name.endswith('_std'):
+            assert np.isclose(chunked[name], value, rtol=TOLERANCE, atol=1e-6), (
+                f"{name}: chunked={chunked[name]:.6g} single={value:.6g}"
+            )
+
+if __name__ == "__main__":
+    import tempfile
+
+    test_pipeline_matches_reference()
+    print("✅ Shared pipeline matches the reference features")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        test_streaming_matches_full_track(Path(temp_dir))
+    print("✅ Streaming extraction matches full-track features")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        test_chunked_matches_single_threaded(Path(temp_dir))
+    print("✅ Chunked extraction matches single-threaded features")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Round-trip tests for the binary feature store.
+
+A saved store must load back with the same columns, order and values,
+memory-mapped or not, and a matrix paired with another save's sidecar (a
+crash between the two atomic replacements) must be refused.
+"""
+
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dcm.core.feature_store import load_feature_matrix, load_feature_store, save_feature_store
+
+def create_features(n_rows: int = 50, seed: int = 0) -> pd.DataFrame:
+    """Feature rows with text, numeric and missing values in mixed column order."""
+    rng = np.random.default_rng(seed)
+    features_df = pd.DataFrame({
+        'file_path': [f'/music/album/track {i}.mp3' for i in range(n_rows)],
+        'tempo': rng.uniform(60, 180, n_rows),
+        'profile': ['standard'] * n_rows,
+        'mfcc_1_mean': rng.normal(size=n_rows),
+        'feature_versions': [json.dumps({'mfcc': 2})] * n_rows,
+        'duration': rng.integers(60, 600, n_rows),
+    })
+    features_df.loc[3, 'tempo'] = np.nan
+    features_df.loc[5, 'profile'] = None
+    return features_df
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_round_trip(tmp_path, mmap):
+    """Columns, order and values survive a save and load."""
+    features_df = create_features()
+    store_path = tmp_path / 'features.npy'
+    save_feature_store(features_df, store_path)
+
+    loaded = load_feature_store(store_path, mmap=mmap)
+
+    assert list(loaded.columns) == list(features_df.columns)
+    assert loaded['file_path'].tolist() == features_df['file_path'].tolist()
+    assert loaded['profile'].tolist() == features_df['profile'].tolist()
+    for column in ('tempo', 'mfcc_1_mean', 'duration'):
+        assert loaded[column].dtype == np.float32
+        np.testing.assert_allclose(loaded[column], features_df[column], rtol=1e-6)
+
+    matrix, numeric_columns, _ = load_feature_matrix(store_path, mmap=mmap)
+    assert numeric_columns == ['tempo', 'mfcc_1_mean', 'duration']
+    assert isinstance(matrix, np.memmap) == mmap
+
+def test_matrix_from_another_save_is_refused(tmp_path):
+    """A matrix of the right shape but from another save does not load with this sidecar."""
+    features_df = create_features()
+    store_path = tmp_path / 'features.npy'
+    save_feature_store(features_df, store_path)
+
+    # Same shape, rows reordered: as if a later save crashed after replacing the matrix
+    reordered_path = tmp_path / 'reordered.npy'
+    save_feature_store(features_df.iloc[::-1].reset_index(drop=True), reordered_path)
+    shutil.copy(reordered_path, store_path)
+
+    for mmap in (True, False):
+        with pytest.raises(ValueError, match='different saves'):
+            load_feature_store(store_path, mmap=mmap)
+
+def test_store_without_generation_loads(tmp_path):
+    """Stores written before generation ids still load."""
+    features_df = create_features(n_rows=5)
+    store_path = tmp_path / 'features.npy'
+    save_feature_store(features_df, store_path)
+
+    matrix = np.load(store_path)
+    np.save(store_path, matrix)
+    metadata_path = store_path.with_suffix('.meta.json')
+    metadata = json.loads(metadata_path.read_text())
+    del metadata['generation']
+    metadata_path.write_text(json.dumps(metadata))
+
+    assert load_feature_store(store_path)['file_path'].tolist() == features_df['file_path'].tolist()
+
+if __name__ == "__main__":
+    import tempfile
+
+    for mmap in (True, False):
+        with tempfile.TemporaryDirectory() as tmp:
+            test_round_trip(Path(tmp), mmap)
+    print("✅ Feature store round-trips, memory-mapped or not")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_matrix_from_another_save_is_refused(Path(tmp))
+    print("✅ Matrix from another save is refused")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_store_without_generation_loads(Path(tmp))
+    print("✅ Stores without generation ids still load")
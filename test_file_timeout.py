@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for the per-file wall-clock budget of extract_features.
+
+A file whose extraction hangs must be killed once its budget (a base plus
+an allowance per minute of audio) runs out, quarantined next to the output,
+and skipped on the next run, while the other files are extracted normally.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from conftest import record_extractions, write_tone
+from dcm.core.extract_features import file_timeout, process_directory
+from dcm.core.feature_store import Quarantine
+
+def hang(audio_path: Path) -> None:
+    """Never return for files named hang*."""
+    if audio_path.name.startswith('hang'):
+        time.sleep(3600)
+
+def test_budget_scales_with_duration(tmp_path):
+    """The budget is the base plus the per-minute allowance for the file's length."""
+    tone = write_tone(tmp_path / 'tone.wav', duration=3.0)
+    assert abs(file_timeout(tone, 10.0, 60.0) - 13.0) < 1e-6
+    assert file_timeout(tone, None) is None
+
+def test_hung_file_is_killed_quarantined_and_skipped(tmp_path, monkeypatch):
+    """A hung file is killed after its budget, quarantined, and not retried on rerun."""
+    music = tmp_path / 'music'
+    music.mkdir()
+    write_tone(music / 'good.wav')
+    hung = write_tone(music / 'hang.wav')
+    output = tmp_path / 'features.csv'
+
+    record_extractions(monkeypatch, before=hang)
+    started = time.monotonic()
+    df = process_directory(music, output, profile='fast', timeout=5.0, timeout_per_minute=30.0)
+    assert time.monotonic() - started < 60
+
+    assert [Path(p).name for p in df['file_path']] == ['good.wav']
+    entries = Quarantine.for_output(output).entries
+    assert [Path(p).name for p in entries] == ['hang.wav']
+    assert 'Timed out' in next(iter(entries.values()))['error']
+
+    # Rerun in-process: neither the extracted nor the quarantined file is analyzed
+    extracted = record_extractions(monkeypatch)
+    df = process_directory(music, output, profile='fast', timeout=None)
+    assert extracted == []
+    assert [Path(p).name for p in df['file_path']] == ['good.wav']
+    assert hung.exists()
+
+if __name__ == "__main__":
+    import tempfile
+    import pytest
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_budget_scales_with_duration(Path(tmp))
+        print("✅ Budget scales with duration")
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        test_hung_file_is_killed_quarantined_and_skipped(Path(tmp), monkeypatch)
+        print("✅ Hung file killed, quarantined and skipped on rerun")
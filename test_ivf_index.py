@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Recall test for the inverted-file index of the recommender.
+
+Compares IVFIndex against ExactCosineIndex on a clustered embedding, and
+checks that a query whose probed lists hold fewer than k vectors still gets
+k neighbors from the lists next in line.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dcm.core.ann_index import DEFAULT_N_PROBE, ExactCosineIndex, IVFIndex
+
+# Fraction of the exact 10 nearest neighbors IVF must find at the default n_probe
+MIN_RECALL = 0.95
+
+def create_embedding(n_songs: int = 20000, n_dims: int = 40) -> np.ndarray:
+    """Create a clustered float32 embedding with overlapping clusters."""
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(200, n_dims))
+    X = centers[rng.integers(0, len(centers), n_songs)] + rng.normal(size=(n_songs, n_dims))
+    return X.astype(np.float32)
+
+def recall(indices: np.ndarray, expected_indices: np.ndarray) -> float:
+    """Mean fraction of the expected neighbors found per query."""
+    return float(np.mean([
+        len(set(found) & set(expected)) / len(expected)
+        for found, expected in zip(indices, expected_indices)
+    ]))
+
+def cosine_distances(X: np.ndarray, query: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    """Exact cosine distances from a query to some rows of X."""
+    X = X[indices].astype(np.float64)
+    query = query.astype(np.float64)
+    return 1 - X @ query / (np.linalg.norm(X, axis=1) * np.linalg.norm(query))
+
+def test_ivf_recall_against_exact_search():
+    """At the default n_probe IVF finds nearly all exact neighbors, and all of them when every list is probed."""
+    X = create_embedding()
+    queries = X[::100]
+    expected_distances, expected_indices = ExactCosineIndex(n_neighbors=10).fit(X).kneighbors(queries)
+
+    index = IVFIndex(n_neighbors=10).fit(X)
+    assert index.n_probe == DEFAULT_N_PROBE
+    distances, indices = index.kneighbors(queries)
+    assert recall(indices, expected_indices) >= MIN_RECALL
+    for row in range(len(queries)):
+        np.testing.assert_allclose(
+            distances[row], cosine_distances(X, queries[row], indices[row]), atol=1e-5
+        )
+        assert np.all(np.diff(distances[row]) >= -1e-6)
+
+    # Probing fewer lists costs recall; probing all of them is exact search
+    index.n_probe = 1
+    assert recall(index.kneighbors(queries, return_distance=False), expected_indices) < MIN_RECALL
+    index.n_probe = len(index.centroids)
+    distances, _ = index.kneighbors(queries)
+    np.testing.assert_allclose(distances, expected_distances, atol=1e-5)
+
+def test_probe_extends_lists_holding_too_few_vectors():
+    """Lists beyond n_probe are added, closest first, until they hold k vectors."""
+    index = IVFIndex(n_probe=2)
+    similarities = np.array([0.1, 0.9, 0.7, 0.8])
+    sizes = np.array([10, 1, 5, 1])
+
+    assert sorted(index._probe(similarities, sizes, 2)) == [1, 3]
+    assert list(index._probe(similarities, sizes, 3)) == [1, 3, 2]
+    assert list(index._probe(similarities, sizes, 7)) == [1, 3, 2]
+    assert list(index._probe(similarities, sizes, 8)) == [1, 3, 2, 0]
+
+def test_kneighbors_with_tiny_lists():
+    """Queries get k distinct, correctly ranked neighbors when each list holds a vector or two."""
+    X = create_embedding(n_songs=300, n_dims=8)
+    index = IVFIndex(n_neighbors=10, n_lists=200, n_probe=1).fit(X)
+    assert np.diff(index._offsets).max() < 10
+
+    distances, indices = index.kneighbors(X[:20])
+    for row in range(20):
+        assert len(set(indices[row])) == 10
+        np.testing.assert_allclose(distances[row], cosine_distances(X, X[row], indices[row]), atol=1e-5)
+        assert np.all(np.diff(distances[row]) >= -1e-6)
+
+    # k as large as the library returns every track
+    _, indices = index.kneighbors(X[0], n_neighbors=len(X))
+    assert sorted(indices[0]) == list(range(len(X)))
+
+if __name__ == "__main__":
+    test_ivf_recall_against_exact_search()
+    test_probe_extends_lists_holding_too_few_vectors()
+    test_kneighbors_with_tiny_lists()
+    print("✅ IVF index recall and list probing")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for resuming an interrupted extraction from its journal.
+
+A crash can leave the journal's last row cut short. The rows before it must
+be recovered without re-extracting their files, the cut-off file must be
+extracted again, and rows appended after the resume must stay readable.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from conftest import record_extractions, write_tone
+from dcm.core.extract_features import process_directory
+from dcm.core.feature_store import FeatureJournal
+
+def truncate_last_row(journal_path: Path) -> dict:
+    """Cut the journal's last row in half, as a crash mid-write would; returns that row."""
+    data = journal_path.read_bytes()
+    start = data.rstrip(b'\n').rfind(b'\n') + 1
+    row = json.loads(data[start:])
+    with open(journal_path, 'r+b') as f:
+        f.truncate(start + (len(data) - start) // 2)
+    return row
+
+def test_append_after_truncated_row(tmp_path):
+    """A row appended after a cut-off row is read back, the cut-off row is not."""
+    journal = FeatureJournal(tmp_path / 'features.csv.journal.jsonl')
+    for i in range(3):
+        journal.append({'file_path': f'/music/{i}.wav', 'tempo': 100.0 + i})
+    journal.close()
+    truncate_last_row(journal.journal_path)
+
+    journal = FeatureJournal(journal.journal_path)
+    assert [row['tempo'] for row in journal.read()] == [100.0, 101.0]
+    journal.append({'file_path': '/music/3.wav', 'tempo': 103.0})
+    journal.close()
+    assert [row['tempo'] for row in FeatureJournal(journal.journal_path).read()] == [100.0, 101.0, 103.0]
+
+def test_resume_skips_journaled_files(tmp_path, monkeypatch, extracted):
+    """After a crash mid-row, only the file whose row was cut off is extracted again."""
+    music = tmp_path / 'music'
+    music.mkdir()
+    for name, frequency in (('a', 220.0), ('b', 330.0), ('c', 440.0)):
+        write_tone(music / f'{name}.wav', frequency)
+    output = tmp_path / 'features.csv'
+
+    # Run to completion but keep the journal, then lose the output as a crash would
+    with monkeypatch.context() as patch:
+        patch.setattr(FeatureJournal, 'remove', FeatureJournal.close)
+        process_directory(music, output, profile='fast', timeout=None)
+    os.remove(output)
+    journal_path = FeatureJournal.for_output(output).journal_path
+    cut_off = truncate_last_row(journal_path)
+
+    extracted.clear()
+    df = process_directory(music, output, profile='fast', timeout=None)
+
+    assert [str(path.resolve()) for path in extracted] == [cut_off['file_path']]
+    assert sorted(Path(p).name for p in df['file_path']) == ['a.wav', 'b.wav', 'c.wav']
+    assert not journal_path.exists()
+
+if __name__ == "__main__":
+    import tempfile
+    import pytest
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_append_after_truncated_row(Path(tmp))
+        print("✅ test_append_after_truncated_row")
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        test_resume_skips_journaled_files(Path(tmp), monkeypatch, record_extractions(monkeypatch))
+        print("✅ test_resume_skips_journaled_files")
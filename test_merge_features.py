@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental merge of per-album feature files.
+
+Covers the manifest bookkeeping of merge_feature_files: added, duplicate,
+removed and modified albums, forced and size-mismatch rebuilds, and the
+append-only fast path that leaves the combined file's rows in place.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import dcm.core.merge_features as merge_features
+from dcm.core.merge_features import find_album_files, merge_feature_files
+
+def track(album: str, name: str, value: float, size_mb: float = 5.0) -> dict:
+    """A feature row of one track."""
+    return {
+        'file_path': f'/music/{album}/{name}.mp3',
+        'file_name': f'{name}.mp3',
+        'file_size_mb': size_mb,
+        'tempo': value,
+        'energy': value / 10,
+    }
+
+def write_album(features_dir: Path, album: str, rows: list) -> Path:
+    """Write an album feature file, with a modification time distinct from the last write."""
+    album_file = features_dir / f'{album}_features.csv'
+    previous = album_file.stat().st_mtime_ns if album_file.exists() else 0
+    pd.DataFrame(rows).to_csv(album_file, index=False)
+    mtime_ns = max(album_file.stat().st_mtime_ns, previous + 1_000_000_000)
+    os.utime(album_file, ns=(mtime_ns, mtime_ns))
+    return album_file
+
+def combined_rows(output_file: Path) -> dict:
+    """Tempo of each file path in the combined file."""
+    df = pd.read_csv(output_file)
+    assert df['file_path'].is_unique
+    return dict(zip(df['file_path'], df['tempo']))
+
+def test_added_album_is_appended(tmp_path, monkeypatch):
+    """A new album is appended without rewriting the rows already merged."""
+    write_album(tmp_path, 'a', [track('a', 'one', 100.0), track('a', 'two', 110.0)])
+    output = tmp_path / 'combined.csv'
+    stats = merge_feature_files(find_album_files(tmp_path, exclude=output), output)
+    assert stats['albums_merged'] == 1 and stats['total_rows'] == 2
+
+    write_album(tmp_path, 'b', [track('b', 'three', 120.0)])
+
+    def rewrite(*args, **kwargs):
+        raise AssertionError("combined file was rewritten instead of appended to")
+
+    monkeypatch.setattr(merge_features, 'save_features', rewrite)
+    before = output.read_bytes()
+    album_files = find_album_files(tmp_path, exclude=output)
+    assert [f.name for f in album_files] == ['a_features.csv', 'b_features.csv']
+    stats = merge_feature_files(album_files, output)
+
+    assert stats['albums_merged'] == 1 and stats['rows_added'] == 1 and stats['total_rows'] == 3
+    assert output.read_bytes().startswith(before)
+    assert combined_rows(output) == {
+        '/music/a/one.mp3': 100.0, '/music/a/two.mp3': 110.0, '/music/b/three.mp3': 120.0
+    }
+
+    # Nothing changed: nothing is re-read or written
+    stats = merge_feature_files(album_files, output)
+    assert stats['albums_merged'] == 0 and stats['rows_added'] == 0 and stats['total_rows'] == 3
+
+def test_duplicates_are_dropped(tmp_path):
+    """Rows with a path or content already merged from another album appear once."""
+    write_album(tmp_path, 'a', [track('a', 'one', 100.0), track('a', 'two', 110.0)])
+    copy = dict(track('a', 'one', 100.0), file_path='/music/b/one (copy).mp3')
+    same_path = track('a', 'two', 999.0)
+    write_album(tmp_path, 'b', [copy, same_path, track('b', 'three', 120.0)])
+    output = tmp_path / 'combined.csv'
+
+    stats = merge_feature_files(find_album_files(tmp_path), output)
+
+    assert stats['duplicates_dropped'] == 2 and stats['total_rows'] == 3
+    assert combined_rows(output) == {
+        '/music/a/one.mp3': 100.0, '/music/a/two.mp3': 110.0, '/music/b/three.mp3': 120.0
+    }
+
+def test_removed_album_releases_duplicates(tmp_path):
+    """Removing an album drops its rows and brings back the copies it shadowed."""
+    album_a = write_album(tmp_path, 'a', [track('a', 'one', 100.0), track('a', 'two', 110.0)])
+    copy = dict(track('a', 'one', 100.0), file_path='/music/b/one (copy).mp3')
+    album_b = write_album(tmp_path, 'b', [copy, track('b', 'three', 120.0)])
+    output = tmp_path / 'combined.csv'
+    merge_feature_files([album_a, album_b], output)
+
+    stats = merge_feature_files([album_b], output)
+
+    assert stats['albums_removed'] == 1 and stats['total_rows'] == 2
+    assert combined_rows(output) == {'/music/b/one (copy).mp3': 100.0, '/music/b/three.mp3': 120.0}
+
+def test_modified_album_replaces_its_rows(tmp_path):
+    """An album file rewritten with new values replaces its rows, other albums stay."""
+    album_a = write_album(tmp_path, 'a', [track('a', 'one', 100.0), track('a', 'two', 110.0)])
+    album_b = write_album(tmp_path, 'b', [track('b', 'three', 120.0)])
+    output = tmp_path / 'combined.csv'
+    merge_feature_files([album_a, album_b], output)
+
+    write_album(tmp_path, 'a', [track('a', 'one', 101.0), track('a', 'four', 130.0)])
+    stats = merge_feature_files([album_a, album_b], output)
+
+    assert stats['albums_merged'] == 1 and stats['total_rows'] == 3
+    assert combined_rows(output) == {
+        '/music/a/one.mp3': 101.0, '/music/a/four.mp3': 130.0, '/music/b/three.mp3': 120.0
+    }
+
+def test_force_and_size_mismatch_rebuild(tmp_path):
+    """`force`, or a combined file changed behind the manifest's back, rebuilds from the albums."""
+    album_a = write_album(tmp_path, 'a', [track('a', 'one', 100.0)])
+    album_b = write_album(tmp_path, 'b', [track('b', 'three', 120.0)])
+    output = tmp_path / 'combined.csv'
+    merge_feature_files([album_a, album_b], output)
+
+    stats = merge_feature_files([album_a, album_b], output, force=True)
+    assert stats['albums_merged'] == 2 and stats['duplicates_dropped'] == 0
+    assert combined_rows(output) == {'/music/a/one.mp3': 100.0, '/music/b/three.mp3': 120.0}
+
+    # A row added by hand changes the size the manifest recorded
+    with open(output, 'a') as f:
+        f.write('/music/x/stray.mp3,stray.mp3,1.0,1.0,0.1\n')
+    stats = merge_feature_files([album_a, album_b], output)
+    assert stats['albums_merged'] == 2
+    assert combined_rows(output) == {'/music/a/one.mp3': 100.0, '/music/b/three.mp3': 120.0}
+
+if __name__ == "__main__":
+    import tempfile
+    import pytest
+
+    tests = [
+        test_duplicates_are_dropped, test_removed_album_releases_duplicates,
+        test_modified_album_replaces_its_rows, test_force_and_size_mismatch_rebuild,
+    ]
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        test_added_album_is_appended(Path(tmp), monkeypatch)
+        print("✅ test_added_album_is_appended")
+    for test in tests:
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+            print(f"✅ {test.__name__}")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test that a saved recommender model stays consistent with the features it is loaded with.
+
+A model loaded together with a feature table other than the one it was
+trained on must keep its own feature columns and must not return neighbor
+rows of the training table.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dcm.core.suggest_next import SongRecommender
+
+def create_features(n_songs: int = 60, seed: int = 3) -> pd.DataFrame:
+    """Create a feature table with a few numeric feature columns."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(size=(n_songs, 6)), columns=[f'f{i}' for i in range(6)])
+    df['file_path'] = [f'/music/Artist{i % 7} - Song {i}.mp3' for i in range(n_songs)]
+    return df
+
+def expected_neighbors(recommender: SongRecommender, song_path: str, n_songs: int) -> list:
+    """Nearest songs by brute-force cosine similarity on the recommender's embedding."""
+    X = recommender.embedding / np.linalg.norm(recommender.embedding, axis=1, keepdims=True)
+    row = recommender.song_position(song_path)
+    order = [i for i in np.argsort(-(X @ X[row]), kind='stable') if i != row]
+    return [recommender.features_df['file_path'].iloc[i] for i in order[:n_songs]]
+
+def test_model_loaded_with_other_features(tmp_path):
+    """Neighbors refer to the loaded songs, and the model keeps its feature columns."""
+    train_file = tmp_path / 'train.csv'
+    create_features().to_csv(train_file, index=False)
+    trained = SongRecommender(str(train_file))
+    trained.train_model(n_neighbors=5)
+    model_file = tmp_path / 'model' / 'model.joblib'
+    trained.save_model(str(model_file))
+
+    # Fewer songs, in another order, with an extra column
+    other = create_features().iloc[::-2].reset_index(drop=True)
+    other['f_new'] = 1.0
+    other_file = tmp_path / 'other.csv'
+    other.to_csv(other_file, index=False)
+
+    recommender = SongRecommender(str(other_file), str(model_file))
+    assert recommender.feature_columns == trained.feature_columns
+    assert recommender.embedding.shape[0] == len(other)
+
+    song_path = other['file_path'].iloc[4]
+    result = recommender.find_similar_songs(song_path, n_songs=5)
+    assert result['file_path'].tolist() == expected_neighbors(recommender, song_path, 5)
+
+def test_model_loaded_with_training_features(tmp_path):
+    """Reloading with the training features reuses the fitted index unchanged."""
+    features_file = tmp_path / 'features.csv'
+    create_features().to_csv(features_file, index=False)
+    trained = SongRecommender(str(features_file))
+    trained.train_model(n_neighbors=5)
+    model_file = tmp_path / 'model.joblib'
+    trained.save_model(str(model_file))
+
+    loaded = SongRecommender(str(features_file), str(model_file))
+    assert loaded.trained_fingerprint == trained.trained_fingerprint
+    song_path = '/music/Artist3 - Song 10.mp3'
+    assert (loaded.find_similar_songs(song_path)['file_path'].tolist()
+            == trained.find_similar_songs(song_path)['file_path'].tolist())
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        test_model_loaded_with_other_features(Path(temp_dir))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        test_model_loaded_with_training_features(Path(temp_dir))
+    print("✅ Loaded models stay consistent with the loaded features")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for the longest-first scheduling of extraction on a worker pool.
+
+Files must be submitted longest-first within each scheduling window, and
+the duration estimated for the ordering must be reused for the file's
+wall-clock budget instead of reading its header again.
+"""
+
+import sys
+from collections import Counter
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+import dcm.core.extract_features as extract_features
+import dcm.core.worker_pool as worker_pool
+from conftest import write_tone
+from dcm.core.extract_features import _extract_files, _longest_first
+
+# Durations of the test files in seconds, in the order they are listed
+DURATIONS = {'one.wav': 1.0, 'four.wav': 4.0, 'two.wav': 2.0, 'three.wav': 3.0}
+
+def write_files(directory: Path) -> list:
+    """Write a tone for every entry of DURATIONS."""
+    return [write_tone(directory / name, duration=duration) for name, duration in DURATIONS.items()]
+
+def test_longest_first_within_windows(tmp_path):
+    """Each window of files is ordered longest-first, and the durations are reported."""
+    files = write_files(tmp_path)
+    durations = {}
+    ordered = list(_longest_first(files, window=2, durations=durations))
+    assert [path.name for path in ordered] == ['four.wav', 'one.wav', 'three.wav', 'two.wav']
+    assert {Path(path).name: round(duration, 3) for path, duration in durations.items()} == DURATIONS
+
+def test_pool_starts_longest_first(tmp_path, monkeypatch):
+    """A pool run submits the longest file first and estimates each duration once."""
+    files = write_files(tmp_path)
+
+    estimated = Counter()
+    estimate_duration = extract_features.estimate_duration
+    monkeypatch.setattr(
+        extract_features, 'estimate_duration',
+        lambda audio_path: estimated.update([Path(audio_path).name]) or estimate_duration(audio_path)
+    )
+    submitted = []
+    submit = worker_pool._Worker.submit
+
+    def recording_submit(worker, key, args):
+        submitted.append(Path(key).name)
+        submit(worker, key, args)
+
+    monkeypatch.setattr(worker_pool._Worker, 'submit', recording_submit)
+    results = list(_extract_files(files, workers=2, timeout=60.0, profile='fast'))
+
+    assert submitted == ['four.wav', 'three.wav', 'two.wav', 'one.wav']
+    assert estimated == Counter(list(DURATIONS))
+    assert all(error is None for _, _, error in results)
+
+if __name__ == "__main__":
+    import tempfile
+    import pytest
+
+    with tempfile.TemporaryDirectory() as tmp:
+        test_longest_first_within_windows(Path(tmp))
+        print("✅ test_longest_first_within_windows")
+    with tempfile.TemporaryDirectory() as tmp, pytest.MonkeyPatch.context() as monkeypatch:
+        test_pool_starts_longest_first(Path(tmp), monkeypatch)
+        print("✅ test_pool_starts_longest_first")
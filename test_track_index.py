@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the song path lookups of TrackIndex.
+
+Covers each step of TrackIndex.find (exact path, file name, the artist part
+of "Artist - Title", the name without extension), which row wins when
+several match, and that the token index never misses a substring match the
+old column scan would have found.
+"""
+
+import random
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from dcm.core.track_index import TrackIndex
+
+PATHS = [
+    '/music/Carnatic/M. S. Subbulakshmi - Kurai Ondrum Illai.mp3',   # 0
+    '/music/Hindustani/Ravi Shankar - Raga Yaman (live).flac',       # 1
+    '/music/Hindustani/Ravi Shankar - Raga Jog.flac',                # 2
+    '/music/Live/Raga Jog.flac',                                     # 3
+    '/backup/Hindustani/Raga Jog.flac',                              # 4
+    '/music/Misc/Yamanx demo.wav',                                   # 5
+    '/music/Misc/Yaman.wav',                                         # 6
+    '/music/Carnatic/M. S. Subbulakshmi - Kurai Ondrum Illai.mp3',   # 7, duplicate of 0
+]
+
+def test_exact_path():
+    """Exact paths resolve to their row, the first one for duplicate rows."""
+    index = TrackIndex(PATHS)
+    assert index.find(PATHS[2]) == 2
+    assert index.find(f'  {PATHS[2]}\n') == 2
+    assert index.find(PATHS[7]) == 0
+    assert PATHS[4] in index and index.position(PATHS[4]) == 4
+    assert '/music/Live/Raga Jog' not in index and index.position('/nowhere.mp3') is None
+
+def test_file_name():
+    """A file name, bare or in another directory, resolves to the first row with that name."""
+    index = TrackIndex(PATHS)
+    assert index.find('Raga Jog.flac') == 3
+    assert index.find('/old/library/Raga Jog.flac') == 3
+    assert index.find('Yaman.wav') == 6
+
+def test_artist_part():
+    """An unknown "Artist - Title" name resolves to the artist's first track."""
+    index = TrackIndex(PATHS)
+    assert index.find('/elsewhere/Ravi Shankar - Raga Desh.mp3') == 1
+    assert index.find('M. S. Subbulakshmi - Bhaja Govindam.mp3') == 0
+    # An artist that matches nothing falls through to the name without extension
+    assert index.find('Raga Jog - Nobody.mp3') == 2
+
+def test_name_without_extension():
+    """A name with another extension or a fragment of a path resolves by substring."""
+    index = TrackIndex(PATHS)
+    assert index.find('Raga Yaman.mp3') == 1
+    assert index.find('Kurai Ondrum') == 0
+    # Only the file name part of a query is looked up
+    assert index.find('/backup/Hindustani/Raga') == 1
+    assert index.find('Raga Bhairavi.mp3') is None
+    # A directory has no file name to look up
+    assert index.find('/music/Hindustani/') is None
+
+def test_ambiguous_substrings():
+    """Rows with the query's words as whole words win; mid-word queries scan in table order."""
+    index = TrackIndex(PATHS)
+    # 'Yamanx demo.wav' (row 5) contains 'Yaman' too, but not as a word
+    assert index.find_substring('Yaman') == 1
+    assert index.find('Yaman.flac') == 1
+    # Starts and ends mid-word: no token can be trusted, the first containing row wins
+    assert index.find_substring('aman') == 1
+    assert index.find_substring('amanx') == 5
+    # Only the outer tokens may be cut off; 'Shankar' must occur whole
+    assert index.find_substring('vi Shankar - Raga J') == 2
+    # Substring matching is case-sensitive, the token index is not
+    assert index.find_substring('raga jog') is None
+    assert index.find_substring('') is None
+
+def test_substring_matches_column_scan():
+    """find_substring finds a match whenever a scan of the paths would, and only then."""
+    rng = random.Random(0)
+    words = ['Raga', 'Yaman', 'Jog', 'live', 'Ravi', 'Shankar', 'Kurai', 'demo', 'x']
+    paths = [
+        f"/music/{rng.choice(words)}/{' '.join(rng.choices(words, k=rng.randint(1, 4)))}.mp3"
+        for _ in range(200)
+    ]
+    index = TrackIndex(paths)
+    for _ in range(500):
+        path = rng.choice(paths)
+        start = rng.randrange(len(path))
+        text = path[start:start + rng.randint(1, 12)]
+        position = index.find_substring(text)
+        assert position is not None and text in paths[position], text
+    for text in ('Raga Raga Raga Raga Raga', 'Jogx', 'yaman'):
+        position = index.find_substring(text)
+        assert (position is None) == (not any(text in path for path in paths)), text
+
+if __name__ == "__main__":
+    test_exact_path()
+    test_file_name()
+    test_artist_part()
+    test_name_without_extension()
+    test_ambiguous_substrings()
+    test_substring_matches_column_scan()
+    print("✅ TrackIndex resolves paths, names and substrings")